@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+r"""
+Benchmarks the bulk insertion of filepath-like rows, comparing a single
+string-built VALUES statement (previously used by insert_filepaths), an
+executemany INSERT (previously used by Analysis.add_samples and
+Job.add_results) and SQLConnectionHandler.insert_many.
+
+The rows are inserted into a temporary table inside a transaction that is
+rolled back, so the database is left untouched. Run it against the test
+environment:
+
+    python benchmarks/bench_bulk_insert.py --rows 10 --rows 1000 --rows 100000
+"""
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014--, The Qiita Development Team.
+#
+# Distributed under the terms of the BSD 3-clause License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# -----------------------------------------------------------------------------
+from __future__ import division
+from time import time
+
+import click
+
+from qiita_db.sql_connection import SQLConnectionHandler
+from qiita_db.util import scrub_data
+
+
+class _Rollback(Exception):
+    """Used to roll back the benchmark transaction"""
+    pass
+
+
+def _build_rows(rows):
+    """Builds (filepath, filepath_type_id, checksum, algorithm_id) rows"""
+    return [("/base/job/%d_result_%d.txt" % (i % 100, i), 8, str(i), 1)
+            for i in range(rows)]
+
+
+def _insert_string_values(conn_handler, table, rows):
+    values = ["('%s', %s, '%s', %s)" % (scrub_data(path), fp_type, checksum,
+                                        alg_id)
+              for path, fp_type, checksum, alg_id in rows]
+    conn_handler.execute_fetchall(
+        "INSERT INTO {0} (filepath, filepath_type_id, checksum, "
+        "checksum_algorithm_id) VALUES {1} RETURNING filepath_id".format(
+            table, ', '.join(values)))
+
+
+def _insert_executemany(conn_handler, table, rows):
+    conn_handler.executemany(
+        "INSERT INTO {0} (filepath, filepath_type_id, checksum, "
+        "checksum_algorithm_id) VALUES (%s, %s, %s, %s)".format(table), rows)
+
+
+def _insert_many(conn_handler, table, rows):
+    conn_handler.insert_many(
+        table, ['filepath', 'filepath_type_id', 'checksum',
+                'checksum_algorithm_id'], rows, returning='filepath_id')
+
+
+def _time_insert(insert_func, rows):
+    conn_handler = SQLConnectionHandler()
+    try:
+        with conn_handler.transaction():
+            conn_handler.execute(
+                "CREATE TEMP TABLE bench_filepath (filepath_id bigserial, "
+                "filepath varchar, filepath_type_id bigint, checksum varchar, "
+                "checksum_algorithm_id bigint)")
+            start = time()
+            insert_func(conn_handler, "bench_filepath", rows)
+            elapsed = time() - start
+            raise _Rollback()
+    except _Rollback:
+        pass
+    return elapsed
+
+
+@click.command()
+@click.option('--rows', default=[10, 1000, 100000], type=int, multiple=True,
+              help="Number of rows to insert. Can be given several times")
+def bench(rows):
+    """Compares the bulk insertion paths"""
+    for n in rows:
+        data = _build_rows(n)
+        print("Inserting %d rows" % n)
+        for name, func in [('values', _insert_string_values),
+                           ('executemany', _insert_executemany),
+                           ('insert_many', _insert_many)]:
+            elapsed = _time_insert(func, data)
+            print("  %-12s %8.3f s  %10.0f rows/s"
+                  % (name, elapsed, n / elapsed if elapsed > 0 else 0))
+
+
+if __name__ == '__main__':
+    bench()
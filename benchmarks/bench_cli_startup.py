@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+r"""
+Benchmarks the startup time of the entry points in a new interpreter: the
+help of the command line scripts and of some of their commands, and building
+the web application. The interpreter startup time is reported as the
+baseline, and the entry points slower than the startup budget are flagged.
+
+None of the timed invocations should need the database, Redis or the compute
+cluster, so the benchmark can run without them:
+
+    python benchmarks/bench_cli_startup.py --repeats 10 --budget 1
+"""
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014--, The Qiita Development Team.
+#
+# Distributed under the terms of the BSD 3-clause License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# -----------------------------------------------------------------------------
+from __future__ import division
+from os.path import join, dirname, abspath
+from subprocess import Popen, PIPE
+from sys import executable
+from time import time
+
+import click
+
+SCRIPTS_DIR = join(dirname(dirname(abspath(__file__))), 'scripts')
+
+# The command lines timed, relative to the scripts directory
+INVOCATIONS = [
+    ['qiita_db', '--help'],
+    ['qiita_db', 'load_raw_data', '--help'],
+    ['qiita_db', 'load_processed_data', '--help'],
+    ['qiita_db', 'load_sample_template', '--help'],
+    ['qiita_env', '--help'],
+    ['qiita_env', 'make_env', '--help'],
+]
+
+# Builds the web application as a webserver worker does before listening
+WEBSERVER = "from qiita_pet.webserver import make_app; make_app()"
+
+
+def _time_invocation(args, repeats):
+    """Returns the best wall time of running `args` in a new interpreter"""
+    elapsed = []
+    for _ in range(repeats):
+        start = time()
+        proc = Popen([executable] + args, stdout=PIPE, stderr=PIPE)
+        _, stderr = proc.communicate()
+        elapsed.append(time() - start)
+        if proc.returncode != 0:
+            raise RuntimeError("Failed running %s:\n%s"
+                               % (' '.join(args), stderr))
+    return min(elapsed)
+
+
+@click.command()
+@click.option('--repeats', default=5, type=int,
+              help="Number of times each command line is run")
+@click.option('--budget', default=1.0, type=float,
+              help="Startup budget of each entry point, in seconds")
+def bench(repeats, budget):
+    """Times the startup of the entry points"""
+    print("Best of %d runs, budget %.3f s" % (repeats, budget))
+    baseline = _time_invocation(['-c', 'pass'], repeats)
+    print("%-40s %8.3f s" % ("python -c pass", baseline))
+    timed = [(' '.join(args), [join(SCRIPTS_DIR, args[0])] + args[1:])
+             for args in INVOCATIONS]
+    timed.append(("webserver make_app()", ['-c', WEBSERVER]))
+    for name, args in timed:
+        best = _time_invocation(args, repeats)
+        print("%-40s %8.3f s  (+%.3f s)%s"
+              % (name, best, best - baseline,
+                 "  OVER BUDGET" if best > budget else ""))
+
+
+if __name__ == '__main__':
+    bench()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+r"""
+Benchmarks the loading of metadata template values into the database,
+comparing the executemany INSERT path previously used by
+MetadataTemplate.create with the COPY FROM STDIN path it uses now.
+
+The rows are loaded into a temporary table inside a transaction that is
+rolled back, so the database is left untouched. Run it against the test
+environment:
+
+    python benchmarks/bench_metadata_template.py --samples 10000 --columns 100
+"""
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014--, The Qiita Development Team.
+#
+# Distributed under the terms of the BSD 3-clause License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# -----------------------------------------------------------------------------
+from __future__ import division
+from future.builtins import zip
+from time import time
+
+import click
+import numpy as np
+import pandas as pd
+
+from qiita_db.sql_connection import SQLConnectionHandler
+from qiita_db.metadata_template import (_get_datatypes, _as_python_types,
+                                        _as_python_rows)
+
+
+class _Rollback(Exception):
+    """Used to roll back the benchmark transaction"""
+    pass
+
+
+def _build_template(samples, columns):
+    """Builds a DataFrame with int, float and str columns"""
+    data = {}
+    for i in range(columns):
+        if i % 3 == 0:
+            data['int_col_%d' % i] = np.arange(samples)
+        elif i % 3 == 1:
+            data['float_col_%d' % i] = np.random.rand(samples)
+        else:
+            data['str_col_%d' % i] = ['value %d' % j for j in range(samples)]
+    index = ['Sample.%d' % j for j in range(samples)]
+    return pd.DataFrame(data, index=index)
+
+
+def _load_executemany(conn_handler, table, md_template, headers):
+    values = _as_python_types(md_template, headers)
+    values.insert(0, list(md_template.index))
+    values = [v for v in zip(*values)]
+    conn_handler.executemany(
+        "INSERT INTO {0} (sample_id, {1}) VALUES (%s, {2})".format(
+            table, ', '.join(headers), ', '.join(['%s'] * len(headers))),
+        values)
+
+
+def _load_copy(conn_handler, table, md_template, headers):
+    conn_handler.copy_from(table, ['sample_id'] + headers,
+                           _as_python_rows(md_template, headers))
+
+
+def _time_load(load_func, md_template):
+    conn_handler = SQLConnectionHandler()
+    headers = list(md_template.columns)
+    column_datatype = ["%s %s" % (col, dtype) for col, dtype
+                       in zip(headers, _get_datatypes(md_template))]
+    try:
+        with conn_handler.transaction():
+            conn_handler.execute(
+                "CREATE TEMP TABLE bench_template (sample_id varchar, "
+                "{0})".format(', '.join(column_datatype)))
+            start = time()
+            load_func(conn_handler, "bench_template", md_template, headers)
+            elapsed = time() - start
+            raise _Rollback()
+    except _Rollback:
+        pass
+    return elapsed
+
+
+@click.command()
+@click.option('--samples', default=10000, type=int,
+              help="Number of samples in the template")
+@click.option('--columns', default=100, type=int,
+              help="Number of metadata columns in the template")
+def bench(samples, columns):
+    """Compares the executemany and COPY metadata loading paths"""
+    md_template = _build_template(samples, columns)
+    print("Loading %d samples x %d columns" % (samples, columns))
+    for name, func in [('executemany', _load_executemany),
+                       ('copy', _load_copy)]:
+        elapsed = _time_load(func, md_template)
+        print("%-12s %8.2f s  %10.0f rows/s"
+              % (name, elapsed, samples / elapsed))
+
+
+if __name__ == '__main__':
+    bench()
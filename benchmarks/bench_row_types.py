@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+r"""
+Benchmarks the row types that SQLConnectionHandler can return, reporting
+the number of rows per second fetched with each of them.
+
+Run it against the test environment:
+
+    python benchmarks/bench_row_types.py --rows 100000
+"""
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014--, The Qiita Development Team.
+#
+# Distributed under the terms of the BSD 3-clause License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# -----------------------------------------------------------------------------
+from __future__ import division
+from time import time
+
+import click
+
+from qiita_db.sql_connection import SQLConnectionHandler
+
+
+@click.command()
+@click.option('--rows', default=100000, type=int,
+              help="Number of rows fetched by each query")
+@click.option('--repeats', default=5, type=int,
+              help="Number of times each query is executed")
+def bench(rows, repeats):
+    """Compares the fetch throughput of the tuple, dict and namedtuple rows"""
+    conn_handler = SQLConnectionHandler()
+    sql = ("SELECT a, a::varchar AS b, a / 2.0 AS c "
+           "FROM generate_series(1, %s) AS a")
+    print("Fetching %d rows x 3 columns, best of %d" % (rows, repeats))
+    for row_type in ['tuple', 'dict', 'namedtuple']:
+        elapsed = []
+        for _ in range(repeats):
+            start = time()
+            conn_handler.execute_fetchall(sql, (rows, ), row_type=row_type)
+            elapsed.append(time() - start)
+        best = min(elapsed)
+        print("%-12s %8.3f s  %10.0f rows/s" % (row_type, best, rows / best))
+
+
+if __name__ == '__main__':
+    bench()
@@ -29,6 +29,12 @@ class ConfigurationManager(object):
         If true, we are in a test environment.
     base_data_dir : str
         Path to the base directorys where all data file are stored
+    job_cache_max_age : int
+        Days after which unused cached job results are evicted. If 0, they
+        are not evicted by age
+    cookie_secret : str or None
+        The secret used to sign the cookies of the web server. If None, a
+        random one is used, and the sessions are lost when it restarts
     user : str
         The postgres user
     password : str
@@ -39,6 +45,14 @@ class ConfigurationManager(object):
         The host where the database lives
     port : int
         The port used to connect to the postgres database in the previous host
+    pool_min_size : int
+        The number of connections the postgres connection pool keeps open
+    pool_max_size : int
+        The maximum number of connections in the postgres connection pool. If
+        0, connection pooling is disabled
+    ipyc_backend : {'ipython', 'local'}
+        Where the jobs run: on the IPython clusters or on a pool of local
+        processes, as many as the size of the demo cluster
     ipyc_demo : str
         The IPython demo cluster profile
     ipyc_demo_n : int
@@ -51,6 +65,16 @@ class ConfigurationManager(object):
         The IPython general cluster profile
     ipyc_general_n : int
         The size of the general cluster
+    max_jobs_per_user : int
+        The maximum number of jobs of a single user running at the same time
+        on a cluster. If 0, they are only limited by the cluster size. Like
+        the cluster size, it is split between the webserver processes
+    job_timeout : int
+        Seconds after which a running job is killed. If 0, jobs are not
+        killed
+    job_max_memory : int
+        Maximum memory (address space) of a running job in MB. If 0, it is
+        not limited
     """
     def __init__(self):
         # If conf_fp is None, we default to the test configuration file
@@ -86,6 +110,14 @@ class ConfigurationManager(object):
                                           '../test_data')
             else:
                 raise e
+        try:
+            self.job_cache_max_age = config.getint('main', 'JOB_CACHE_MAX_AGE')
+        except NoOptionError:
+            self.job_cache_max_age = 0
+        try:
+            self.cookie_secret = config.get('main', 'COOKIE_SECRET')
+        except NoOptionError:
+            self.cookie_secret = None
 
     def _get_postgres(self, config):
         """Get the configuration of the postgres section"""
@@ -100,6 +132,18 @@ class ConfigurationManager(object):
         self.database = config.get('postgres', 'DATABASE')
         self.host = config.get('postgres', 'HOST')
         self.port = config.getint('postgres', 'PORT')
+        try:
+            self.pool_min_size = config.getint('postgres', 'POOL_MIN_SIZE')
+        except NoOptionError:
+            self.pool_min_size = 0
+        try:
+            self.pool_max_size = config.getint('postgres', 'POOL_MAX_SIZE')
+        except NoOptionError:
+            self.pool_max_size = 0
+        if self.pool_min_size > self.pool_max_size:
+            raise ValueError("POOL_MIN_SIZE (%d) can't be larger than "
+                             "POOL_MAX_SIZE (%d)"
+                             % (self.pool_min_size, self.pool_max_size))
 
     def _get_redis(self, config):
         """Get the configuration of the redis section"""
@@ -110,6 +154,11 @@ class ConfigurationManager(object):
         sec_get = partial(config.get, 'ipython')
         sec_getint = partial(config.getint, 'ipython')
 
+        try:
+            self.ipyc_backend = sec_get('BACKEND')
+        except NoOptionError:
+            self.ipyc_backend = 'ipython'
+
         self.ipyc_demo = sec_get('DEMO_CLUSTER')
         self.ipyc_reserved = sec_get('RESERVED_CLUSTER')
         self.ipyc_general = sec_get('GENERAL_CLUSTER')
@@ -117,3 +166,18 @@ class ConfigurationManager(object):
         self.ipyc_demo_n = sec_getint('DEMO_CLUSTER_SIZE')
         self.ipyc_reserved_n = sec_getint('RESERVED_CLUSTER_SIZE')
         self.ipyc_general_n = sec_getint('GENERAL_CLUSTER_SIZE')
+
+        try:
+            self.max_jobs_per_user = sec_getint('MAX_JOBS_PER_USER')
+        except NoOptionError:
+            self.max_jobs_per_user = 0
+
+        try:
+            self.job_timeout = sec_getint('JOB_TIMEOUT')
+        except NoOptionError:
+            self.job_timeout = 0
+
+        try:
+            self.job_max_memory = sec_getint('JOB_MAX_MEMORY')
+        except NoOptionError:
+            self.job_max_memory = 0
@@ -15,6 +15,7 @@ from qiita_core.qiita_settings import qiita_config
 from qiita_db.sql_connection import SQLConnectionHandler
 from qiita_db.environment_manager import (LAYOUT_FP, INITIALIZE_FP,
                                           POPULATE_FP)
+from qiita_db.util import invalidate_schema_cache, invalidate_vocabulary_cache
 
 
 def send_email(to, subject, body):
@@ -85,6 +86,8 @@ def drop_test_database(teardown_fn):
     def decorated_teardown_fn(*args, **kwargs):
         # Drop the schema
         conn_handler.execute("DROP SCHEMA qiita CASCADE")
+        invalidate_schema_cache()
+        invalidate_vocabulary_cache()
         # Execute the teardown function
         return teardown_fn(*args, **kwargs)
 
@@ -38,7 +38,7 @@ class Analysis(QiitaStatusObject):
     shared_with
     jobs
     pmid
-    parent
+    parents
     children
 
     Methods
@@ -107,10 +107,7 @@ class Analysis(QiitaStatusObject):
         str
             Name of the Analysis
         """
-        conn_handler = SQLConnectionHandler()
-        sql = ("SELECT email FROM qiita.{0} WHERE "
-               "analysis_id = %s".format(self._table))
-        return conn_handler.execute_fetchone(sql, (self._id, ))[0]
+        return self._get_row()['email']
 
     @property
     def name(self):
@@ -121,18 +118,12 @@ class Analysis(QiitaStatusObject):
         str
             Name of the Analysis
         """
-        conn_handler = SQLConnectionHandler()
-        sql = ("SELECT name FROM qiita.{0} WHERE "
-               "analysis_id = %s".format(self._table))
-        return conn_handler.execute_fetchone(sql, (self._id, ))[0]
+        return self._get_row()['name']
 
     @property
     def description(self):
         """Returns the description of the analysis"""
-        conn_handler = SQLConnectionHandler()
-        sql = ("SELECT description FROM qiita.{0} WHERE "
-               "analysis_id = %s".format(self._table))
-        return conn_handler.execute_fetchone(sql, (self._id, ))[0]
+        return self._get_row()['description']
 
     @description.setter
     def description(self, description):
@@ -153,6 +144,7 @@ class Analysis(QiitaStatusObject):
         sql = ("UPDATE qiita.{0} SET description = %s WHERE "
                "analysis_id = %s".format(self._table))
         conn_handler.execute(sql, (description, self._id))
+        self._invalidate_row()
 
     @property
     def samples(self):
@@ -168,7 +160,7 @@ class Analysis(QiitaStatusObject):
                " WHERE analysis_id = %s ORDER BY processed_data_id")
         ret_samples = defaultdict(list)
         # turn into dict of samples keyed to processed_data_id
-        for pid, sample in conn_handler.execute_fetchall(sql, (self._id, )):
+        for pid, sample in conn_handler.execute_iter(sql, (self._id, )):
             ret_samples[pid].append(sample)
         return ret_samples
 
@@ -229,11 +221,7 @@ class Analysis(QiitaStatusObject):
         str or None
             returns the PMID or None if none is attached
         """
-        conn_handler = SQLConnectionHandler()
-        sql = ("SELECT pmid FROM qiita.{0} WHERE "
-               "analysis_id = %s".format(self._table))
-        pmid = conn_handler.execute_fetchone(sql, (self._id, ))[0]
-        return pmid
+        return self._get_row()['pmid']
 
     @pmid.setter
     def pmid(self, pmid):
@@ -258,11 +246,20 @@ class Analysis(QiitaStatusObject):
         sql = ("UPDATE qiita.{0} SET pmid = %s WHERE "
                "analysis_id = %s".format(self._table))
         conn_handler.execute(sql, (pmid, self._id))
+        self._invalidate_row()
 
-    # @property
-    # def parent(self):
-    #     """Returns the id of the parent analysis this was forked from"""
-    #     return QiitaDBNotImplementedError()
+    @property
+    def parents(self):
+        """Returns the ids of the analyses this analysis was forked from
+
+        Returns
+        -------
+        list of int
+        """
+        conn_handler = SQLConnectionHandler()
+        return [x[0] for x in conn_handler.execute_fetchall(
+            "SELECT parent_id FROM qiita.analysis_chain WHERE child_id = %s "
+            "ORDER BY parent_id", (self._id, ))]
 
     # @property
     # def children(self):
@@ -311,10 +308,10 @@ class Analysis(QiitaStatusObject):
         conn_handler = SQLConnectionHandler()
         self._lock_check(conn_handler)
 
-        sql = ("INSERT INTO qiita.analysis_sample (analysis_id, sample_id, "
-               "processed_data_id) VALUES (%s, %s, %s)")
-        conn_handler.executemany(sql, [(self._id, s[1], s[0])
-                                       for s in samples])
+        conn_handler.insert_many(
+            "qiita.analysis_sample",
+            ['analysis_id', 'sample_id', 'processed_data_id'],
+            [(self._id, s[1], s[0]) for s in samples])
 
     def remove_samples(self, samples):
         """Removes samples from the analysis
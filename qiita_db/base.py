@@ -15,6 +15,14 @@ Classes
 
     QiitaObject
     QiitaStatusObject
+
+Functions
+---------
+
+..autosummary::
+    :toctree: generated/
+
+    hydration_cache
 """
 
 # -----------------------------------------------------------------------------
@@ -26,11 +34,92 @@ Classes
 # -----------------------------------------------------------------------------
 
 from __future__ import division
+from contextlib import contextmanager
+from threading import local
+from time import time
+
 from qiita_core.exceptions import IncompetentQiitaDeveloperError
 from .sql_connection import SQLConnectionHandler
+from .util import convert_to_id, convert_from_id, get_vocabulary
 from .exceptions import QiitaDBNotImplementedError, QiitaDBUnknownIDError
 
 
+class _HydrationCache(object):
+    r"""Holds the database rows of QiitaObjects, keyed by (table, id)
+
+    Parameters
+    ----------
+    ttl : float, optional
+        Number of seconds a row is kept before it is read again from the
+        database. Default: the rows are kept while the cache is alive
+    """
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        self._rows = {}
+
+    def get(self, key):
+        r"""Returns the row stored under `key`, or None if missing or expired
+        """
+        try:
+            timestamp, row = self._rows[key]
+        except KeyError:
+            return None
+        if self.ttl is not None and time() - timestamp > self.ttl:
+            del self._rows[key]
+            return None
+        return row
+
+    def put(self, key, row):
+        r"""Stores `row` under `key`"""
+        self._rows[key] = (time(), row)
+
+    def invalidate(self, key):
+        r"""Drops the row stored under `key`, if any"""
+        self._rows.pop(key, None)
+
+
+# The hydration cache active in each thread, see hydration_cache
+_hydration = local()
+
+
+@contextmanager
+def hydration_cache(ttl=None):
+    r"""Caches the rows of the QiitaObjects read inside the block
+
+    While the block runs, the first access to a property backed by the
+    object's own row loads the whole row with a single query, and the other
+    properties are served from it. Setters write through to the database and
+    drop the cached row. The cache is discarded when the block exits, so it
+    is meant to wrap a single request or unit of work.
+
+    Parameters
+    ----------
+    ttl : float, optional
+        Number of seconds a cached row is used before it is read again.
+        Useful for long-running blocks. Default: rows are not expired
+
+    Notes
+    -----
+    The cache belongs to the current thread. Nested blocks share the cache
+    of the outermost one.
+
+    Examples
+    --------
+    >>> with hydration_cache(): # doctest: +SKIP
+    ...     Study.hydrate(study_ids) # doctest: +SKIP
+    ...     titles = [Study(i).title for i in study_ids] # doctest: +SKIP
+    """
+    cache = getattr(_hydration, 'cache', None)
+    if cache is not None:
+        yield cache
+        return
+    _hydration.cache = _HydrationCache(ttl)
+    try:
+        yield _hydration.cache
+    finally:
+        _hydration.cache = None
+
+
 class QiitaObject(object):
     r"""Base class for any qiita_db object
 
@@ -48,8 +137,12 @@ class QiitaObject(object):
     create
     delete
     exists
+    from_ids
+    hydrate
     _check_subclass
     _check_id
+    _get_row
+    _invalidate_row
     __eq__
     __neq__
 
@@ -138,6 +231,143 @@ class QiitaObject(object):
             "SELECT EXISTS(SELECT * FROM qiita.{0} WHERE "
             "{0}_id=%s)".format(self._table), (id_, ))[0]
 
+    @classmethod
+    def _row_id_column(cls):
+        r"""The name of the column holding the object ids on `_table`"""
+        return "%s_id" % cls._table
+
+    @classmethod
+    def from_ids(cls, ids, trusted=False):
+        r"""Builds the objects for all the `ids`
+
+        Parameters
+        ----------
+        ids : iterable
+            The object ids
+        trusted : bool, optional
+            If True, the ids are not checked against the database. Only use
+            it for ids that have just been read from the database.
+            Default: False
+
+        Returns
+        -------
+        list
+            The objects, in the same order as `ids`
+
+        Raises
+        ------
+        QiitaDBUnknownIDError
+            If any of the `ids` does not correspond to any object
+
+        Notes
+        -----
+        All the ids are checked with a single query, instead of one query
+        per object as done when calling the constructor.
+        """
+        cls._check_subclass()
+        ids = list(ids)
+        if not trusted and ids:
+            conn_handler = SQLConnectionHandler()
+            found = {x[0] for x in conn_handler.execute_fetchall(
+                "SELECT {1} FROM qiita.{0} WHERE {1} = ANY(%s)".format(
+                    cls._table, cls._row_id_column()), (ids, ))}
+            missing = [id_ for id_ in ids if id_ not in found]
+            if missing:
+                raise QiitaDBUnknownIDError(', '.join(map(str, missing)),
+                                            cls._table)
+        return [cls._from_trusted_id(id_) for id_ in ids]
+
+    @classmethod
+    def _from_trusted_id(cls, id_):
+        r"""Builds the object for `id_` without checking that it exists
+
+        Parameters
+        ----------
+        id_ : object
+            The object id. It must have just been read from the database
+
+        Returns
+        -------
+        QiitaObject
+        """
+        obj = cls.__new__(cls)
+        obj._id = id_
+        return obj
+
+    @classmethod
+    def hydrate(cls, ids):
+        r"""Loads the rows of all the objects in `ids` with a single query
+
+        The rows are stored in the active hydration cache, so the
+        properties of those objects do not need to query the database.
+        Does nothing if there is no active cache.
+
+        Parameters
+        ----------
+        ids : iterable
+            The object ids
+
+        See Also
+        --------
+        hydration_cache
+        """
+        cls._check_subclass()
+        cache = getattr(_hydration, 'cache', None)
+        if cache is None:
+            return
+        conn_handler = SQLConnectionHandler()
+        # Rows read inside a transaction are not cached, see _get_row
+        if conn_handler.in_transaction:
+            return
+        id_column = cls._row_id_column()
+        rows = conn_handler.execute_fetchall(
+            "SELECT * FROM qiita.{0} WHERE {1} = ANY(%s)".format(
+                cls._table, id_column), (list(ids), ), row_type='dict')
+        for row in rows:
+            cache.put((cls._table, row[id_column]), dict(row))
+
+    def _get_row(self, conn_handler=None):
+        r"""Returns the row of the object on `_table`
+
+        Parameters
+        ----------
+        conn_handler : SQLConnectionHandler, optional
+            The connection handler object connected to the DB
+
+        Returns
+        -------
+        dict
+            The row keyed by column name
+
+        Notes
+        -----
+        The row is served from the active hydration cache if possible.
+        Rows read inside a transaction are not cached, as the transaction
+        could be rolled back.
+        """
+        cache = getattr(_hydration, 'cache', None)
+        key = (self._table, self._id)
+        row = cache.get(key) if cache is not None else None
+        if row is None:
+            conn_handler = (conn_handler if conn_handler is not None
+                            else SQLConnectionHandler())
+            row = dict(conn_handler.execute_fetchone(
+                "SELECT * FROM qiita.{0} WHERE {1} = %s".format(
+                    self._table, self._row_id_column()), (self._id, ),
+                row_type='dict'))
+            if cache is not None and not conn_handler.in_transaction:
+                cache.put(key, row)
+        return dict(row)
+
+    def _invalidate_row(self):
+        r"""Drops the row of the object from the active hydration cache
+
+        Must be called after any change to the row of the object
+        """
+        cache = getattr(_hydration, 'cache', None)
+        if cache is not None:
+            cache.invalidate((self._table, self._id))
+
     def __init__(self, id_):
         r"""Initializes the object
 
@@ -194,11 +424,10 @@ class QiitaStatusObject(QiitaObject):
 
         # Get the DB status of the object
         conn_handler = SQLConnectionHandler()
-        return conn_handler.execute_fetchone(
-            "SELECT status FROM qiita.{0}_status WHERE {0}_status_id = "
-            "(SELECT {0}_status_id FROM qiita.{0} WHERE "
-            "{0}_id = %s)".format(self._table),
-            (self._id, ))[0]
+        status_id = self._get_row(conn_handler)[
+            "{0}_status_id".format(self._table)]
+        return convert_from_id(status_id, "{0}_status".format(self._table),
+                               conn_handler)
 
     def _status_setter_checks(self, conn_handler):
         r"""Perform any extra checks that needed to be done before setting the
@@ -223,10 +452,12 @@ class QiitaStatusObject(QiitaObject):
         self._status_setter_checks(conn_handler)
 
         # Update the status of the object
+        status_id = convert_to_id(status, "{0}_status".format(self._table),
+                                  conn_handler)
         conn_handler.execute(
-            "UPDATE qiita.{0} SET {0}_status_id = "
-            "(SELECT {0}_status_id FROM qiita.{0}_status WHERE status = %s) "
-            "WHERE {0}_id = %s".format(self._table), (status, self._id))
+            "UPDATE qiita.{0} SET {0}_status_id = %s WHERE "
+            "{0}_id = %s".format(self._table), (status_id, self._id))
+        self._invalidate_row()
 
     def check_status(self, status, exclude=False, conn_handler=None):
         r"""Checks status of object.
@@ -264,11 +495,8 @@ class QiitaStatusObject(QiitaObject):
         self._check_subclass()
 
         # Get all available statuses
-        conn_handler = (conn_handler if conn_handler is not None
-                        else SQLConnectionHandler())
-        statuses = [x[0] for x in conn_handler.execute_fetchall(
-            "SELECT DISTINCT status FROM qiita.{0}_status".format(self._table),
-            (self._id, ))]
+        statuses = get_vocabulary("{0}_status".format(self._table),
+                                  conn_handler)
 
         # Check that all the provided statuses are valid statuses
         if set(status).difference(statuses):
@@ -14,13 +14,10 @@ from future import standard_library
 with standard_library.hooks():
     from configparser import ConfigParser
 
-import pandas as pd
-
 from .study import Study, StudyPerson
 from .user import User
 from .util import get_filetypes, get_filepath_types
 from .data import RawData, PreprocessedData, ProcessedData
-from .metadata_template import SampleTemplate, PrepTemplate
 
 
 def load_study_from_cmd(owner, title, info):
@@ -123,6 +120,10 @@ def load_sample_template_from_cmd(sample_temp_path, study_id):
     study_id : int
         The study id to which the sample template belongs
     """
+    # pandas is slow to import, only the template commands load it
+    import pandas as pd
+    from .metadata_template import SampleTemplate
+
     sample_temp = pd.DataFrame.from_csv(sample_temp_path, sep='\t',
                                         infer_datetime_format=True)
     return SampleTemplate.create(sample_temp, Study(study_id))
@@ -138,6 +139,9 @@ def load_prep_template_from_cmd(sample_temp_path, study_id):
     study_id : int
         The study id to which the sample template belongs
     """
+    import pandas as pd
+    from .metadata_template import PrepTemplate
+
     prep_temp = pd.DataFrame.from_csv(sample_temp_path, sep='\t',
                                       infer_datetime_format=True)
     return PrepTemplate.create(prep_temp, RawData(study_id))
@@ -172,7 +176,7 @@ def load_raw_data_cmd(filepaths, filepath_types, filetype, study_ids):
     filepath_types_dict = get_filepath_types()
     filepath_types = [filepath_types_dict[x] for x in filepath_types]
 
-    studies = [Study(x) for x in study_ids]
+    studies = Study.from_ids(study_ids)
 
     return RawData.create(filetype_id, list(zip(filepaths, filepath_types)),
                           studies)
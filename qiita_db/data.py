@@ -222,19 +222,22 @@ class RawData(BaseData):
         """
         # Add the raw data to the database, and get the raw data id back
         conn_handler = SQLConnectionHandler()
-        rd_id = conn_handler.execute_fetchone(
-            "INSERT INTO qiita.{0} (filetype_id) VALUES (%s) RETURNING "
-            "raw_data_id".format(cls._table),
-            (filetype, ))[0]
-        rd = cls(rd_id)
-
-        # Connect the raw data with its studies
-        values = [(study.id, rd_id) for study in studies]
-        conn_handler.executemany(
-            "INSERT INTO qiita.{0} (study_id, raw_data_id) VALUES "
-            "(%s, %s)".format(rd._study_raw_table), values)
-
-        rd._add_filepaths(filepaths, conn_handler)
+        # All the inserts are committed at once, so a failure does not leave
+        # a partially created raw data behind
+        with conn_handler.transaction():
+            rd_id = conn_handler.execute_fetchone(
+                "INSERT INTO qiita.{0} (filetype_id) VALUES (%s) RETURNING "
+                "raw_data_id".format(cls._table),
+                (filetype, ))[0]
+            rd = cls(rd_id)
+
+            # Connect the raw data with its studies
+            values = [(study.id, rd_id) for study in studies]
+            conn_handler.executemany(
+                "INSERT INTO qiita.{0} (study_id, raw_data_id) VALUES "
+                "(%s, %s)".format(rd._study_raw_table), values)
+
+            rd._add_filepaths(filepaths, conn_handler)
 
         return rd
 
@@ -312,32 +315,36 @@ class PreprocessedData(BaseData):
             raise IncompetentQiitaDeveloperError(
                 "Preprocessed params table '%s' does not exists!"
                 % preprocessed_params_table)
-        # Add the preprocessed data to the database,
-        # and get the preprocessed data id back
-        ppd_id = conn_handler.execute_fetchone(
-            "INSERT INTO qiita.{0} (preprocessed_params_table, "
-            "preprocessed_params_id, submitted_to_insdc) VALUES "
-            "(%(param_table)s, %(param_id)s, %(insdc)s) "
-            "RETURNING preprocessed_data_id".format(cls._table),
-            {'param_table': preprocessed_params_table,
-             'param_id': preprocessed_params_id,
-             'insdc': submitted_to_insdc})[0]
-        ppd = cls(ppd_id)
-
-        # Connect the preprocessed data with its study
-        conn_handler.execute(
-            "INSERT INTO qiita.{0} (study_id, preprocessed_data_id) "
-            "VALUES (%s, %s)".format(ppd._study_preprocessed_table),
-            (study.id, ppd.id))
-
-        if raw_data is not None:
-            # Connect the preprocessed data with the raw data
+        # All the inserts are committed at once, so a failure does not leave
+        # a partially created preprocessed data behind
+        with conn_handler.transaction():
+            # Add the preprocessed data to the database,
+            # and get the preprocessed data id back
+            ppd_id = conn_handler.execute_fetchone(
+                "INSERT INTO qiita.{0} (preprocessed_params_table, "
+                "preprocessed_params_id, submitted_to_insdc) VALUES "
+                "(%(param_table)s, %(param_id)s, %(insdc)s) "
+                "RETURNING preprocessed_data_id".format(cls._table),
+                {'param_table': preprocessed_params_table,
+                 'param_id': preprocessed_params_id,
+                 'insdc': submitted_to_insdc})[0]
+            ppd = cls(ppd_id)
+
+            # Connect the preprocessed data with its study
             conn_handler.execute(
-                "INSERT INTO qiita.{0} (raw_data_id, preprocessed_data_id) "
-                "VALUES (%s, %s)".format(cls._raw_preprocessed_table),
-                (raw_data.id, ppd_id))
-
-        ppd._add_filepaths(filepaths, conn_handler)
+                "INSERT INTO qiita.{0} (study_id, preprocessed_data_id) "
+                "VALUES (%s, %s)".format(ppd._study_preprocessed_table),
+                (study.id, ppd.id))
+
+            if raw_data is not None:
+                # Connect the preprocessed data with the raw data
+                conn_handler.execute(
+                    "INSERT INTO qiita.{0} (raw_data_id, "
+                    "preprocessed_data_id) VALUES "
+                    "(%s, %s)".format(cls._raw_preprocessed_table),
+                    (raw_data.id, ppd_id))
+
+            ppd._add_filepaths(filepaths, conn_handler)
         return ppd
 
     @property
@@ -450,36 +457,39 @@ class ProcessedData(BaseData):
         if processed_date is None:
             processed_date = datetime.now()
 
-        # Add the processed data to the database,
-        # and get the processed data id back
-        pd_id = conn_handler.execute_fetchone(
-            "INSERT INTO qiita.{0} (processed_params_table, "
-            "processed_params_id, processed_date) VALUES (%(param_table)s, "
-            "%(param_id)s, %(date)s) RETURNING "
-            "processed_data_id".format(cls._table),
-            {'param_table': processed_params_table,
-             'param_id': processed_params_id,
-             'date': processed_date})[0]
-
-        pd = cls(pd_id)
-
-        if preprocessed_data is not None:
+        # All the inserts are committed at once, so a failure does not leave
+        # a partially created processed data behind
+        with conn_handler.transaction():
+            # Add the processed data to the database,
+            # and get the processed data id back
+            pd_id = conn_handler.execute_fetchone(
+                "INSERT INTO qiita.{0} (processed_params_table, "
+                "processed_params_id, processed_date) VALUES "
+                "(%(param_table)s, %(param_id)s, %(date)s) RETURNING "
+                "processed_data_id".format(cls._table),
+                {'param_table': processed_params_table,
+                 'param_id': processed_params_id,
+                 'date': processed_date})[0]
+
+            pd = cls(pd_id)
+
+            if preprocessed_data is not None:
+                conn_handler.execute(
+                    "INSERT INTO qiita.{0} (preprocessed_data_id, "
+                    "processed_data_id) VALUES "
+                    "(%s, %s)".format(cls._preprocessed_processed_table),
+                    (preprocessed_data.id, pd_id))
+                study_id = preprocessed_data.study
+            else:
+                study_id = study.id
+
+            # Connect the processed data with the study
             conn_handler.execute(
-                "INSERT INTO qiita.{0} (preprocessed_data_id, "
-                "processed_data_id) VALUES "
-                "(%s, %s)".format(cls._preprocessed_processed_table),
-                (preprocessed_data.id, pd_id))
-            study_id = preprocessed_data.study
-        else:
-            study_id = study.id
-
-        # Connect the processed data with the study
-        conn_handler.execute(
-            "INSERT INTO qiita.{0} (study_id, processed_data_id) VALUES "
-            "(%s, %s)".format(cls._study_processed_table),
-            (study_id, pd_id))
+                "INSERT INTO qiita.{0} (study_id, processed_data_id) VALUES "
+                "(%s, %s)".format(cls._study_processed_table),
+                (study_id, pd_id))
 
-        pd._add_filepaths(filepaths, conn_handler)
+            pd._add_filepaths(filepaths, conn_handler)
         return cls(pd_id)
 
     @property
@@ -20,7 +20,8 @@ from psycopg2 import connect
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 
 from qiita_core.exceptions import QiitaEnvironmentError
-from qiita_db.util import get_db_files_base_dir
+from qiita_db.util import (get_db_files_base_dir, invalidate_schema_cache,
+                           invalidate_vocabulary_cache)
 
 get_support_file = partial(join, join(dirname(abspath(__file__)),
                                       'support_files'))
@@ -253,3 +254,5 @@ def clean_test_environment(user, password, host):
     # Close cursor and connections
     cur.close()
     conn.close()
+    invalidate_schema_cache()
+    invalidate_vocabulary_cache()
@@ -15,16 +15,19 @@ Classes
 # The full license is in the file LICENSE, distributed with this software.
 # -----------------------------------------------------------------------------
 from __future__ import division
+from past.builtins import basestring
 from json import dumps, loads
-from os.path import join
+from os.path import join, exists
 from time import strftime
-from datetime import date
+from datetime import date, datetime
 from functools import partial
+from hashlib import sha256
 
 from qiita_core.exceptions import IncompetentQiitaDeveloperError
 
 from .base import QiitaStatusObject
-from .util import insert_filepaths, convert_to_id, get_db_files_base_dir
+from .util import (insert_filepaths, convert_to_id, convert_from_id,
+                   get_db_files_base_dir, compute_checksums)
 from .sql_connection import SQLConnectionHandler
 from .logger import LogEntry
 from .exceptions import QiitaDBStatusError
@@ -39,13 +42,22 @@ class Job(QiitaStatusObject):
     datatype
     command
     options
+    outputs
     results
     error
+    timing
+    resource_usage
 
     Methods
     -------
     set_error
     add_results
+    set_timing
+    set_resource_usage
+    result_key
+    get_cached
+    cache_results
+    link_results
     """
     _table = "job"
 
@@ -90,8 +102,7 @@ class Job(QiitaStatusObject):
         """
         conn_handler = SQLConnectionHandler()
         datatype_id = convert_to_id(datatype, "data_type", conn_handler)
-        sql = "SELECT command_id FROM qiita.command WHERE name = %s"
-        command_id = conn_handler.execute_fetchone(sql, (command, ))[0]
+        command_id = convert_to_id(command, "command", conn_handler)
         opts_json = dumps(options, sort_keys=True, separators=(',', ':'))
         sql = ("SELECT EXISTS(SELECT * FROM  qiita.{0} WHERE data_type_id = %s"
                " AND command_id = %s AND options = %s)".format(cls._table))
@@ -127,8 +138,7 @@ class Job(QiitaStatusObject):
         # Get the datatype and command ids from the strings
         conn_handler = SQLConnectionHandler()
         datatype_id = convert_to_id(datatype, "data_type", conn_handler)
-        sql = "SELECT command_id FROM qiita.command WHERE name = %s"
-        command_id = conn_handler.execute_fetchone(sql, (command, ))[0]
+        command_id = convert_to_id(command, "command", conn_handler)
 
         # JSON the options dictionary
         opts_json = dumps(options, sort_keys=True, separators=(',', ':'))
@@ -148,11 +158,9 @@ class Job(QiitaStatusObject):
 
     @property
     def datatype(self):
-        sql = ("SELECT data_type from qiita.data_type WHERE data_type_id = "
-               "(SELECT data_type_id from qiita.{0} WHERE "
-               "job_id = %s)".format(self._table))
         conn_handler = SQLConnectionHandler()
-        return conn_handler.execute_fetchone(sql, (self._id, ))[0]
+        return convert_from_id(self._get_row(conn_handler)['data_type_id'],
+                               "data_type", conn_handler)
 
     @property
     def command(self):
@@ -167,7 +175,7 @@ class Job(QiitaStatusObject):
                "(SELECT command_id from qiita.{0} WHERE "
                "job_id = %s)".format(self._table))
         conn_handler = SQLConnectionHandler()
-        return conn_handler.execute_fetchone(sql, (self._id, ))
+        return list(conn_handler.execute_fetchone(sql, (self._id, )))
 
     @property
     def options(self):
@@ -178,24 +186,39 @@ class Job(QiitaStatusObject):
         dict
             options in the format {option: setting}
         """
-        sql = ("SELECT options FROM qiita.{0} WHERE "
-               "job_id = %s".format(self._table))
         conn_handler = SQLConnectionHandler()
+        row = self._get_row(conn_handler)
         try:
-            opts = loads(conn_handler.execute_fetchone(sql, (self._id, ))[0])
+            opts = loads(row['options'])
         except ValueError:
             raise IncompetentQiitaDeveloperError("Malformed options for job "
                                                  "id %d" % self._id)
-        sql = ("SELECT command, output from qiita.command WHERE command_id = ("
-               "SELECT command_id from qiita.{0} WHERE "
-               "job_id = %s)".format(self._table))
-        db_comm = conn_handler.execute_fetchone(sql, (self._id, ))
+        opts.update(self._outputs(conn_handler, row['command_id']))
+        return opts
+
+    def _outputs(self, conn_handler, command_id):
+        """Returns the output options of the job and their paths"""
+        sql = ("SELECT command, output from qiita.command WHERE "
+               "command_id = %s")
+        db_comm = conn_handler.execute_fetchone(sql, (command_id, ))
         out_opt = loads(db_comm[1])
         basedir = get_db_files_base_dir(conn_handler)
         join_f = partial(join, join(basedir, "job"))
-        for k in out_opt:
-            opts[k] = join_f("%s_%s_%s" % (self._id, db_comm[0], k.strip("-")))
-        return opts
+        return {k: join_f("%s_%s_%s" % (self._id, db_comm[0], k.strip("-")))
+                for k in out_opt}
+
+    @property
+    def outputs(self):
+        """Output options of the job
+
+        Returns
+        -------
+        dict
+            The paths the job writes to, in the format {option: path}
+        """
+        conn_handler = SQLConnectionHandler()
+        row = self._get_row(conn_handler)
+        return self._outputs(conn_handler, row['command_id'])
 
     @property
     def results(self):
@@ -216,6 +239,39 @@ class Job(QiitaStatusObject):
         # create new list, with relative paths from db base
         return [join("job", fp[0]) for fp in results]
 
+    @property
+    def timing(self):
+        """When the job was queued, started and finished running
+
+        Returns
+        -------
+        tuple of datetime or None
+            (queued, started, finished), or None if the job has not run. The
+            queue time is started - queued, the run time finished - started
+            and the wall time finished - queued
+        """
+        conn_handler = SQLConnectionHandler()
+        return conn_handler.execute_fetchone(
+            "SELECT queued, started, finished FROM qiita.job_timing "
+            "WHERE job_id = %s", (self._id, ))
+
+    @property
+    def resource_usage(self):
+        """The resources used by the command of the job
+
+        Returns
+        -------
+        dict or None
+            {'wall_time': seconds, 'user_time': seconds, 'system_time':
+            seconds, 'max_rss': KB}, or None if they were not recorded
+        """
+        conn_handler = SQLConnectionHandler()
+        row = conn_handler.execute_fetchone(
+            "SELECT wall_time, user_time, system_time, max_rss FROM "
+            "qiita.job_resource_usage WHERE job_id = %s", (self._id, ),
+            row_type='dict')
+        return dict(row) if row is not None else None
+
     @property
     def error(self):
         """String with an error message, if the job failed
@@ -256,6 +312,164 @@ class Job(QiitaStatusObject):
                "job_id = %s".format(self._table))
 
         conn_handler.execute(sql, (log_entry.id, self._id))
+        self._invalidate_row()
+
+    def set_timing(self, queued, started, finished):
+        """Records when the job was queued, started and finished running
+
+        Parameters
+        ----------
+        queued : datetime
+            When the job was queued to run
+        started : datetime
+            When the job started running
+        finished : datetime
+            When the job finished running
+        """
+        conn_handler = SQLConnectionHandler()
+        with conn_handler.transaction():
+            conn_handler.execute(
+                "DELETE FROM qiita.job_timing WHERE job_id = %s", (self._id, ))
+            conn_handler.execute(
+                "INSERT INTO qiita.job_timing (job_id, queued, started, "
+                "finished) VALUES (%s, %s, %s, %s)",
+                (self._id, queued, started, finished))
+
+    def set_resource_usage(self, wall_time, user_time, system_time,
+                           max_rss):
+        """Records the resources used by the command of the job
+
+        Parameters
+        ----------
+        wall_time : float
+            Seconds the command ran for
+        user_time : float
+            Seconds of CPU time spent in user mode by the command and its
+            children
+        system_time : float
+            Seconds of CPU time spent in kernel mode by the command and its
+            children
+        max_rss : int
+            Peak resident memory of the command, or of its largest child, in
+            KB
+        """
+        conn_handler = SQLConnectionHandler()
+        with conn_handler.transaction():
+            conn_handler.execute(
+                "DELETE FROM qiita.job_resource_usage WHERE job_id = %s",
+                (self._id, ))
+            conn_handler.execute(
+                "INSERT INTO qiita.job_resource_usage (job_id, wall_time, "
+                "user_time, system_time, max_rss) VALUES (%s, %s, %s, %s, %s)",
+                (self._id, wall_time, user_time, system_time, max_rss))
+
+    def result_key(self):
+        """Returns the key identifying the results of the job
+
+        Two jobs get the same key when they run the same command, with the
+        same options, on input files with the same contents, so the results
+        of one of them can be reused by the other.
+
+        Returns
+        -------
+        str
+            The key, an hex digest
+
+        Notes
+        -----
+        The options pointing to files or directories are replaced by the
+        checksums of their contents, so the key does not depend on where the
+        inputs live (e.g. the mapping files written to temporary files).
+        """
+        conn_handler = SQLConnectionHandler()
+        row = self._get_row(conn_handler)
+        options = loads(row['options'])
+        paths = sorted(k for k, v in options.items()
+                       if isinstance(v, basestring) and exists(v))
+        checksums, _ = compute_checksums([options[k] for k in paths],
+                                         'sha256')
+        for k, checksum in zip(paths, checksums):
+            options[k] = "sha256:%s" % checksum
+        key = dumps({'command_id': row['command_id'],
+                     'data_type_id': row['data_type_id'],
+                     'options': options},
+                    sort_keys=True, separators=(',', ':'))
+        return sha256(key.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def get_cached(cls, key):
+        """Returns the finished job whose results are cached under `key`
+
+        Parameters
+        ----------
+        key : str
+            The key of the results, see `result_key`
+
+        Returns
+        -------
+        Job or None
+            The cached job, or None if there are no results cached under
+            `key` or any of the result files is gone
+        """
+        conn_handler = SQLConnectionHandler()
+        row = conn_handler.execute_fetchone(
+            "SELECT job_id FROM qiita.job_result_cache WHERE cache_key = %s",
+            (key, ))
+        if row is None:
+            return None
+        job = cls(row[0])
+        if not all(exists(fp) for fp in job._result_filepaths(conn_handler)):
+            conn_handler.execute(
+                "DELETE FROM qiita.job_result_cache WHERE cache_key = %s",
+                (key, ))
+            return None
+        conn_handler.execute(
+            "UPDATE qiita.job_result_cache SET last_used = %s WHERE "
+            "cache_key = %s", (datetime.now(), key))
+        return job
+
+    def _result_filepaths(self, conn_handler):
+        """Returns the absolute paths of the result files of the job"""
+        # The stored paths are either absolute or relative to the job folder
+        join_f = partial(join, get_db_files_base_dir(conn_handler), "job")
+        return [join_f(fp[0]) for fp in conn_handler.execute_fetchall(
+            "SELECT filepath FROM qiita.filepath JOIN "
+            "qiita.job_results_filepath USING (filepath_id) "
+            "WHERE job_id = %s", (self._id, ))]
+
+    def cache_results(self, key):
+        """Caches the results of the job under `key`
+
+        Parameters
+        ----------
+        key : str
+            The key of the results, see `result_key`
+        """
+        conn_handler = SQLConnectionHandler()
+        now = datetime.now()
+        with conn_handler.transaction():
+            conn_handler.execute(
+                "DELETE FROM qiita.job_result_cache WHERE cache_key = %s",
+                (key, ))
+            conn_handler.execute(
+                "INSERT INTO qiita.job_result_cache (cache_key, job_id, "
+                "created, last_used) VALUES (%s, %s, %s, %s)",
+                (key, self._id, now, now))
+
+    def link_results(self, job):
+        """Adds the results of another job to the results of this one
+
+        Parameters
+        ----------
+        job : Job
+            The job whose result files are reused
+        """
+        conn_handler = SQLConnectionHandler()
+        self._lock_job(conn_handler)
+        conn_handler.execute(
+            "INSERT INTO qiita.{0}_results_filepath (job_id, filepath_id) "
+            "SELECT %s, filepath_id FROM qiita.{0}_results_filepath "
+            "WHERE job_id = %s".format(self._table), (self._id, job.id))
 
     def add_results(self, results):
         """Adds a list of results to the results
@@ -282,9 +496,35 @@ class Job(QiitaStatusObject):
                                     "filepath", conn_handler, move_files=False)
 
         # associate filepaths with job
-        sql = ("INSERT INTO qiita.{0}_results_filepath (job_id, filepath_id) "
-               "VALUES (%s, %s)".format(self._table))
-        conn_handler.executemany(sql, [(self._id, fid) for fid in file_ids])
+        conn_handler.insert_many(
+            "qiita.{0}_results_filepath".format(self._table),
+            ['job_id', 'filepath_id'], [(self._id, fid) for fid in file_ids])
+
+
+def evict_cached_results(max_age):
+    """Removes the results not used for longer than `max_age` from the job
+    result cache
+
+    Parameters
+    ----------
+    max_age : timedelta
+        The results not used for longer than this are evicted
+
+    Returns
+    -------
+    int
+        The number of results evicted
+
+    Notes
+    -----
+    Only the cache entries are removed, so the evicted results are no longer
+    reused, but their files are kept: they still belong to the jobs that
+    produced or linked them.
+    """
+    conn_handler = SQLConnectionHandler()
+    return len(conn_handler.execute_fetchall(
+        "DELETE FROM qiita.job_result_cache WHERE last_used < %s "
+        "RETURNING cache_key", (datetime.now() - max_age, )))
 
 
 class Command(object):
@@ -312,7 +552,8 @@ class Command(object):
         list of Command objects
         """
         conn_handler = SQLConnectionHandler()
-        commands = conn_handler.execute_fetchall("SELECT * FROM qiita.command")
+        commands = conn_handler.execute_fetchall(
+            "SELECT * FROM qiita.command", row_type='dict')
         # create the list of command objects
         return [cls(c["name"], c["command"], c["input"], c["required"],
                 c["optional"], c["output"]) for c in commands]
@@ -39,6 +39,7 @@ Methods
 
 from __future__ import division
 from future.builtins import zip
+from future.utils import viewitems
 from copy import deepcopy
 
 import pandas as pd
@@ -50,7 +51,7 @@ from .exceptions import (QiitaDBDuplicateError, QiitaDBColumnError,
                          QiitaDBDuplicateHeaderError)
 from .base import QiitaObject
 from .sql_connection import SQLConnectionHandler
-from .util import exists_table, get_table_cols
+from .util import exists_table, get_table_cols, invalidate_schema_cache
 
 
 def _get_datatypes(metadata_map):
@@ -107,6 +108,34 @@ def _as_python_types(metadata_map, headers):
     return values
 
 
+def _as_python_rows(metadata_map, headers, *prefix):
+    r"""Yields the rows of metadata_map as tuples of python types
+
+    Parameters
+    ----------
+    metadata_map : DataFrame
+        The MetadataTemplate contents
+    headers : list of str
+        The headers of the columns of metadata_map to include in the rows
+    prefix : objects
+        Values to include at the beginning of each row, before the sample id
+
+    Returns
+    -------
+    generator of tuples
+        The rows in the format prefix + (sample_id, ) + values, in which the
+        values of the columns pointed by headers are casted to python types
+
+    See Also
+    --------
+    _as_python_types
+    """
+    columns = [metadata_map[h] for h in headers]
+    for row in zip(metadata_map.index, *columns):
+        yield prefix + tuple(np.asscalar(v) if isinstance(v, np.generic)
+                             else v for v in row)
+
+
 class BaseSample(QiitaObject):
     r"""Sample object that accesses the db to get the information of a sample
     belonging to a PrepTemplate or a SampleTemplate.
@@ -239,18 +268,7 @@ class BaseSample(QiitaObject):
         set of str
             The set of all available metadata categories
         """
-        # Get all the required columns
-        required_cols = get_table_cols(self._table, conn_handler)
-        # Get all the the columns in the dynamic table
-        dynamic_cols = get_table_cols(self._dynamic_table, conn_handler)
-        # Get the union of the two previous lists
-        cols = set(required_cols).union(dynamic_cols)
-        # Remove the sample_id column and the study_id/raw_data_id columns,
-        # as this columns are used internally for data storage and they don't
-        # actually belong to the metadata
-        cols.remove('sample_id')
-        cols.remove(self._id_column)
-        return cols
+        return self._md_template._get_categories(conn_handler)
 
     def __len__(self):
         r"""Returns the number of metadata categories
@@ -289,18 +307,8 @@ class BaseSample(QiitaObject):
         conn_handler = SQLConnectionHandler()
         key = key.lower()
         if key in self._get_categories(conn_handler):
-            # Check if we have either to query the table with required columns
-            # or the dynamic table
-            if key in get_table_cols(self._table, conn_handler):
-                return conn_handler.execute_fetchone(
-                    "SELECT {0} FROM qiita.{1} WHERE {2}=%s AND "
-                    "sample_id=%s".format(key, self._table, self._id_column),
-                    (self._md_template.id, self._id))[0]
-            else:
-                return conn_handler.execute_fetchone(
-                    "SELECT {0} FROM qiita.{1} WHERE "
-                    "sample_id=%s".format(key, self._dynamic_table),
-                    (self._id, ))[0]
+            return self._md_template._get_values(
+                [key], conn_handler, self._id)[self._id][key]
         else:
             # The key is not available for the sample, so raise a KeyError
             raise KeyError("Metadata category %s does not exists for sample %s"
@@ -342,7 +350,7 @@ class BaseSample(QiitaObject):
         keys
         """
         conn_handler = SQLConnectionHandler()
-        return iter(self._get_categories(conn_handler))
+        return iter(self._md_template._get_ordered_categories(conn_handler))
 
     def __contains__(self, key):
         r"""Checks if the metadata category `key` is present
@@ -374,6 +382,20 @@ class BaseSample(QiitaObject):
         """
         return self.__iter__()
 
+    def _get_values(self):
+        r"""Returns all the metadata values of the sample
+
+        Returns
+        -------
+        list of tuples of (str, object)
+            The (category, value) pairs, in metadata category order
+        """
+        conn_handler = SQLConnectionHandler()
+        categories = self._md_template._get_ordered_categories(conn_handler)
+        values = self._md_template._get_values(
+            categories, conn_handler, self._id)[self._id]
+        return [(category, values[category]) for category in categories]
+
     def values(self):
         r"""Iterator over the metadata values, in metadata category order
 
@@ -382,39 +404,18 @@ class BaseSample(QiitaObject):
         Iterator
             Iterator over metadata values
         """
-        conn_handler = SQLConnectionHandler()
-        values = conn_handler.execute_fetchone(
-            "SELECT * FROM qiita.{0} WHERE {1}=%s AND "
-            "sample_id=%s".format(self._table, self._id_column),
-            (self._md_template.id, self._id))[2:]
-        dynamic_values = conn_handler.execute_fetchone(
-            "SELECT * from qiita.{0} WHERE "
-            "sample_id=%s".format(self._dynamic_table),
-            (self._id, ))[1:]
-        values.extend(dynamic_values)
-        return iter(values)
+        return iter([value for _, value in self._get_values()])
 
     def items(self):
-        r"""Iterator over (category, value) tuples
+        r"""Iterator over (category, value) tuples, in metadata category
+        order
 
         Returns
         -------
         Iterator
             Iterator over (category, value) tuples
         """
-        conn_handler = SQLConnectionHandler()
-        values = dict(conn_handler.execute_fetchone(
-            "SELECT * FROM qiita.{0} WHERE {1}=%s AND "
-            "sample_id=%s".format(self._table, self._id_column),
-            (self._md_template.id, self._id)))
-        dynamic_values = dict(conn_handler.execute_fetchone(
-            "SELECT * from qiita.{0} WHERE "
-            "sample_id=%s".format(self._dynamic_table),
-            (self._id, )))
-        values.update(dynamic_values)
-        del values['sample_id']
-        del values[self._id_column]
-        return values.items()
+        return iter(self._get_values())
 
     def get(self, key):
         r"""Returns the metadata value for category `key`, or None if the
@@ -523,6 +524,9 @@ class MetadataTemplate(QiitaObject):
     values
     items
     get
+    get_category
+    get_categories
+    to_dataframe
     to_file
 
     See Also
@@ -549,6 +553,11 @@ class MetadataTemplate(QiitaObject):
             "{1}=%s)".format(self._table, self._id_column),
             (id_, ))[0]
 
+    @classmethod
+    def _row_id_column(cls):
+        r"""The name of the column holding the template ids on `_table`"""
+        return cls._id_column
+
     @classmethod
     def _table_name(cls, obj):
         r"""Returns the dynamic table name
@@ -617,48 +626,46 @@ class MetadataTemplate(QiitaObject):
                 for col in remaining:
                     md_template[col] = pd.Series([None] * num_samples,
                                                  index=sample_ids)
-        # Insert values on required columns
-        values = _as_python_types(md_template, db_cols)
-        values.insert(0, sample_ids)
-        values.insert(0, [obj.id] * num_samples)
-        values = [v for v in zip(*values)]
-        conn_handler.executemany(
-            "INSERT INTO qiita.{0} ({1}, sample_id, {2}) "
-            "VALUES (%s, %s, {3})".format(cls._table, cls._id_column,
-                                          ', '.join(db_cols),
-                                          ', '.join(['%s'] * len(db_cols))),
-            values)
-
-        # Insert rows on *_columns table
-        headers = list(set(headers).difference(db_cols))
-        datatypes = _get_datatypes(md_template.ix[:, headers])
-        # psycopg2 requires a list of tuples, in which each tuple is a set
-        # of values to use in the string formatting of the query. We have all
-        # the values in different lists (but in the same order) so use zip
-        # to create the list of tuples that psycopg2 requires.
-        values = [v for v in zip([obj.id] * len(headers), headers, datatypes)]
-        conn_handler.executemany(
-            "INSERT INTO qiita.{0} ({1}, column_name, column_type) "
-            "VALUES (%s, %s, %s)".format(cls._column_table, cls._id_column),
-            values)
-
-        # Create table with custom columns
-        table_name = cls._table_name(obj)
-        column_datatype = ["%s %s" % (col, dtype)
-                           for col, dtype in zip(headers, datatypes)]
-        conn_handler.execute(
-            "CREATE TABLE qiita.{0} (sample_id varchar, {1})".format(
-                table_name, ', '.join(column_datatype)))
-
-        # Insert values on custom table
-        values = _as_python_types(md_template, headers)
-        values.insert(0, sample_ids)
-        values = [v for v in zip(*values)]
-        conn_handler.executemany(
-            "INSERT INTO qiita.{0} (sample_id, {1}) "
-            "VALUES (%s, {2})".format(table_name, ", ".join(headers),
-                                      ', '.join(["%s"] * len(headers))),
-            values)
+        # All the inserts and the creation of the dynamic table are committed
+        # at once, so a failure does not leave a partial template behind
+        with conn_handler.transaction():
+            # Insert values on required columns. The rows are streamed
+            # straight from the DataFrame with COPY, which is much faster than
+            # inserting them one by one
+            conn_handler.copy_from(
+                "qiita.%s" % cls._table,
+                [cls._id_column, 'sample_id'] + db_cols,
+                _as_python_rows(md_template, db_cols, obj.id))
+
+            # Insert rows on *_columns table
+            headers = list(set(headers).difference(db_cols))
+            datatypes = _get_datatypes(md_template.ix[:, headers])
+            # psycopg2 requires a list of tuples, in which each tuple is a set
+            # of values to use in the string formatting of the query. We have
+            # all the values in different lists (but in the same order) so use
+            # zip to create the list of tuples that psycopg2 requires.
+            values = [v for v in zip([obj.id] * len(headers), headers,
+                                     datatypes)]
+            conn_handler.executemany(
+                "INSERT INTO qiita.{0} ({1}, column_name, column_type) "
+                "VALUES (%s, %s, %s)".format(cls._column_table,
+                                             cls._id_column),
+                values)
+
+            # Create table with custom columns
+            table_name = cls._table_name(obj)
+            column_datatype = ["%s %s" % (col, dtype)
+                               for col, dtype in zip(headers, datatypes)]
+            conn_handler.execute(
+                "CREATE TABLE qiita.{0} (sample_id varchar, {1})".format(
+                    table_name, ', '.join(column_datatype)))
+
+            # Insert values on custom table
+            conn_handler.copy_from("qiita.%s" % table_name,
+                                   ['sample_id'] + headers,
+                                   _as_python_rows(md_template, headers))
+        # The schema has changed, make sure no stale information is cached
+        invalidate_schema_cache(table_name)
 
         return cls(obj.id)
 
@@ -698,6 +705,158 @@ class MetadataTemplate(QiitaObject):
             (self._id, ))
         return set(sample_id[0] for sample_id in sample_ids)
 
+    def _get_ordered_categories(self, conn_handler):
+        r"""Returns all the available metadata categories for the template,
+        in metadata category order
+
+        The categories of the required table come first, followed by the ones
+        of the dynamic table, each in the order of the table columns
+
+        Parameters
+        ----------
+        conn_handler : SQLConnectionHandler
+            The connection handler object connected to the DB
+
+        Returns
+        -------
+        list of str
+            The metadata categories
+        """
+        # The sample_id column and the study_id/raw_data_id columns are used
+        # internally for data storage and they don't actually belong to the
+        # metadata
+        internal = {'sample_id', self._id_column}
+        cols = []
+        for table in (self._table, self._table_name(self)):
+            for col in get_table_cols(table, conn_handler):
+                if col not in internal and col not in cols:
+                    cols.append(col)
+        return cols
+
+    def _get_categories(self, conn_handler):
+        r"""Returns all the available metadata categories for the template
+
+        Parameters
+        ----------
+        conn_handler : SQLConnectionHandler
+            The connection handler object connected to the DB
+
+        Returns
+        -------
+        set of str
+            The set of all available metadata categories
+        """
+        return set(self._get_ordered_categories(conn_handler))
+
+    def _get_values(self, categories, conn_handler, sample_id=None):
+        r"""Returns the values of the metadata `categories` in a single query
+
+        Parameters
+        ----------
+        categories : list of str
+            The metadata categories. They should be valid, lowercase
+            categories of the template
+        conn_handler : SQLConnectionHandler
+            The connection handler object connected to the DB
+        sample_id : str, optional
+            If provided, only the values of this sample are retrieved
+
+        Returns
+        -------
+        dict of {str: dict of {str: object}}
+            The metadata values keyed by sample id and then by category
+        """
+        sql, sql_args = self._values_sql(categories, sample_id)
+        return {row[0]: dict(zip(categories, row[1:]))
+                for row in conn_handler.execute_fetchall(sql, sql_args)}
+
+    def _values_sql(self, categories, sample_id=None):
+        r"""Builds the query that retrieves the values of `categories`
+
+        Parameters
+        ----------
+        categories : list of str
+            The metadata categories. They should be valid, lowercase
+            categories of the template
+        sample_id : str, optional
+            If provided, only the values of this sample are retrieved
+
+        Returns
+        -------
+        tuple of (str, list)
+            The SQL query and its arguments. Each row returned by the query
+            holds the sample id followed by the values of `categories`
+        """
+        # The required and the dynamic tables only share the sample_id
+        # column, so all the categories can be selected from their join
+        # without knowing the table in which each of them lives
+        sql = ("SELECT sample_id{0} FROM qiita.{1} LEFT JOIN qiita.{2} "
+               "USING (sample_id) WHERE {3}=%s".format(
+                   ''.join(', %s' % c for c in categories), self._table,
+                   self._table_name(self), self._id_column))
+        sql_args = [self._id]
+        if sample_id is not None:
+            sql += " AND sample_id=%s"
+            sql_args.append(sample_id)
+        return sql, sql_args
+
+    def get_categories(self, categories):
+        r"""Returns the values of the metadata `categories` for all samples
+
+        Parameters
+        ----------
+        categories : iterable of str
+            The metadata categories
+
+        Returns
+        -------
+        dict of {str: dict of {str: object}}
+            The metadata values keyed by sample id and then by category
+
+        Raises
+        ------
+        KeyError
+            If any of the metadata `categories` does not exist
+
+        See Also
+        --------
+        get_category
+        """
+        conn_handler = SQLConnectionHandler()
+        categories = [c.lower() for c in categories]
+        missing = set(categories).difference(
+            self._get_categories(conn_handler))
+        if missing:
+            raise KeyError("Metadata categories %s do not exist in template "
+                           "%d" % (', '.join(missing), self._id))
+        return self._get_values(categories, conn_handler)
+
+    def get_category(self, category):
+        r"""Returns the values of the metadata `category` for all samples
+
+        Parameters
+        ----------
+        category : str
+            The metadata category
+
+        Returns
+        -------
+        dict of {str: object}
+            The metadata values keyed by sample id
+
+        Raises
+        ------
+        KeyError
+            If the metadata `category` does not exist
+
+        See Also
+        --------
+        get_categories
+        """
+        category = category.lower()
+        return {sid: values[category] for sid, values
+                in viewitems(self.get_categories([category]))}
+
     def __len__(self):
         r"""Returns the number of samples in the metadata template
 
@@ -853,31 +1012,26 @@ class MetadataTemplate(QiitaObject):
         except KeyError:
             return None
 
-    def _transform_to_dict(self, values):
-        r"""Transforms `values` to a dict keyed by sample id
-
-        Parameters
-        ----------
-        values : object
-            The object returned from a execute_fetchall call
+    def to_dataframe(self):
+        r"""Returns the metadata of all the samples as a DataFrame
 
         Returns
         -------
-        dict
-        """
-        result = {}
-        for row in values:
-            # Transform the row to a dictionary
-            values_dict = dict(row)
-            # Get the sample id of this row
-            sid = values_dict['sample_id']
-            del values_dict['sample_id']
-            # Remove _id_column from this row (if present)
-            if self._id_column in values_dict:
-                del values_dict[self._id_column]
-            result[sid] = values_dict
-
-        return result
+        pandas.DataFrame
+            The metadata indexed by sample id, with one column per metadata
+            category. Both the index and the columns are sorted.
+
+        Notes
+        -----
+        The values are kept exactly as returned by the database, so all the
+        columns have the object dtype and missing values are None.
+        """
+        conn_handler = SQLConnectionHandler()
+        categories = sorted(self._get_categories(conn_handler))
+        sql, sql_args = self._values_sql(categories)
+        df = pd.DataFrame(conn_handler.execute_fetchall(sql, sql_args),
+                          columns=['sample_id'] + categories, dtype=object)
+        return df.set_index('sample_id').sort_index()
 
     def to_file(self, fp):
         r"""Writes the MetadataTemplate to the file `fp` in tab-delimited
@@ -889,25 +1043,19 @@ class MetadataTemplate(QiitaObject):
             Path to the output file
         """
         conn_handler = SQLConnectionHandler()
-        metadata_map = self._transform_to_dict(conn_handler.execute_fetchall(
-            "SELECT * FROM qiita.{0} WHERE {1}=%s".format(self._table,
-                                                          self._id_column),
-            (self.id,)))
-        dyn_vals = self._transform_to_dict(conn_handler.execute_fetchall(
-            "SELECT * FROM qiita.{0}".format(self._table_name(self))))
-
-        for k in metadata_map:
-            metadata_map[k].update(dyn_vals[k])
-
-        headers = sorted(list(metadata_map.values())[0].keys())
+        headers = sorted(self._get_categories(conn_handler))
+        sql, sql_args = self._values_sql(headers)
+        # The C collation sorts the sample ids by their bytes, as python does
+        sql += ' ORDER BY sample_id COLLATE "C"'
+        # The rows are streamed from the database and written as they come,
+        # so the template is never fully held in memory
+        rows = conn_handler.execute_iter(sql, sql_args, batch_size=10000)
         with open(fp, 'w') as f:
             # First write the headers
             f.write("#SampleID\t%s\n" % '\t'.join(headers))
             # Write the values for each sample id
-            for sid, d in sorted(metadata_map.items()):
-                values = [str(d[h]) for h in headers]
-                values.insert(0, sid)
-                f.write("%s\n" % '\t'.join(values))
+            f.writelines("%s\n" % '\t'.join(str(v) for v in row)
+                         for row in rows)
 
 
 class SampleTemplate(MetadataTemplate):
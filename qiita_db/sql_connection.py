@@ -10,40 +10,550 @@ from __future__ import division
 # -----------------------------------------------------------------------------
 
 from contextlib import contextmanager
+from itertools import count
 from collections import Iterable
+from threading import Condition, Lock, local
+from time import time
+from math import isnan, isinf
 
 from psycopg2 import connect, Error as PostgresError
-from psycopg2.extras import DictCursor
+from psycopg2.extras import DictCursor, NamedTupleCursor
 
 from .exceptions import QiitaDBExecutionError, QiitaDBConnectionError
 from qiita_core.qiita_settings import qiita_config
 
 
+def _connect():
+    """Opens a new connection to the Postgres DB set up in the configuration
+
+    Returns
+    -------
+    psycopg2.connection
+    """
+    return connect(user=qiita_config.user,
+                   password=qiita_config.password,
+                   database=qiita_config.database,
+                   host=qiita_config.host,
+                   port=qiita_config.port)
+
+
+def _copy_value(value):
+    """Formats `value` following the text format of the Postgres COPY command
+
+    Parameters
+    ----------
+    value : object
+        The python value
+
+    Returns
+    -------
+    str
+        The value formatted to be read by COPY FROM, `\\N` if `value` is None
+    """
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, float):
+        if isnan(value):
+            return 'NaN'
+        if isinf(value):
+            return 'Infinity' if value > 0 else '-Infinity'
+        return repr(value)
+    return ('%s' % value).replace('\\', '\\\\').replace(
+        '\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+class _CopyStream(object):
+    """Read-only file-like object that streams `rows` in the COPY text format
+
+    Parameters
+    ----------
+    rows : iterable of tuples
+        The rows to stream. They are formatted as they are read, so the whole
+        data set is never held in memory
+
+    Notes
+    -----
+    psycopg2 only needs the `read` method of the file passed to copy_expert
+    """
+    def __init__(self, rows):
+        self._lines = ('\t'.join(_copy_value(v) for v in row) + '\n'
+                       for row in rows)
+        self._buffer = ''
+
+    def read(self, size=-1):
+        chunks = [self._buffer]
+        length = len(self._buffer)
+        for line in self._lines:
+            chunks.append(line)
+            length += len(line)
+            if 0 <= size <= length:
+                break
+        data = ''.join(chunks)
+        if size < 0:
+            self._buffer = ''
+            return data
+        self._buffer = data[size:]
+        return data[:size]
+
+
+class ConnectionPool(object):
+    """Thread-safe pool of connections to the Postgres DB
+
+    Parameters
+    ----------
+    min_size : int
+        The number of connections opened when the pool is created. The pool
+        never closes idle connections below this number
+    max_size : int
+        The maximum number of connections open at the same time
+    check_interval : float, optional
+        Connections that have been idle for more than `check_interval`
+        seconds are checked with a round-trip before being handed out, so
+        stale sockets (e.g. closed by the server) are replaced. Default: 30
+
+    Methods
+    -------
+    getconn
+    putconn
+    closeall
+    stats
+    """
+    def __init__(self, min_size, max_size, check_interval=30):
+        if max_size < 1 or min_size > max_size:
+            raise ValueError("Wrong pool sizes: min_size %d, max_size %d"
+                             % (min_size, max_size))
+        self._min_size = min_size
+        self._max_size = max_size
+        self._check_interval = check_interval
+        self._cond = Condition(Lock())
+        # List of (connection, time when it was returned to the pool)
+        self._idle = []
+        self._size = 0
+        self._in_use = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._replaced = 0
+        self._closed = False
+
+        for _ in range(min_size):
+            self._idle.append((_connect(), time()))
+            self._size += 1
+
+    def _is_healthy(self, conn, last_used):
+        """Checks that the idle connection `conn` is still usable"""
+        if conn.closed:
+            return False
+        if time() - last_used < self._check_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+        except PostgresError:
+            return False
+        return True
+
+    def getconn(self, timeout=None):
+        """Checks out a connection from the pool
+
+        If all the connections are in use and the pool is full, it waits
+        until another caller returns one.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Maximum number of seconds to wait for a connection. Default:
+            wait forever
+
+        Returns
+        -------
+        psycopg2.connection
+
+        Raises
+        ------
+        QiitaDBConnectionError
+            If the pool is closed or no connection is available after
+            `timeout` seconds
+        """
+        wait_start = None
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise QiitaDBConnectionError("Connection pool is closed")
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._size < self._max_size:
+                    # Reserve the slot, the connection is opened below
+                    # so we don't hold the lock while connecting
+                    self._size += 1
+                    conn, last_used = None, None
+                    break
+                if wait_start is None:
+                    wait_start = time()
+                    self._waits += 1
+                if timeout is None:
+                    self._cond.wait()
+                else:
+                    remaining = timeout - (time() - wait_start)
+                    if remaining <= 0:
+                        self._wait_time += time() - wait_start
+                        raise QiitaDBConnectionError(
+                            "Timed out after %s seconds waiting for a "
+                            "connection from the pool" % timeout)
+                    self._cond.wait(remaining)
+            if wait_start is not None:
+                self._wait_time += time() - wait_start
+            self._in_use += 1
+            self._checkouts += 1
+
+        try:
+            if conn is None:
+                conn = _connect()
+            elif not self._is_healthy(conn, last_used):
+                if not conn.closed:
+                    conn.close()
+                conn = _connect()
+                with self._cond:
+                    self._replaced += 1
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        return conn
+
+    def putconn(self, conn):
+        """Returns `conn` to the pool
+
+        Any transaction left open in `conn` is rolled back, so the next
+        caller always gets a clean connection.
+
+        Parameters
+        ----------
+        conn : psycopg2.connection
+            A connection previously obtained through `getconn`
+        """
+        if not conn.closed:
+            try:
+                conn.rollback()
+            except PostgresError:
+                conn.close()
+        with self._cond:
+            self._in_use -= 1
+            if conn.closed or self._closed:
+                self._size -= 1
+                if not conn.closed:
+                    conn.close()
+            else:
+                self._idle.append((conn, time()))
+            self._cond.notify()
+
+    def closeall(self):
+        """Closes all the idle connections and stops handing out new ones.
+        Connections in use are closed as soon as they are returned"""
+        with self._cond:
+            self._closed = True
+            for conn, _ in self._idle:
+                if not conn.closed:
+                    conn.close()
+            self._size -= len(self._idle)
+            self._idle = []
+            self._cond.notify_all()
+
+    def stats(self):
+        """Returns the pool usage statistics
+
+        Returns
+        -------
+        dict
+            {'min_size': int, 'max_size': int, 'size': int, 'in_use': int,
+             'idle': int, 'checkouts': int, 'waits': int, 'wait_time': float,
+             'replaced': int}. `waits` is the number of checkouts that had to
+            wait for a free connection, `wait_time` is the total number of
+            seconds spent waiting and `replaced` is the number of stale
+            connections that have been replaced by the health checks
+        """
+        with self._cond:
+            return {'min_size': self._min_size,
+                    'max_size': self._max_size,
+                    'size': self._size,
+                    'in_use': self._in_use,
+                    'idle': len(self._idle),
+                    'checkouts': self._checkouts,
+                    'waits': self._waits,
+                    'wait_time': self._wait_time,
+                    'replaced': self._replaced}
+
+
+_pool = None
+_pool_lock = Lock()
+# Holds the connection of the transaction open in the current thread, if any
+_transaction = local()
+# Used to give a unique name to the server-side cursors
+_cursor_ids = count()
+# The cursor factories used for each type of row. Plain tuples are the
+# cheapest to build, so they are used unless the caller needs the rows to be
+# accessed by column name
+_CURSOR_FACTORIES = {'tuple': None,
+                     'dict': DictCursor,
+                     'namedtuple': NamedTupleCursor}
+
+
+def get_connection_pool():
+    """Returns the connection pool shared by the current process
+
+    The pool is created on first use with the sizes from the [postgres]
+    section of the configuration file.
+
+    Returns
+    -------
+    ConnectionPool or None
+        The process-wide pool, or None if pooling is disabled
+    """
+    global _pool
+    if qiita_config.pool_max_size < 1:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(qiita_config.pool_min_size,
+                                   qiita_config.pool_max_size)
+    return _pool
+
+
+def close_connection_pool():
+    """Closes the connection pool of the current process
+
+    A process that forks must close its pool first, so the children do not
+    share its connections. The next connection handler created opens a new
+    pool.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+def _run_callbacks(depth, committed):
+    """Runs the transaction callbacks registered at `depth` or deeper
+
+    The commit callbacks run in registration order and the rollback ones in
+    reverse order. They are discarded afterwards, so each one is called at
+    most once.
+
+    Parameters
+    ----------
+    depth : int
+        The depth of the block that has been committed or rolled back
+    committed : bool
+        Whether the block has been committed (True) or rolled back (False)
+    """
+    callbacks = [cb for cb in _transaction.callbacks if cb[0] >= depth]
+    _transaction.callbacks = [cb for cb in _transaction.callbacks
+                              if cb[0] < depth]
+    if committed:
+        funcs = [on_commit for _, on_commit, _ in callbacks]
+    else:
+        funcs = [on_rollback for _, _, on_rollback in reversed(callbacks)]
+    for func in funcs:
+        if func is not None:
+            func()
+
+
 class SQLConnectionHandler(object):
-    """Encapsulates the DB connection with the Postgres DB"""
+    """Encapsulates the DB connection with the Postgres DB
+
+    If connection pooling is enabled in the configuration file, the handler
+    does not own a connection: each query checks out a connection from the
+    process-wide pool and returns it once the query is done.
+
+    Each query is committed as soon as it is executed, unless it runs inside
+    a `transaction` block.
+    """
     def __init__(self):
-        self._connection = connect(user=qiita_config.user,
-                                   password=qiita_config.password,
-                                   database=qiita_config.database,
-                                   host=qiita_config.host,
-                                   port=qiita_config.port)
+        self._connection = _connect() if self._pool is None else None
 
     def __del__(self):
-        self._connection.close()
+        conn = getattr(self, '_connection', None)
+        if conn is not None:
+            conn.close()
+
+    @property
+    def _pool(self):
+        # Looked up on each use, so the handlers created before the pool was
+        # closed (e.g. before forking) use the new pool of the process
+        return get_connection_pool()
+
+    def pool_stats(self):
+        """Returns the statistics of the connection pool
+
+        Returns
+        -------
+        dict or None
+            The pool statistics (see ConnectionPool.stats), or None if
+            connection pooling is disabled
+        """
+        pool = self._pool
+        return pool.stats() if pool is not None else None
+
+    @property
+    def in_transaction(self):
+        """Whether there is a transaction open in the current thread"""
+        return getattr(_transaction, 'connection', None) is not None
+
+    @contextmanager
+    def _get_connection(self):
+        """Yields the connection to use for a single query"""
+        if self.in_transaction:
+            yield _transaction.connection
+        elif self._connection is not None:
+            yield self._connection
+        else:
+            pool = self._pool
+            conn = pool.getconn()
+            try:
+                yield conn
+            finally:
+                pool.putconn(conn)
+
+    @contextmanager
+    def transaction(self):
+        """Executes all the queries of the block in a single transaction
+
+        The transaction is committed when the block exits normally and rolled
+        back if it raises. Transactions can be nested: the inner blocks are
+        executed in a savepoint, so an error in an inner block only rolls
+        back the queries of that block.
+
+        Notes
+        -----
+        The transaction belongs to the current thread, so any other
+        SQLConnectionHandler used inside the block (e.g. by the object
+        constructors) takes part in it and sees its uncommitted changes.
+
+        Examples
+        --------
+        >>> conn_handler = SQLConnectionHandler() # doctest: +SKIP
+        >>> with conn_handler.transaction(): # doctest: +SKIP
+        ...     conn_handler.execute(sql1) # doctest: +SKIP
+        ...     conn_handler.execute(sql2) # doctest: +SKIP
+        """
+        if self.in_transaction:
+            _transaction.depth += 1
+            savepoint = "qiita_sp_%d" % _transaction.depth
+            with _transaction.connection.cursor() as cur:
+                cur.execute("SAVEPOINT %s" % savepoint)
+            try:
+                yield self
+            except Exception:
+                with _transaction.connection.cursor() as cur:
+                    cur.execute("ROLLBACK TO SAVEPOINT %s" % savepoint)
+                _run_callbacks(_transaction.depth, committed=False)
+                raise
+            else:
+                with _transaction.connection.cursor() as cur:
+                    cur.execute("RELEASE SAVEPOINT %s" % savepoint)
+                # The callbacks now belong to the enclosing block
+                _transaction.callbacks = [
+                    (min(depth, _transaction.depth - 1), on_commit, on_rb)
+                    for depth, on_commit, on_rb in _transaction.callbacks]
+            finally:
+                _transaction.depth -= 1
+        else:
+            with self._get_connection() as conn:
+                _transaction.connection = conn
+                _transaction.depth = 0
+                _transaction.callbacks = []
+                try:
+                    yield self
+                except Exception:
+                    conn.rollback()
+                    _run_callbacks(0, committed=False)
+                    raise
+                else:
+                    try:
+                        conn.commit()
+                    except PostgresError as e:
+                        conn.rollback()
+                        _run_callbacks(0, committed=False)
+                        raise QiitaDBExecutionError(
+                            "\nError committing transaction\nError: %s" % e)
+                    _run_callbacks(0, committed=True)
+                finally:
+                    _transaction.connection = None
+                    _transaction.callbacks = []
+
+    def on_commit(self, func):
+        """Calls `func` once the current transaction is committed
+
+        Parameters
+        ----------
+        func : callable
+            Function without arguments. It is called right away if there is
+            no transaction open, as each query is then committed on its own.
+
+        Notes
+        -----
+        Used to keep side effects that live outside of the database (e.g.
+        files) in sync with the transaction. If `func` is registered inside a
+        nested block that is rolled back, it is never called.
+        """
+        if self.in_transaction:
+            _transaction.callbacks.append((_transaction.depth, func, None))
+        else:
+            func()
+
+    def on_rollback(self, func):
+        """Calls `func` if the current transaction block is rolled back
+
+        Parameters
+        ----------
+        func : callable
+            Function without arguments. It is called when the innermost
+            block open at registration time, or any enclosing block, is
+            rolled back. Ignored if there is no transaction open.
+        """
+        if self.in_transaction:
+            _transaction.callbacks.append((_transaction.depth, None, func))
+
+    def _cursor_factory(self, row_type):
+        """Returns the cursor factory that builds rows of type `row_type`
+
+        Raises a ValueError if `row_type` is not 'tuple', 'dict' or
+        'namedtuple'
+        """
+        try:
+            return _CURSOR_FACTORIES[row_type]
+        except KeyError:
+            raise ValueError("row_type should be one of %s. Found %s"
+                             % (', '.join(sorted(_CURSOR_FACTORIES)),
+                                row_type))
 
     @contextmanager
-    def get_postgres_cursor(self):
+    def get_postgres_cursor(self, row_type='tuple'):
         """ Returns a Postgres cursor
 
+        Parameters
+        ----------
+        row_type : {'tuple', 'dict', 'namedtuple'}, optional
+            The type of the rows returned by the cursor. Default: 'tuple'
+
         Returns
         -------
         pgcursor : psycopg2.cursor
 
         Raises a QiitaDBConnectionError if the cursor cannot be created
         """
+        cursor_factory = self._cursor_factory(row_type)
         try:
-            with self._connection.cursor(cursor_factory=DictCursor) as cur:
-                yield cur
+            with self._get_connection() as conn:
+                with conn.cursor(cursor_factory=cursor_factory) as cur:
+                    yield cur
         except PostgresError as e:
             raise QiitaDBConnectionError("Cannot get postgres cursor! %s" % e)
 
@@ -62,7 +572,7 @@ class SQLConnectionHandler(object):
                             % type(sql_args))
 
     @contextmanager
-    def _sql_executor(self, sql, sql_args=None, many=False):
+    def _sql_executor(self, sql, sql_args=None, many=False, row_type='tuple'):
         """Executes an SQL query
 
         Parameters
@@ -73,6 +583,8 @@ class SQLConnectionHandler(object):
             The arguments for the SQL query
         many: bool, optional
             If true, performs an execute many call
+        row_type: {'tuple', 'dict', 'namedtuple'}, optional
+            The type of the rows returned by the cursor
 
         Returns
         -------
@@ -92,16 +604,20 @@ class SQLConnectionHandler(object):
             self._check_sql_args(sql_args)
 
         # Execute the query
-        with self.get_postgres_cursor() as cur:
+        with self.get_postgres_cursor(row_type) as cur:
             try:
                 if many:
                     cur.executemany(sql, sql_args)
                 else:
                     cur.execute(sql, sql_args)
                 yield cur
-                self._connection.commit()
+                if not self.in_transaction:
+                    cur.connection.commit()
             except PostgresError as e:
-                self._connection.rollback()
+                # Inside a transaction, the rollback is done when leaving the
+                # transaction block
+                if not self.in_transaction:
+                    cur.connection.rollback()
                 try:
                     if not isinstance(sql_args[0], Iterable):
                         err_sql = cur.mogrify(sql, sql_args)
@@ -112,7 +628,7 @@ class SQLConnectionHandler(object):
                 raise QiitaDBExecutionError(("\nError running SQL query: %s"
                                              "\nError: %s" % (err_sql, e)))
 
-    def execute_fetchall(self, sql, sql_args=None):
+    def execute_fetchall(self, sql, sql_args=None, row_type='tuple'):
         """ Executes a fetchall SQL query
 
         Parameters
@@ -121,6 +637,10 @@ class SQLConnectionHandler(object):
             The SQL query
         sql_args: tuple or list, optional
             The arguments for the SQL query
+        row_type: {'tuple', 'dict', 'namedtuple'}, optional
+            The type of the returned rows. 'dict' and 'namedtuple' rows can
+            be accessed by column name, but are slower to build.
+            Default: 'tuple'
 
         Returns
         ------
@@ -137,11 +657,12 @@ class SQLConnectionHandler(object):
             those elements, ordinary string formatting should be used before
             running execute.
         """
-        with self._sql_executor(sql, sql_args) as pgcursor:
+        with self._sql_executor(sql, sql_args,
+                                row_type=row_type) as pgcursor:
             result = pgcursor.fetchall()
         return result
 
-    def execute_fetchone(self, sql, sql_args=None):
+    def execute_fetchone(self, sql, sql_args=None, row_type='tuple'):
         """ Executes a fetchone SQL query
 
         Parameters
@@ -150,6 +671,10 @@ class SQLConnectionHandler(object):
             The SQL query
         sql_args: tuple or list, optional
             The arguments for the SQL query
+        row_type: {'tuple', 'dict', 'namedtuple'}, optional
+            The type of the returned rows. 'dict' and 'namedtuple' rows can
+            be accessed by column name, but are slower to build.
+            Default: 'tuple'
 
         Returns
         -------
@@ -166,7 +691,8 @@ class SQLConnectionHandler(object):
             those elements, ordinary string formatting should be used before
             running execute.
         """
-        with self._sql_executor(sql, sql_args) as pgcursor:
+        with self._sql_executor(sql, sql_args,
+                                row_type=row_type) as pgcursor:
             result = pgcursor.fetchone()
         return result
 
@@ -193,6 +719,145 @@ class SQLConnectionHandler(object):
         with self._sql_executor(sql, sql_args):
             pass
 
+    def execute_iter(self, sql, sql_args=None, batch_size=1000,
+                     row_type='tuple'):
+        """Executes a SQL query and iterates over its results
+
+        The rows are streamed from a server-side (named) cursor in batches of
+        `batch_size` rows, so the whole result never needs to be held in
+        memory.
+
+        Parameters
+        ----------
+        sql: str
+            The SQL query. It must be a SELECT or VALUES query
+        sql_args: tuple or list, optional
+            The arguments for the SQL query
+        batch_size: int, optional
+            The number of rows fetched from the server at once. Default: 1000
+        row_type: {'tuple', 'dict', 'namedtuple'}, optional
+            The type of the returned rows. Default: 'tuple'
+
+        Returns
+        -------
+        generator
+            The rows of the query result
+
+        Raises
+        ------
+        QiitaDBExecutionError
+            If there is some error executing the SQL query
+
+        Notes
+        -----
+        The query is executed when the iteration starts, and the connection
+        is held until the iteration finishes. Without connection pooling, no
+        other query should be executed through this handler while iterating,
+        as committing it would close the server-side cursor.
+        """
+        self._check_sql_args(sql_args)
+        cursor_factory = self._cursor_factory(row_type)
+        with self._get_connection() as conn:
+            try:
+                with conn.cursor(name="qiita_cursor_%d" % next(_cursor_ids),
+                                 cursor_factory=cursor_factory) as cur:
+                    cur.itersize = batch_size
+                    cur.execute(sql, sql_args)
+                    for row in cur:
+                        yield row
+                if not self.in_transaction:
+                    conn.commit()
+            except PostgresError as e:
+                if not self.in_transaction:
+                    conn.rollback()
+                raise QiitaDBExecutionError(("\nError running SQL query: %s"
+                                             "\nError: %s" % (sql, e)))
+
+    def copy_from(self, table, columns, rows):
+        """Loads `rows` into `table` with a single COPY FROM STDIN
+
+        This is much faster than an executemany INSERT for large amounts of
+        rows, as all the rows are streamed to the server in one round-trip.
+
+        Parameters
+        ----------
+        table : str
+            The table name, including the schema
+        columns : list of str
+            The column names, in the same order as the values in each row
+        rows : iterable of tuples
+            The rows to insert. None values are inserted as NULL
+
+        Raises
+        ------
+        QiitaDBExecutionError
+            If there is some error loading the rows
+        """
+        sql = "COPY {0} ({1}) FROM STDIN".format(table, ', '.join(columns))
+        with self.get_postgres_cursor() as cur:
+            try:
+                cur.copy_expert(sql, _CopyStream(rows))
+                if not self.in_transaction:
+                    cur.connection.commit()
+            except PostgresError as e:
+                if not self.in_transaction:
+                    cur.connection.rollback()
+                raise QiitaDBExecutionError(("\nError running SQL query: %s"
+                                             "\nError: %s" % (sql, e)))
+
+    def insert_many(self, table, columns, rows, returning=None,
+                    batch_size=1000):
+        """Inserts `rows` into `table` with multi-row parameterized INSERTs
+
+        The rows are sent in batches of `batch_size` rows per statement, with
+        all the values bound as query parameters, instead of one round-trip
+        per row as an executemany INSERT does.
+
+        Parameters
+        ----------
+        table : str
+            The table name, including the schema
+        columns : list of str
+            The column names, in the same order as the values in each row
+        rows : iterable of tuples
+            The rows to insert
+        returning : str, optional
+            The columns to return for each inserted row, e.g. the id column
+        batch_size : int, optional
+            The maximum number of rows per INSERT statement. Default: 1000
+
+        Returns
+        -------
+        list of tuples or None
+            The `returning` values of each inserted row, in the same order as
+            `rows`. None if `returning` is not given
+
+        Raises
+        ------
+        QiitaDBExecutionError
+            If there is some error inserting the rows. No row is inserted
+
+        Notes
+        -----
+        All the batches are inserted in the same transaction. Use `copy_from`
+        for very large loads that do not need any value back.
+        """
+        rows = [tuple(row) for row in rows]
+        results = []
+        sql = "INSERT INTO {0} ({1}) VALUES ".format(table, ', '.join(columns))
+        placeholders = "(%s)" % ', '.join(['%s'] * len(columns))
+        suffix = " RETURNING {0}".format(returning) if returning else ""
+        with self.transaction():
+            for i in range(0, len(rows), batch_size):
+                batch = rows[i:i + batch_size]
+                # All the full batches share the same statement text
+                query = sql + ', '.join([placeholders] * len(batch)) + suffix
+                args = [value for row in batch for value in row]
+                with self._sql_executor(query, args) as pgcursor:
+                    if returning:
+                        results.extend(pgcursor.fetchall())
+        return results if returning else None
+
     def executemany(self, sql, sql_args_list):
         """ Executes an executemany SQL query with no results
 
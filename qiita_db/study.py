@@ -160,8 +160,9 @@ class Study(QiitaStatusObject):
         sql = ("SELECT study_id FROM qiita.{0} WHERE "
                "{0}_status_id = %s".format(cls._table))
         # MAGIC NUMBER 2: status id for a public study
-        return [cls(x[0]) for x in
-                conn_handler.execute_fetchall(sql, (2,))]
+        return cls.from_ids((x[0] for x in
+                             conn_handler.execute_fetchall(sql, (2,))),
+                            trusted=True)
 
     @classmethod
     def create(cls, owner, title, efo, info, investigation=None):
@@ -232,18 +233,21 @@ class Study(QiitaStatusObject):
                 data.append(insertdict[col].id)
             else:
                 data.append(insertdict[col])
-        study_id = conn_handler.execute_fetchone(sql, data)[0]
-
-        # insert efo information into database
-        sql = ("INSERT INTO qiita.{0}_experimental_factor (study_id, "
-               "efo_id) VALUES (%s, %s)".format(cls._table))
-        conn_handler.executemany(sql, [(study_id, e) for e in efo])
-
-        # add study to investigation if necessary
-        if investigation:
-            sql = ("INSERT INTO qiita.investigation_study (investigation_id, "
-                   "study_id) VALUES (%s, %s)")
-            conn_handler.execute(sql, (investigation.id, study_id))
+        # All the inserts are committed at once, so a failure does not leave
+        # a partially created study behind
+        with conn_handler.transaction():
+            study_id = conn_handler.execute_fetchone(sql, data)[0]
+
+            # insert efo information into database
+            sql = ("INSERT INTO qiita.{0}_experimental_factor (study_id, "
+                   "efo_id) VALUES (%s, %s)".format(cls._table))
+            conn_handler.executemany(sql, [(study_id, e) for e in efo])
+
+            # add study to investigation if necessary
+            if investigation:
+                sql = ("INSERT INTO qiita.investigation_study "
+                       "(investigation_id, study_id) VALUES (%s, %s)")
+                conn_handler.execute(sql, (investigation.id, study_id))
 
         return cls(study_id)
 
@@ -257,10 +261,7 @@ class Study(QiitaStatusObject):
         str
             Title of study
         """
-        conn_handler = SQLConnectionHandler()
-        sql = ("SELECT study_title FROM qiita.{0} WHERE "
-               "study_id = %s".format(self._table))
-        return conn_handler.execute_fetchone(sql, (self._id, ))[0]
+        return self._get_row()['study_title']
 
     @title.setter
     def title(self, title):
@@ -275,7 +276,8 @@ class Study(QiitaStatusObject):
         self._lock_public(conn_handler)
         sql = ("UPDATE qiita.{0} SET study_title = %s WHERE "
                "study_id = %s".format(self._table))
-        return conn_handler.execute(sql, (title, self._id))
+        conn_handler.execute(sql, (title, self._id))
+        self._invalidate_row()
 
     @property
     def info(self):
@@ -286,9 +288,7 @@ class Study(QiitaStatusObject):
         dict
             info of study keyed to column names
         """
-        conn_handler = SQLConnectionHandler()
-        sql = "SELECT * FROM qiita.{0} WHERE study_id = %s".format(self._table)
-        info = dict(conn_handler.execute_fetchone(sql, (self._id, )))
+        info = self._get_row()
         # remove non-info items from info
         for item in self._non_info:
             info.pop(item)
@@ -337,6 +337,7 @@ class Study(QiitaStatusObject):
         sql = ("UPDATE qiita.{0} SET {1} WHERE "
                "study_id = %s".format(self._table, ','.join(sql_vals)))
         conn_handler.execute(sql, data)
+        self._invalidate_row()
 
     @property
     def efo(self):
@@ -578,10 +579,7 @@ class StudyPerson(QiitaObject):
         str
             Name of person
         """
-        conn_handler = SQLConnectionHandler()
-        sql = ("SELECT name FROM qiita.{0} WHERE "
-               "study_person_id = %s".format(self._table))
-        return conn_handler.execute_fetchone(sql, (self._id, ))[0]
+        return self._get_row()['name']
 
     @property
     def email(self):
@@ -592,10 +590,7 @@ class StudyPerson(QiitaObject):
         str
             Email of person
         """
-        conn_handler = SQLConnectionHandler()
-        sql = ("SELECT email FROM qiita.{0} WHERE "
-               "study_person_id = %s".format(self._table))
-        return conn_handler.execute_fetchone(sql, (self._id, ))[0]
+        return self._get_row()['email']
 
     @property
     def address(self):
@@ -606,10 +601,7 @@ class StudyPerson(QiitaObject):
         str or None
             address or None if no address in database
         """
-        conn_handler = SQLConnectionHandler()
-        sql = ("SELECT address FROM qiita.{0} WHERE study_person_id ="
-               " %s".format(self._table))
-        return conn_handler.execute_fetchone(sql, (self._id, ))[0]
+        return self._get_row()['address']
 
     @address.setter
     def address(self, value):
@@ -624,6 +616,7 @@ class StudyPerson(QiitaObject):
         sql = ("UPDATE qiita.{0} SET address = %s WHERE "
                "study_person_id = %s".format(self._table))
         conn_handler.execute(sql, (value, self._id))
+        self._invalidate_row()
 
     @property
     def phone(self):
@@ -634,10 +627,7 @@ class StudyPerson(QiitaObject):
          str or None
             phone or None if no address in database
         """
-        conn_handler = SQLConnectionHandler()
-        sql = ("SELECT phone FROM qiita.{0} WHERE "
-               "study_person_id = %s".format(self._table))
-        return conn_handler.execute_fetchone(sql, (self._id, ))[0]
+        return self._get_row()['phone']
 
     @phone.setter
     def phone(self, value):
@@ -652,3 +642,4 @@ class StudyPerson(QiitaObject):
         sql = ("UPDATE qiita.{0} SET phone = %s WHERE "
                "study_person_id = %s".format(self._table))
         conn_handler.execute(sql, (value, self._id))
+        self._invalidate_row()
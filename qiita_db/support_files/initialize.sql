@@ -35,7 +35,7 @@ INSERT INTO qiita.required_sample_info_status (status) VALUES ('received'), ('in
 INSERT INTO qiita.filepath_type (filepath_type) VALUES ('raw_sequences'), ('raw_barcodes'), ('raw_spectra'), ('preprocessed_sequences'), ('preprocessed_sequences_qual'), ('biom'), ('directory'), ('plain_text');
 
 -- Populate checksum_algorithm table
-INSERT INTO qiita.checksum_algorithm (name) VALUES ('crc32');
+INSERT INTO qiita.checksum_algorithm (name) VALUES ('crc32'), ('md5'), ('sha1'), ('sha256');
 
 -- Populate commands available
 INSERT INTO qiita.command (name, command, input, required, optional, output) VALUES 
@@ -400,6 +400,7 @@ CREATE TABLE qiita.filepath (
 	filepath_type_id     bigint  NOT NULL,
 	checksum             varchar  NOT NULL,
 	checksum_algorithm_id bigint  NOT NULL,
+	size                 bigint  ,
 	CONSTRAINT pk_filepath PRIMARY KEY ( filepath_id ),
 	CONSTRAINT fk_filepath FOREIGN KEY ( filepath_type_id ) REFERENCES qiita.filepath_type( filepath_type_id )    ,
 	CONSTRAINT fk_filepath_0 FOREIGN KEY ( checksum_algorithm_id ) REFERENCES qiita.checksum_algorithm( checksum_algorithm_id )    
@@ -407,6 +408,12 @@ CREATE TABLE qiita.filepath (
 
 CREATE INDEX idx_filepath ON qiita.filepath ( filepath_type_id );
 
+CREATE INDEX idx_filepath_checksum ON qiita.filepath ( checksum, checksum_algorithm_id );
+
+CREATE INDEX idx_filepath_size ON qiita.filepath ( size );
+
+COMMENT ON COLUMN qiita.filepath.size IS 'Size of the file in bytes, used to find the stored files with the same contents. Null for directories';
+
 CREATE TABLE qiita.investigation ( 
 	investigation_id     bigserial  NOT NULL,
 	name                 varchar  NOT NULL,
@@ -792,6 +799,52 @@ CREATE INDEX idx_job_results_filepath_1 ON qiita.job_results_filepath ( filepath
 
 COMMENT ON TABLE qiita.job_results_filepath IS 'Holds connection between jobs and the result filepaths';
 
+CREATE TABLE qiita.job_timing ( 
+	job_id               bigint  NOT NULL,
+	queued               timestamp  NOT NULL,
+	started              timestamp  NOT NULL,
+	finished             timestamp  NOT NULL,
+	CONSTRAINT pk_job_timing PRIMARY KEY ( job_id ),
+	CONSTRAINT fk_job_timing FOREIGN KEY ( job_id ) REFERENCES qiita.job( job_id )    
+ );
+
+COMMENT ON TABLE qiita.job_timing IS 'Holds when each job was queued to run, started and finished. The queue time is started - queued, the run time finished - started and the wall time finished - queued';
+
+CREATE TABLE qiita.job_resource_usage ( 
+	job_id               bigint  NOT NULL,
+	wall_time            float8  NOT NULL,
+	user_time            float8  NOT NULL,
+	system_time          float8  NOT NULL,
+	max_rss              bigint  NOT NULL,
+	CONSTRAINT pk_job_resource_usage PRIMARY KEY ( job_id ),
+	CONSTRAINT fk_job_resource_usage FOREIGN KEY ( job_id ) REFERENCES qiita.job( job_id )    
+ );
+
+COMMENT ON TABLE qiita.job_resource_usage IS 'Holds the resources used by the command of each job that ran successfully, to plan the capacity of the cluster';
+
+COMMENT ON COLUMN qiita.job_resource_usage.wall_time IS 'Seconds the command ran for';
+
+COMMENT ON COLUMN qiita.job_resource_usage.user_time IS 'Seconds of CPU time spent in user mode by the command and its children';
+
+COMMENT ON COLUMN qiita.job_resource_usage.system_time IS 'Seconds of CPU time spent in kernel mode by the command and its children';
+
+COMMENT ON COLUMN qiita.job_resource_usage.max_rss IS 'Peak resident memory of the command, or of its largest child, in KB';
+
+CREATE TABLE qiita.job_result_cache ( 
+	cache_key            varchar  NOT NULL,
+	job_id               bigint  NOT NULL,
+	created              timestamp  NOT NULL,
+	last_used            timestamp  NOT NULL,
+	CONSTRAINT pk_job_result_cache PRIMARY KEY ( cache_key ),
+	CONSTRAINT fk_job_result_cache FOREIGN KEY ( job_id ) REFERENCES qiita.job( job_id )    
+ );
+
+CREATE INDEX idx_job_result_cache ON qiita.job_result_cache ( job_id );
+
+COMMENT ON TABLE qiita.job_result_cache IS 'Finished jobs whose results are reused by the jobs running the same command, with the same options, on the same input files';
+
+COMMENT ON COLUMN qiita.job_result_cache.cache_key IS 'Hash of the command, the options and the checksums of the input files';
+
 CREATE TABLE qiita.required_sample_info ( 
 	study_id             bigint  NOT NULL,
 	sample_id            varchar  NOT NULL,
@@ -37,8 +37,8 @@ class TestAnalysis(TestCase):
         self.assertEqual(new.id, 3)
         sql = "SELECT * FROM qiita.analysis WHERE analysis_id = 3"
         obs = self.conn_handler.execute_fetchall(sql)
-        self.assertEqual(obs, [[3, 'admin@foo.bar', 'newAnalysis',
-                                'A New Analysis', 1, None]])
+        self.assertEqual(obs, [(3, 'admin@foo.bar', 'newAnalysis',
+                                'A New Analysis', 1, None)])
 
     def test_create_parent(self):
         new = Analysis.create(User("admin@foo.bar"), "newAnalysis",
@@ -46,12 +46,14 @@ class TestAnalysis(TestCase):
         self.assertEqual(new.id, 3)
         sql = "SELECT * FROM qiita.analysis WHERE analysis_id = 3"
         obs = self.conn_handler.execute_fetchall(sql)
-        self.assertEqual(obs, [[3, 'admin@foo.bar', 'newAnalysis',
-                                'A New Analysis', 1, None]])
+        self.assertEqual(obs, [(3, 'admin@foo.bar', 'newAnalysis',
+                                'A New Analysis', 1, None)])
 
         sql = "SELECT * FROM qiita.analysis_chain WHERE child_id = 3"
         obs = self.conn_handler.execute_fetchall(sql)
-        self.assertEqual(obs, [[1, 3]])
+        self.assertEqual(obs, [(1, 3)])
+        self.assertEqual(new.parents, [1])
+        self.assertEqual(self.analysis.parents, [])
 
     def test_retrieve_owner(self):
         self.assertEqual(self.analysis.owner, "test@foo.bar")
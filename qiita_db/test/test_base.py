@@ -10,10 +10,11 @@ from unittest import TestCase, main
 
 from qiita_core.exceptions import IncompetentQiitaDeveloperError
 from qiita_core.util import qiita_test_checker
-from qiita_db.base import QiitaObject, QiitaStatusObject
+from qiita_db.base import QiitaObject, QiitaStatusObject, hydration_cache
 from qiita_db.exceptions import QiitaDBUnknownIDError
 from qiita_db.data import RawData
-from qiita_db.study import Study
+from qiita_db.study import Study, StudyPerson
+from qiita_db.user import User
 
 
 @qiita_test_checker()
@@ -51,6 +52,30 @@ class QiitaBaseTest(TestCase):
         self.assertTrue(self.tester._check_id(1))
         self.assertFalse(self.tester._check_id(100))
 
+    def test_from_ids(self):
+        """from_ids builds all the objects in the given order"""
+        obs = RawData.from_ids([2, 1])
+        self.assertEqual(obs, [RawData(2), RawData(1)])
+        self.assertEqual(RawData.from_ids([]), [])
+
+    def test_from_ids_error(self):
+        """from_ids raises an error if any id does not exist"""
+        with self.assertRaises(QiitaDBUnknownIDError):
+            RawData.from_ids([1, 10])
+
+    def test_from_ids_trusted(self):
+        """from_ids does not check the ids if they are trusted"""
+        obs = RawData.from_ids([1, 10], trusted=True)
+        self.assertEqual([x.id for x in obs], [1, 10])
+        self.assertTrue(isinstance(obs[1], RawData))
+
+    def test_from_ids_user(self):
+        """from_ids works with objects not keyed by {table}_id"""
+        obs = User.from_ids(['test@foo.bar'])
+        self.assertEqual(obs, [User('test@foo.bar')])
+        with self.assertRaises(QiitaDBUnknownIDError):
+            User.from_ids(['nope@foo.bar'])
+
     def test_equal_self(self):
         """Equality works with the same object"""
         self.assertEqual(self.tester, self.tester)
@@ -71,6 +96,80 @@ class QiitaBaseTest(TestCase):
         self.assertNotEqual(self.tester, new)
 
 
+@qiita_test_checker()
+class HydrationCacheTest(TestCase):
+    """Tests the caching of the object rows"""
+
+    def setUp(self):
+        self.title = 'Identification of the Microbiomes for Cannabis Soils'
+
+    def test_get_row(self):
+        """_get_row returns the whole row of the object"""
+        obs = Study(1)._get_row()
+        self.assertEqual(obs['study_id'], 1)
+        self.assertEqual(obs['study_title'], self.title)
+        obs = User('test@foo.bar')._get_row()
+        self.assertEqual(obs['email'], 'test@foo.bar')
+
+    def test_no_cache(self):
+        """Without an active cache the rows are always read from the DB"""
+        study = Study(1)
+        self.conn_handler.execute(
+            "UPDATE qiita.study SET study_title = 'foo' WHERE study_id = 1")
+        self.assertEqual(study.title, 'foo')
+
+    def test_cache(self):
+        """Inside a cache block the row is only read once"""
+        study = Study(1)
+        with hydration_cache():
+            self.assertEqual(study.title, self.title)
+            # Changes made behind the object's back are not seen
+            self.conn_handler.execute(
+                "UPDATE qiita.study SET study_title = 'foo' WHERE "
+                "study_id = 1")
+            self.assertEqual(study.title, self.title)
+        self.assertEqual(study.title, 'foo')
+
+    def test_cache_ttl(self):
+        """Rows older than the ttl are read again"""
+        study = Study(1)
+        with hydration_cache(ttl=0):
+            self.assertEqual(study.title, self.title)
+            self.conn_handler.execute(
+                "UPDATE qiita.study SET study_title = 'foo' WHERE "
+                "study_id = 1")
+            self.assertEqual(study.title, 'foo')
+
+    def test_cache_setter_invalidates(self):
+        """Setters drop the cached row"""
+        person = StudyPerson(1)
+        with hydration_cache():
+            self.assertEqual(person.name, 'LabDude')
+            person.address = '123 fake st'
+            self.assertEqual(person.address, '123 fake st')
+
+    def test_cache_nested(self):
+        """Nested blocks share the outermost cache"""
+        with hydration_cache() as outer:
+            with hydration_cache() as inner:
+                self.assertTrue(inner is outer)
+
+    def test_hydrate(self):
+        """hydrate loads all the rows with a single query"""
+        with hydration_cache() as cache:
+            Study.hydrate([1])
+            self.assertEqual(cache.get(('study', 1))['study_title'],
+                             self.title)
+            User.hydrate(['test@foo.bar', 'shared@foo.bar'])
+            self.assertEqual(
+                cache.get(('qiita_user', 'shared@foo.bar'))['email'],
+                'shared@foo.bar')
+
+    def test_hydrate_no_cache(self):
+        """hydrate does nothing if there is no active cache"""
+        Study.hydrate([1])
+
+
 @qiita_test_checker()
 class QiitaStatusObjectTest(TestCase):
     """Tests that the QittaStatusObject class functions act correctly"""
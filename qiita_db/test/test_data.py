@@ -9,7 +9,7 @@
 from unittest import TestCase, main
 from datetime import datetime
 from os import close, remove
-from os.path import join, basename, exists
+from os.path import join, basename, exists, samefile
 from tempfile import mkstemp
 
 from qiita_core.util import qiita_test_checker
@@ -63,13 +63,13 @@ class RawDataTests(TestCase):
         obs = self.conn_handler.execute_fetchall(
             "SELECT * FROM qiita.raw_data WHERE raw_data_id=3")
         # raw_data_id, filetype, submitted_to_insdc
-        self.assertEqual(obs, [[3, 2]])
+        self.assertEqual(obs, [(3, 2)])
 
         # Check that the raw data have been correctly linked with the study
         obs = self.conn_handler.execute_fetchall(
             "SELECT * FROM qiita.study_raw_data WHERE raw_data_id=3")
         # study_id , raw_data_id
-        self.assertEqual(obs, [[1, 3]])
+        self.assertEqual(obs, [(1, 3)])
 
         # Check that the files have been copied to right location
         exp_seqs_fp = join(self.db_test_raw_dir,
@@ -87,15 +87,73 @@ class RawDataTests(TestCase):
             "SELECT * FROM qiita.filepath WHERE filepath_id=10 or "
             "filepath_id=11")
         # filepath_id, path, filepath_type_id
-        exp = [[10, exp_seqs_fp, 1, '852952723', 1],
-               [11, exp_bc_fp, 2, '852952723', 1]]
+        exp = [(10, exp_seqs_fp, 1, '852952723', 1, 1),
+               (11, exp_bc_fp, 2, '852952723', 1, 1)]
         self.assertEqual(obs, exp)
 
         # Check that the raw data have been correctly linked with the filepaths
         obs = self.conn_handler.execute_fetchall(
             "SELECT * FROM qiita.raw_filepath WHERE raw_data_id=3")
         # raw_data_id, filepath_id
-        self.assertEqual(obs, [[3, 10], [3, 11]])
+        self.assertEqual(obs, [(3, 10), (3, 11)])
+
+    def test_create_deduplicates(self):
+        """Files with the same contents as a stored file share its data"""
+        RawData.create(self.filetype, self.filepaths, self.studies)
+        seqs_fp = join(self.db_test_raw_dir, "3_%s" % basename(self.seqs_fp))
+        bc_fp = join(self.db_test_raw_dir, "3_%s" % basename(self.barcodes_fp))
+        self._clean_up_files.extend([seqs_fp, bc_fp])
+
+        fd, new_fp = mkstemp(suffix='_seqs.fastq')
+        close(fd)
+        with open(new_fp, 'w') as f:
+            f.write("\n")
+        RawData.create(self.filetype, [(new_fp, 1)], self.studies)
+        obs_fp = join(self.db_test_raw_dir, "4_%s" % basename(new_fp))
+        self._clean_up_files.append(obs_fp)
+        self.assertFalse(exists(new_fp))
+        self.assertTrue(samefile(obs_fp, seqs_fp) or samefile(obs_fp, bc_fp))
+        obs = self.conn_handler.execute_fetchone(
+            "SELECT checksum FROM qiita.filepath WHERE filepath = %s",
+            (obs_fp, ))
+        self.assertEqual(obs[0], '852952723')
+
+        # Removing one of the files does not affect the others
+        remove(obs_fp)
+        self._clean_up_files.remove(obs_fp)
+        self.assertTrue(exists(seqs_fp))
+        self.assertTrue(exists(bc_fp))
+
+    def test_create_rollback(self):
+        """The files are left untouched if the transaction rolls back"""
+        with self.assertRaises(ValueError):
+            with self.conn_handler.transaction():
+                RawData.create(self.filetype, self.filepaths, self.studies)
+                raise ValueError()
+        self.assertFalse(exists(join(self.db_test_raw_dir,
+                                     "3_%s" % basename(self.seqs_fp))))
+        self.assertFalse(exists(join(self.db_test_raw_dir,
+                                     "3_%s" % basename(self.barcodes_fp))))
+        self.assertTrue(exists(self.seqs_fp))
+        self.assertTrue(exists(self.barcodes_fp))
+        self._clean_up_files.extend([self.seqs_fp, self.barcodes_fp])
+
+    def test_create_existing_keeps_stored(self):
+        """Does not overwrite the files already at the destination"""
+        stored_fp = join(self.db_test_raw_dir,
+                         "3_%s" % basename(self.seqs_fp))
+        with open(stored_fp, 'w') as f:
+            f.write("Already stored")
+        self._clean_up_files.extend([stored_fp, self.seqs_fp,
+                                     self.barcodes_fp])
+        with self.assertRaises(OSError):
+            RawData.create(self.filetype, self.filepaths, self.studies)
+        with open(stored_fp) as f:
+            self.assertEqual(f.read(), "Already stored")
+        self.assertFalse(exists(join(self.db_test_raw_dir,
+                                     "3_%s" % basename(self.barcodes_fp))))
+        self.assertTrue(exists(self.seqs_fp))
+        self.assertTrue(exists(self.barcodes_fp))
 
     def test_get_filepaths(self):
         """Correctly returns the filepaths to the raw files"""
@@ -153,14 +211,14 @@ class PreprocessedDataTests(TestCase):
             "preprocessed_data_id=3")
         # preprocessed_data_id, raw_data_id, preprocessed_params_tables,
         # preprocessed_params_id
-        exp = [[3, "preprocessed_sequence_illumina_params", 1, False]]
+        exp = [(3, "preprocessed_sequence_illumina_params", 1, False)]
         self.assertEqual(obs, exp)
 
         # Check that the preprocessed data has been linked with its study
         obs = self.conn_handler.execute_fetchall(
             "SELECT * FROM qiita.study_preprocessed_data WHERE "
             "preprocessed_data_id=3")
-        exp = [[1, 3]]
+        exp = [(1, 3)]
         self.assertEqual(obs, exp)
 
         # Check that the files have been copied to right location
@@ -179,8 +237,8 @@ class PreprocessedDataTests(TestCase):
             "SELECT * FROM qiita.filepath WHERE filepath_id=10 or "
             "filepath_id=11")
         # filepath_id, path, filepath_type_id
-        exp = [[10, exp_fna_fp, 4, '852952723', 1],
-               [11, exp_qual_fp, 5, '852952723', 1]]
+        exp = [(10, exp_fna_fp, 4, '852952723', 1, 1),
+               (11, exp_qual_fp, 5, '852952723', 1, 1)]
         self.assertEqual(obs, exp)
 
         # Check that the preprocessed data have been correctly
@@ -189,7 +247,7 @@ class PreprocessedDataTests(TestCase):
             "SELECT * FROM qiita.preprocessed_filepath WHERE "
             "preprocessed_data_id=3")
         # preprocessed_data_id, filepath_id
-        self.assertEqual(obs, [[3, 10], [3, 11]])
+        self.assertEqual(obs, [(3, 10), (3, 11)])
 
     def test_create_error(self):
         """Raises an error if the preprocessed_params_table does not exist"""
@@ -269,7 +327,7 @@ class ProcessedDataTests(TestCase):
             "SELECT * FROM qiita.processed_data WHERE processed_data_id=2")
         # processed_data_id, preprocessed_data_id, processed_params_table,
         # processed_params_id, processed_date
-        exp = [[2, "processed_params_uclust", 1, self.date]]
+        exp = [(2, "processed_params_uclust", 1, self.date)]
         self.assertEqual(obs, exp)
 
         # Check that the files have been copied to right location
@@ -282,7 +340,7 @@ class ProcessedDataTests(TestCase):
         obs = self.conn_handler.execute_fetchall(
             "SELECT * FROM qiita.filepath WHERE filepath_id=10")
         # Filepath_id, path, filepath_type_id
-        exp = [[10, exp_biom_fp, 6, '852952723', 1]]
+        exp = [(10, exp_biom_fp, 6, '852952723', 1, 1)]
         self.assertEqual(obs, exp)
 
         # Check that the processed data have been correctly linked
@@ -290,7 +348,7 @@ class ProcessedDataTests(TestCase):
         obs = self.conn_handler.execute_fetchall(
             "SELECT * FROM qiita.processed_filepath WHERE processed_data_id=2")
         # processed_data_id, filepath_id
-        self.assertEqual(obs, [[2, 10]])
+        self.assertEqual(obs, [(2, 10)])
 
         # Check that the processed data have been correctly linked with the
         # study
@@ -298,7 +356,7 @@ class ProcessedDataTests(TestCase):
             "SELECT * FROM qiita.study_processed_data WHERE "
             "processed_data_id=2")
         # study_id, processed_data
-        self.assertEqual(obs, [[1, 2]])
+        self.assertEqual(obs, [(1, 2)])
 
         # Check that the processed data have been correctly linked with the
         # preprocessed data
@@ -306,7 +364,7 @@ class ProcessedDataTests(TestCase):
             "SELECT * FROM qiita.preprocessed_processed_data WHERE "
             "processed_data_id=2")
         # preprocessed_data_id, processed_Data_id
-        self.assertEqual(obs, [[1, 2]])
+        self.assertEqual(obs, [(1, 2)])
 
     def test_create_no_date(self):
         """Correctly adds a processed data with no date on it"""
@@ -338,7 +396,7 @@ class ProcessedDataTests(TestCase):
             "SELECT * FROM qiita.processed_data WHERE processed_data_id=2")
         # processed_data_id, preprocessed_data_id, processed_params_table,
         # processed_params_id, processed_date
-        exp = [[2, "processed_params_uclust", 1, self.date]]
+        exp = [(2, "processed_params_uclust", 1, self.date)]
         self.assertEqual(obs, exp)
 
         # Check that the files have been copied to right location
@@ -351,7 +409,7 @@ class ProcessedDataTests(TestCase):
         obs = self.conn_handler.execute_fetchall(
             "SELECT * FROM qiita.filepath WHERE filepath_id=10")
         # Filepath_id, path, filepath_type_id
-        exp = [[10, exp_biom_fp, 6, '852952723', 1]]
+        exp = [(10, exp_biom_fp, 6, '852952723', 1, 1)]
         self.assertEqual(obs, exp)
 
         # Check that the processed data have been correctly linked
@@ -359,7 +417,7 @@ class ProcessedDataTests(TestCase):
         obs = self.conn_handler.execute_fetchall(
             "SELECT * FROM qiita.processed_filepath WHERE processed_data_id=2")
         # processed_data_id, filepath_id
-        self.assertTrue(obs, [[2, 10]])
+        self.assertTrue(obs, [(2, 10)])
 
         # Check that the processed data have been correctly linked with the
         # study
@@ -367,7 +425,7 @@ class ProcessedDataTests(TestCase):
             "SELECT * FROM qiita.study_processed_data WHERE "
             "processed_data_id=2")
         # study_id, processed_data
-        self.assertEqual(obs, [[1, 2]])
+        self.assertEqual(obs, [(1, 2)])
 
     def test_create_params_table_error(self):
         """Raises an error if the processed_params_table does not exist"""
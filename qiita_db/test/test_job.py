@@ -7,13 +7,14 @@
 # -----------------------------------------------------------------------------
 
 from unittest import TestCase, main
-from os import remove
+from os import remove, close
 from os.path import join
 from shutil import rmtree
-from datetime import datetime
+from datetime import datetime, timedelta
+from tempfile import mkstemp
 
 from qiita_core.util import qiita_test_checker
-from qiita_db.job import Job, Command
+from qiita_db.job import Job, Command, evict_cached_results
 from qiita_db.util import get_db_files_base_dir
 from qiita_db.analysis import Analysis
 from qiita_db.exceptions import QiitaDBDuplicateError, QiitaDBStatusError
@@ -80,14 +81,14 @@ class JobTest(TestCase):
         # make sure job inserted correctly
         obs = self.conn_handler.execute_fetchall("SELECT * FROM qiita.job "
                                                  "WHERE job_id = 4")
-        exp = [[4, 2, 1, 3, '{"option1":false,"option2":25,"option3":"NEW"}',
-                None]]
+        exp = [(4, 2, 1, 3, '{"option1":false,"option2":25,"option3":"NEW"}',
+                None)]
         self.assertEqual(obs, exp)
         # make sure job added to analysis correctly
         obs = self.conn_handler.execute_fetchall("SELECT * FROM "
                                                  "qiita.analysis_job WHERE "
                                                  "job_id = 4")
-        exp = [[1, 4]]
+        exp = [(1, 4)]
         self.assertEqual(obs, exp)
 
         # make second job with diff datatype and command to test column insert
@@ -97,14 +98,14 @@ class JobTest(TestCase):
         # make sure job inserted correctly
         obs = self.conn_handler.execute_fetchall("SELECT * FROM qiita.job "
                                                  "WHERE job_id = 5")
-        exp = [[5, 1, 1, 2, '{"option1":false,"option2":25,"option3":"NEW"}',
-                None]]
+        exp = [(5, 1, 1, 2, '{"option1":false,"option2":25,"option3":"NEW"}',
+                None)]
         self.assertEqual(obs, exp)
         # make sure job added to analysis correctly
         obs = self.conn_handler.execute_fetchall("SELECT * FROM "
                                                  "qiita.analysis_job WHERE "
                                                  "job_id = 5")
-        exp = [[1, 5]]
+        exp = [(1, 5)]
         self.assertEqual(obs, exp)
 
     # def test_create_exists(self):
@@ -130,6 +131,92 @@ class JobTest(TestCase):
                                  '1_summarize_taxa_through_plots.py'
                                  '_output_dir')})
 
+    def test_retrieve_outputs(self):
+        self.assertEqual(self.job.outputs, {
+            '--output_dir': join(get_db_files_base_dir(), 'job/'
+                                 '1_summarize_taxa_through_plots.py'
+                                 '_output_dir')})
+
+    def test_timing(self):
+        self.assertEqual(self.job.timing, None)
+        times = (datetime(2014, 6, 1, 10), datetime(2014, 6, 1, 11),
+                 datetime(2014, 6, 1, 12))
+        self.job.set_timing(*times)
+        self.assertEqual(self.job.timing, times)
+        # Recording them again replaces the previous ones
+        self.job.set_timing(times[1], times[1], times[2])
+        self.assertEqual(self.job.timing, (times[1], times[1], times[2]))
+
+    def test_resource_usage(self):
+        self.assertEqual(self.job.resource_usage, None)
+        usage = {'wall_time': 12.5, 'user_time': 10.25, 'system_time': 0.5,
+                 'max_rss': 2048}
+        self.job.set_resource_usage(**usage)
+        self.assertEqual(self.job.resource_usage, usage)
+        # Recording them again replaces the previous ones
+        usage['max_rss'] = 4096
+        self.job.set_resource_usage(**usage)
+        self.assertEqual(self.job.resource_usage, usage)
+
+    def _write_tmp(self, contents):
+        fd, fp = mkstemp()
+        close(fd)
+        with open(fp, 'w') as f:
+            f.write(contents)
+        self._delete_path.append(fp)
+        return fp
+
+    def test_result_key(self):
+        same = Job.create("16S", "Summarize Taxa", {"--otu_table_fp": 1},
+                          Analysis(1))
+        self.assertEqual(same.result_key(), self.job.result_key())
+        other = Job.create("16S", "Summarize Taxa", {"--otu_table_fp": 2},
+                           Analysis(1))
+        self.assertNotEqual(other.result_key(), self.job.result_key())
+
+    def test_result_key_input_files(self):
+        """The key depends on the contents of the inputs, not their paths"""
+        fp1 = self._write_tmp("a mapping file")
+        fp2 = self._write_tmp("a mapping file")
+        fp3 = self._write_tmp("another mapping file")
+        jobs = [Job.create("16S", "Beta Diversity",
+                           {"--otu_table_fp": 1, "--mapping_fp": fp},
+                           Analysis(1)) for fp in (fp1, fp2, fp3)]
+        keys = [job.result_key() for job in jobs]
+        self.assertEqual(keys[0], keys[1])
+        self.assertNotEqual(keys[0], keys[2])
+
+    def test_cache_results(self):
+        key = self.job.result_key()
+        self.assertEqual(Job.get_cached(key), None)
+        self.job.cache_results(key)
+        self.assertEqual(Job.get_cached(key), self.job)
+        obs = self.conn_handler.execute_fetchone(
+            "SELECT job_id FROM qiita.job_result_cache WHERE "
+            "cache_key = %s", (key, ))
+        self.assertEqual(obs[0], 1)
+
+    def test_link_results(self):
+        new = Job.create("16S", "Summarize Taxa", {"--otu_table_fp": 1},
+                         Analysis(1))
+        new.link_results(self.job)
+        self.assertEqual(new.results, self.job.results)
+
+    def test_evict_cached_results(self):
+        self.job.cache_results('key1')
+        Job(2).cache_results('key2')
+        results = Job(2).results
+        self.assertEqual(evict_cached_results(timedelta(days=1)), 0)
+        # Only the results not used recently are evicted
+        self.conn_handler.execute(
+            "UPDATE qiita.job_result_cache SET last_used = %s WHERE "
+            "cache_key = 'key2'", (datetime.now() - timedelta(days=2), ))
+        self.assertEqual(evict_cached_results(timedelta(days=1)), 1)
+        self.assertEqual(Job.get_cached('key2'), None)
+        self.assertEqual(Job.get_cached('key1'), self.job)
+        # They still belong to their job
+        self.assertEqual(Job(2).results, results)
+
     def test_retrieve_results(self):
         self.assertEqual(self.job.results, [join("job", "1_job_result.txt")])
 
@@ -172,7 +259,7 @@ class JobTest(TestCase):
         obs = self.conn_handler.execute_fetchall(
             "SELECT * FROM qiita.job_results_filepath WHERE job_id = 1")
 
-        self.assertEqual(obs, [[1, 8], [1, 10]])
+        self.assertEqual(obs, [(1, 8), (1, 10)])
 
     def test_add_results_dir(self):
         # Create a test directory
@@ -184,7 +271,7 @@ class JobTest(TestCase):
         # make sure files attached to job properly
         obs = self.conn_handler.execute_fetchall(
             "SELECT * FROM qiita.job_results_filepath WHERE job_id = 1")
-        self.assertEqual(obs, [[1, 8], [1, 10]])
+        self.assertEqual(obs, [(1, 8), (1, 10)])
 
     def test_add_results_completed(self):
         self.job.status = "completed"
@@ -15,6 +15,7 @@ from os.path import join, basename
 from collections import Iterable
 
 import pandas as pd
+import numpy as np
 
 from qiita_core.util import qiita_test_checker
 from qiita_core.exceptions import IncompetentQiitaDeveloperError
@@ -26,9 +27,9 @@ from qiita_db.user import User
 from qiita_db.data import RawData
 from qiita_db.util import exists_table, get_db_files_base_dir
 from qiita_db.metadata_template import (_get_datatypes, _as_python_types,
-                                        MetadataTemplate, SampleTemplate,
-                                        PrepTemplate, BaseSample, PrepSample,
-                                        Sample)
+                                        _as_python_rows, MetadataTemplate,
+                                        SampleTemplate, PrepTemplate,
+                                        BaseSample, PrepSample, Sample)
 
 
 class TestUtilMetadataMap(TestCase):
@@ -57,6 +58,16 @@ class TestUtilMetadataMap(TestCase):
                [1, 2, 3]]
         self.assertEqual(obs, exp)
 
+    def test_as_python_rows(self):
+        """Correctly returns the rows as tuples of python types"""
+        obs = list(_as_python_rows(self.metadata_map, self.headers, 1))
+        exp = [(1, 'Sample1', 2.1, 'str1', 1),
+               (1, 'Sample2', 3.1, '200', 2),
+               (1, 'Sample3', 3, 'string30', 3)]
+        self.assertEqual(sorted(obs), exp)
+        for row in obs:
+            self.assertFalse(any(isinstance(v, np.generic) for v in row))
+
 
 @qiita_test_checker()
 class TestBaseSample(TestCase):
@@ -198,6 +209,13 @@ class TestSample(TestCase):
         self.assertTrue(isinstance(obs, Iterable))
         self.assertEqual(set(obs), self.exp_categories)
 
+    def test_keys_values_order(self):
+        """keys, values and items follow the same category order"""
+        keys = list(self.tester.keys())
+        self.assertEqual(list(self.tester.keys()), keys)
+        self.assertEqual(list(self.tester.items()),
+                         list(zip(keys, self.tester.values())))
+
     def test_values(self):
         """values returns an iterator over the values"""
         obs = self.tester.values()
@@ -371,6 +389,13 @@ class TestPrepSample(TestCase):
         self.assertTrue(isinstance(obs, Iterable))
         self.assertEqual(set(obs), self.exp_categories)
 
+    def test_keys_values_order(self):
+        """keys, values and items follow the same category order"""
+        keys = list(self.tester.keys())
+        self.assertEqual(list(self.tester.keys()), keys)
+        self.assertEqual(list(self.tester.items()),
+                         list(zip(keys, self.tester.values())))
+
     def test_values(self):
         """values returns an iterator over the values"""
         obs = self.tester.values()
@@ -581,22 +606,22 @@ class TestSampleTemplate(TestCase):
         # study_id sample_id physical_location has_physical_specimen
         # has_extracted_data sample_type required_sample_info_status_id
         # collection_timestamp host_subject_id description
-        exp = [[2, "Sample1", "location1", True, True, "type1", 1,
+        exp = [(2, "Sample1", "location1", True, True, "type1", 1,
                 datetime(2014, 5, 29, 12, 24, 51), "NotIdentified",
-                "Test Sample 1"],
-               [2, "Sample2", "location1", True, True, "type1", 1,
+                "Test Sample 1"),
+               (2, "Sample2", "location1", True, True, "type1", 1,
                 datetime(2014, 5, 29, 12, 24, 51), "NotIdentified",
-                "Test Sample 2"],
-               [2, "Sample3", "location1", True, True, "type1", 1,
+                "Test Sample 2"),
+               (2, "Sample3", "location1", True, True, "type1", 1,
                 datetime(2014, 5, 29, 12, 24, 51), "NotIdentified",
-                "Test Sample 3"]]
+                "Test Sample 3")]
         self.assertEqual(obs, exp)
 
         # The relevant rows have been added to the study_sample_columns
         obs = self.conn_handler.execute_fetchall(
             "SELECT * FROM qiita.study_sample_columns WHERE study_id=2")
         # study_id, column_name, column_type
-        exp = [[2, "str_column", "varchar"]]
+        exp = [(2, "str_column", "varchar")]
         self.assertEqual(obs, exp)
 
         # The new table exists
@@ -606,9 +631,9 @@ class TestSampleTemplate(TestCase):
         obs = self.conn_handler.execute_fetchall(
             "SELECT * FROM qiita.sample_2")
         # sample_id, str_column
-        exp = [['Sample1', "Value for sample 1"],
-               ['Sample2', "Value for sample 2"],
-               ['Sample3', "Value for sample 3"]]
+        exp = [('Sample1', "Value for sample 1"),
+               ('Sample2', "Value for sample 2"),
+               ('Sample3', "Value for sample 3")]
         self.assertEqual(obs, exp)
 
     def test_exists_true(self):
@@ -752,6 +777,47 @@ class TestSampleTemplate(TestCase):
         """get returns none if the sample id is not present"""
         self.assertTrue(self.tester.get('Not_a_Sample') is None)
 
+    def test_get_category(self):
+        """get_category returns the values of a category for all samples"""
+        obs = self.tester.get_category('SEASON_ENVIRONMENT')
+        self.assertEqual(len(obs), 27)
+        self.assertEqual(set(obs.values()), {'winter'})
+        obs = self.tester.get_category('host_subject_id')
+        self.assertEqual(obs['SKB8.640193'], '1001:M7')
+        self.assertEqual(obs['SKD8.640184'], '1001:D9')
+
+    def test_get_category_error(self):
+        """get_category raises an error if the category does not exist"""
+        with self.assertRaises(KeyError):
+            self.tester.get_category('Not_a_Category')
+
+    def test_get_categories(self):
+        """get_categories returns the values of the categories requested"""
+        obs = self.tester.get_categories(['physical_location', 'DEPTH'])
+        self.assertEqual(len(obs), 27)
+        self.assertEqual(obs['SKB8.640193'],
+                         {'physical_location': 'ANL', 'depth': 0.15})
+
+    def test_get_categories_error(self):
+        """get_categories raises an error if any category does not exist"""
+        with self.assertRaises(KeyError):
+            self.tester.get_categories(['depth', 'Not_a_Category'])
+
+    def test_to_dataframe(self):
+        """to_dataframe returns all the metadata indexed by sample id"""
+        st = SampleTemplate.create(self.metadata, self.new_study)
+        obs = st.to_dataframe()
+        self.assertEqual(list(obs.index), ['Sample1', 'Sample2', 'Sample3'])
+        self.assertEqual(list(obs.columns), [
+            'collection_timestamp', 'description', 'has_extracted_data',
+            'has_physical_specimen', 'host_subject_id', 'physical_location',
+            'required_sample_info_status_id', 'sample_type', 'str_column'])
+        self.assertEqual(obs.loc['Sample2', 'str_column'],
+                         'Value for sample 2')
+        self.assertEqual(obs.loc['Sample1', 'required_sample_info_status_id'],
+                         1)
+        self.assertTrue(obs.loc['Sample3', 'has_extracted_data'] is True)
+
     def test_to_file(self):
         """to file writes a tab delimited file with all the metadata"""
         fd, fp = mkstemp()
@@ -861,16 +927,16 @@ class TestPrepTemplate(TestCase):
         # raw_data_id, sample_id, center_name, center_project_name,
         # ebi_submission_accession, ebi_study_accession, emp_status_id,
         # data_type_id
-        exp = [[3, 'SKB8.640193', 'ANL', 'Test Project', None, None, 1, 2],
-               [3, 'SKD8.640184', 'ANL', 'Test Project', None, None, 1, 2],
-               [3, 'SKB7.640196', 'ANL', 'Test Project', None, None, 1, 2]]
+        exp = [(3, 'SKB8.640193', 'ANL', 'Test Project', None, None, 1, 2),
+               (3, 'SKD8.640184', 'ANL', 'Test Project', None, None, 1, 2),
+               (3, 'SKB7.640196', 'ANL', 'Test Project', None, None, 1, 2)]
         self.assertEqual(sorted(obs), sorted(exp))
 
         # The relevant rows have been added to the raw_data_prep_columns
         obs = self.conn_handler.execute_fetchall(
             "SELECT * FROM qiita.raw_data_prep_columns WHERE raw_data_id=3")
         # raw_data_id, column_name, column_type
-        exp = [[3, "str_column", "varchar"]]
+        exp = [(3, "str_column", "varchar")]
         self.assertEqual(obs, exp)
 
         # The new table exists
@@ -880,9 +946,9 @@ class TestPrepTemplate(TestCase):
         obs = self.conn_handler.execute_fetchall(
             "SELECT * FROM qiita.prep_3")
         # sample_id, str_column
-        exp = [['SKB8.640193', "Value for sample 1"],
-               ['SKD8.640184', "Value for sample 2"],
-               ['SKB7.640196', "Value for sample 3"]]
+        exp = [('SKB8.640193', "Value for sample 1"),
+               ('SKD8.640184', "Value for sample 2"),
+               ('SKB7.640196', "Value for sample 3")]
         self.assertEqual(sorted(obs), sorted(exp))
 
     def test_exists_true(self):
@@ -1026,6 +1092,31 @@ class TestPrepTemplate(TestCase):
         """get returns none if the sample id is not present"""
         self.assertTrue(self.tester.get('Not_a_Sample') is None)
 
+    def test_get_category(self):
+        """get_category returns the values of a category for all samples"""
+        obs = self.tester.get_category('center_name')
+        self.assertEqual(len(obs), 27)
+        self.assertEqual(set(obs.values()), {'ANL'})
+        obs = self.tester.get_category('BarcodeSequence')
+        self.assertEqual(obs['SKB1.640202'], 'GTCCGCAAGTTA')
+
+    def test_get_categories(self):
+        """get_categories returns the values of the categories requested"""
+        obs = self.tester.get_categories(['emp_status_id',
+                                          'barcodesequence'])
+        self.assertEqual(obs['SKB2.640194'],
+                         {'emp_status_id': 1,
+                          'barcodesequence': 'CGTAGAGCTCTC'})
+
+    def test_to_dataframe(self):
+        """to_dataframe returns all the metadata indexed by sample id"""
+        obs = self.tester.to_dataframe()
+        self.assertEqual(len(obs.index), 27)
+        self.assertEqual(list(obs.index), sorted(obs.index))
+        self.assertEqual(obs.loc['SKB2.640194', 'barcodesequence'],
+                         'CGTAGAGCTCTC')
+        self.assertTrue(obs.loc['SKB2.640194', 'center_project_name'] is None)
+
     def test_to_file(self):
         """to file writes a tab delimited file with all the metadata"""
         fd, fp = mkstemp()
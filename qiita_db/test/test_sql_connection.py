@@ -0,0 +1,306 @@
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014--, The Qiita Development Team.
+#
+# Distributed under the terms of the BSD 3-clause License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# -----------------------------------------------------------------------------
+
+from unittest import TestCase, main
+
+from qiita_core.util import qiita_test_checker
+from qiita_db.sql_connection import (ConnectionPool, SQLConnectionHandler,
+                                     get_connection_pool,
+                                     close_connection_pool, _copy_value,
+                                     _CopyStream)
+from qiita_db.exceptions import (QiitaDBConnectionError,
+                                 QiitaDBExecutionError)
+
+
+class CopyTests(TestCase):
+    def test_copy_value(self):
+        self.assertEqual(_copy_value(None), '\\N')
+        self.assertEqual(_copy_value(True), 't')
+        self.assertEqual(_copy_value(3), '3')
+        self.assertEqual(_copy_value(2.5), '2.5')
+        self.assertEqual(_copy_value(float('nan')), 'NaN')
+        self.assertEqual(_copy_value(float('-inf')), '-Infinity')
+        self.assertEqual(_copy_value('a\tb\\c\nd'), 'a\\tb\\\\c\\nd')
+
+    def test_copy_stream(self):
+        stream = _CopyStream([(1, 'a', None), (2, 'b', 1.5)])
+        self.assertEqual(stream.read(5), '1\ta\t\\')
+        self.assertEqual(stream.read(), 'N\n2\tb\t1.5\n')
+        self.assertEqual(stream.read(), '')
+
+
+@qiita_test_checker()
+class ConnectionPoolTests(TestCase):
+    def setUp(self):
+        self.pool = ConnectionPool(1, 2)
+
+    def tearDown(self):
+        self.pool.closeall()
+
+    def test_init(self):
+        obs = self.pool.stats()
+        self.assertEqual(obs['size'], 1)
+        self.assertEqual(obs['idle'], 1)
+        self.assertEqual(obs['in_use'], 0)
+
+    def test_init_error(self):
+        with self.assertRaises(ValueError):
+            ConnectionPool(3, 2)
+        with self.assertRaises(ValueError):
+            ConnectionPool(0, 0)
+
+    def test_getconn_putconn(self):
+        conn = self.pool.getconn()
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+            self.assertEqual(cur.fetchone()[0], 1)
+        self.assertEqual(self.pool.stats()['in_use'], 1)
+        self.pool.putconn(conn)
+        obs = self.pool.stats()
+        self.assertEqual(obs['in_use'], 0)
+        self.assertEqual(obs['idle'], 1)
+        self.assertEqual(obs['checkouts'], 1)
+        # The same connection is handed out again
+        self.assertTrue(self.pool.getconn() is conn)
+
+    def test_getconn_grows_up_to_max(self):
+        conn1 = self.pool.getconn()
+        conn2 = self.pool.getconn()
+        self.assertFalse(conn1 is conn2)
+        self.assertEqual(self.pool.stats()['size'], 2)
+        with self.assertRaises(QiitaDBConnectionError):
+            self.pool.getconn(timeout=0.1)
+        obs = self.pool.stats()
+        self.assertEqual(obs['waits'], 1)
+        self.assertTrue(obs['wait_time'] > 0)
+
+    def test_getconn_replaces_closed(self):
+        conn = self.pool.getconn()
+        conn.close()
+        self.pool.putconn(conn)
+        self.assertEqual(self.pool.stats()['size'], 0)
+        new_conn = self.pool.getconn()
+        self.assertFalse(new_conn.closed)
+
+    def test_putconn_rollbacks(self):
+        conn = self.pool.getconn()
+        with conn.cursor() as cur:
+            cur.execute("CREATE TEMP TABLE pool_test (a int)")
+        self.pool.putconn(conn)
+        conn = self.pool.getconn()
+        with conn.cursor() as cur:
+            cur.execute("SELECT EXISTS(SELECT * FROM information_schema."
+                        "tables WHERE table_name = 'pool_test')")
+            self.assertFalse(cur.fetchone()[0])
+
+    def test_closeall(self):
+        self.pool.closeall()
+        self.assertEqual(self.pool.stats()['size'], 0)
+        with self.assertRaises(QiitaDBConnectionError):
+            self.pool.getconn()
+
+
+@qiita_test_checker()
+class SQLConnectionHandlerTests(TestCase):
+    def test_pool_stats(self):
+        obs = self.conn_handler.pool_stats()
+        self.conn_handler.execute_fetchone("SELECT 1")
+        if obs is not None:
+            self.assertTrue(
+                self.conn_handler.pool_stats()['checkouts'] > obs['checkouts'])
+            self.assertEqual(self.conn_handler.pool_stats()['in_use'], 0)
+
+    def test_close_connection_pool(self):
+        pool = get_connection_pool()
+        close_connection_pool()
+        if pool is not None:
+            self.assertEqual(pool.stats()['idle'], 0)
+            self.assertFalse(get_connection_pool() is pool)
+        # The handlers created before keep working on the new pool
+        self.assertEqual(self.conn_handler.execute_fetchone("SELECT 1")[0], 1)
+
+    def _count(self):
+        return self.conn_handler.execute_fetchone(
+            "SELECT count(1) FROM qiita.txn_test")[0]
+
+    def test_transaction(self):
+        self.conn_handler.execute("CREATE TABLE qiita.txn_test (a integer)")
+        with self.conn_handler.transaction():
+            self.assertTrue(self.conn_handler.in_transaction)
+            self.conn_handler.execute("INSERT INTO qiita.txn_test VALUES (1)")
+            self.conn_handler.execute("INSERT INTO qiita.txn_test VALUES (2)")
+        self.assertFalse(self.conn_handler.in_transaction)
+        self.assertEqual(self._count(), 2)
+
+    def test_transaction_rollback(self):
+        self.conn_handler.execute("CREATE TABLE qiita.txn_test (a integer)")
+        with self.assertRaises(QiitaDBExecutionError):
+            with self.conn_handler.transaction():
+                self.conn_handler.execute(
+                    "INSERT INTO qiita.txn_test VALUES (1)")
+                self.conn_handler.execute(
+                    "INSERT INTO qiita.txn_test VALUES ('a')")
+        self.assertFalse(self.conn_handler.in_transaction)
+        self.assertEqual(self._count(), 0)
+
+    def test_transaction_savepoint(self):
+        self.conn_handler.execute("CREATE TABLE qiita.txn_test (a integer)")
+        with self.conn_handler.transaction():
+            self.conn_handler.execute("INSERT INTO qiita.txn_test VALUES (1)")
+            with self.assertRaises(QiitaDBExecutionError):
+                with self.conn_handler.transaction():
+                    self.conn_handler.execute(
+                        "INSERT INTO qiita.txn_test VALUES (2)")
+                    self.conn_handler.execute(
+                        "INSERT INTO qiita.txn_test VALUES ('a')")
+            self.conn_handler.execute("INSERT INTO qiita.txn_test VALUES (3)")
+        obs = self.conn_handler.execute_fetchall(
+            "SELECT a FROM qiita.txn_test ORDER BY a")
+        self.assertEqual([x[0] for x in obs], [1, 3])
+
+    def test_transaction_shared_by_handlers(self):
+        self.conn_handler.execute("CREATE TABLE qiita.txn_test (a integer)")
+        with self.assertRaises(ValueError):
+            with self.conn_handler.transaction():
+                self.conn_handler.execute(
+                    "INSERT INTO qiita.txn_test VALUES (1)")
+                # Other handlers see the uncommitted changes
+                self.assertEqual(SQLConnectionHandler().execute_fetchone(
+                    "SELECT count(1) FROM qiita.txn_test")[0], 1)
+                raise ValueError()
+        self.assertEqual(self._count(), 0)
+
+    def test_on_commit(self):
+        called = []
+        with self.conn_handler.transaction():
+            self.conn_handler.on_commit(lambda: called.append('outer'))
+            with self.conn_handler.transaction():
+                self.conn_handler.on_commit(lambda: called.append('inner'))
+            self.conn_handler.on_rollback(lambda: called.append('rollback'))
+            self.assertEqual(called, [])
+        self.assertEqual(called, ['outer', 'inner'])
+        # Outside of a transaction it is called right away
+        self.conn_handler.on_commit(lambda: called.append('now'))
+        self.assertEqual(called, ['outer', 'inner', 'now'])
+
+    def test_on_rollback(self):
+        called = []
+        with self.assertRaises(ValueError):
+            with self.conn_handler.transaction():
+                self.conn_handler.on_rollback(lambda: called.append('outer'))
+                with self.conn_handler.transaction():
+                    self.conn_handler.on_rollback(
+                        lambda: called.append('inner'))
+                self.conn_handler.on_commit(lambda: called.append('commit'))
+                raise ValueError()
+        self.assertEqual(called, ['inner', 'outer'])
+
+    def test_on_rollback_savepoint(self):
+        called = []
+        with self.conn_handler.transaction():
+            with self.assertRaises(ValueError):
+                with self.conn_handler.transaction():
+                    self.conn_handler.on_rollback(
+                        lambda: called.append('rollback'))
+                    self.conn_handler.on_commit(
+                        lambda: called.append('commit'))
+                    raise ValueError()
+            self.assertEqual(called, ['rollback'])
+        # The callbacks of the rolled back block are discarded
+        self.assertEqual(called, ['rollback'])
+
+    def test_row_type(self):
+        sql = "SELECT 1 AS a, 'b' AS b"
+        obs = self.conn_handler.execute_fetchone(sql)
+        self.assertEqual(obs, (1, 'b'))
+        obs = self.conn_handler.execute_fetchone(sql, row_type='dict')
+        self.assertEqual(obs['b'], 'b')
+        self.assertEqual(dict(obs), {'a': 1, 'b': 'b'})
+        obs = self.conn_handler.execute_fetchall(sql, row_type='namedtuple')
+        self.assertEqual(obs[0].a, 1)
+        self.assertEqual(obs, [(1, 'b')])
+
+    def test_row_type_error(self):
+        with self.assertRaises(ValueError):
+            self.conn_handler.execute_fetchall("SELECT 1", row_type='list')
+
+    def test_execute_iter(self):
+        sql = "SELECT a, a * 2 AS b FROM generate_series(1, 25) AS a"
+        obs = list(self.conn_handler.execute_iter(sql, batch_size=10,
+                                                  row_type='dict'))
+        self.assertEqual(len(obs), 25)
+        self.assertEqual(obs[4]['b'], 10)
+        obs = list(self.conn_handler.execute_iter(
+            sql + " WHERE a > %s", (20, ), batch_size=2))
+        self.assertEqual(obs, [(21, 42), (22, 44), (23, 46), (24, 48),
+                               (25, 50)])
+
+    def test_execute_iter_transaction(self):
+        self.conn_handler.execute("CREATE TABLE qiita.txn_test (a integer)")
+        with self.conn_handler.transaction():
+            self.conn_handler.execute("INSERT INTO qiita.txn_test VALUES (1)")
+            obs = list(self.conn_handler.execute_iter(
+                "SELECT a FROM qiita.txn_test"))
+            self.assertEqual(obs, [(1, )])
+        self.assertEqual(self._count(), 1)
+
+    def test_execute_iter_error(self):
+        with self.assertRaises(QiitaDBExecutionError):
+            list(self.conn_handler.execute_iter(
+                "SELECT * FROM qiita.does_not_exist"))
+        # The handler can still be used
+        self.assertEqual(self.conn_handler.execute_fetchone("SELECT 1")[0], 1)
+
+    def test_insert_many(self):
+        self.conn_handler.execute(
+            "CREATE TABLE qiita.insert_test (a serial, b varchar, c float8)")
+        rows = [('b%d' % i, i * 0.5) for i in range(5)]
+        obs = self.conn_handler.insert_many(
+            "qiita.insert_test", ['b', 'c'], rows, returning='a, b',
+            batch_size=2)
+        self.assertEqual(obs, [(i + 1, 'b%d' % i) for i in range(5)])
+        obs = self.conn_handler.execute_fetchall(
+            "SELECT b, c FROM qiita.insert_test ORDER BY a")
+        self.assertEqual(obs, rows)
+        self.assertEqual(self.conn_handler.insert_many(
+            "qiita.insert_test", ['b', 'c'], [("it's; quoted", None)]), None)
+        self.assertEqual(self.conn_handler.execute_fetchone(
+            "SELECT b FROM qiita.insert_test WHERE c IS NULL")[0],
+            "it's; quoted")
+        self.assertEqual(self.conn_handler.insert_many(
+            "qiita.insert_test", ['b'], [], returning='a'), [])
+
+    def test_insert_many_error(self):
+        self.conn_handler.execute("CREATE TABLE qiita.insert_test (a integer)")
+        with self.assertRaises(QiitaDBExecutionError):
+            self.conn_handler.insert_many(
+                "qiita.insert_test", ['a'], [(1, ), (2, ), ('a', )],
+                batch_size=2)
+        # None of the batches is inserted
+        self.assertEqual(self.conn_handler.execute_fetchone(
+            "SELECT count(1) FROM qiita.insert_test")[0], 0)
+
+    def test_copy_from(self):
+        self.conn_handler.execute(
+            "CREATE TABLE qiita.copy_test (a integer, b varchar, c float8)")
+        self.conn_handler.copy_from(
+            "qiita.copy_test", ['a', 'b', 'c'],
+            [(1, 'tab\tvalue', None), (2, None, 2.5)])
+        obs = self.conn_handler.execute_fetchall(
+            "SELECT a, b, c FROM qiita.copy_test ORDER BY a")
+        self.assertEqual([list(x) for x in obs],
+                         [[1, 'tab\tvalue', None], [2, None, 2.5]])
+
+    def test_copy_from_error(self):
+        self.conn_handler.execute("CREATE TABLE qiita.copy_test (a integer)")
+        with self.assertRaises(QiitaDBExecutionError):
+            self.conn_handler.copy_from("qiita.copy_test", ['a'], [('a', )])
+
+
+if __name__ == '__main__':
+    main()
@@ -9,7 +9,9 @@ from qiita_db.base import QiitaObject
 from qiita_db.study import Study, StudyPerson
 from qiita_db.investigation import Investigation
 from qiita_db.user import User
-from qiita_db.exceptions import QiitaDBColumnError, QiitaDBStatusError
+from qiita_db.util import check_count
+from qiita_db.exceptions import (QiitaDBColumnError, QiitaDBStatusError,
+                                 QiitaDBExecutionError)
 
 # -----------------------------------------------------------------------------
 # Copyright (c) 2014--, The Qiita Development Team.
@@ -31,8 +33,8 @@ class TestStudyPerson(TestCase):
         self.assertEqual(new.id, 4)
         obs = self.conn_handler.execute_fetchall(
             "SELECT * FROM qiita.study_person WHERE study_person_id = 4")
-        self.assertEqual(obs, [[4, 'SomeDude', 'somedude@foo.bar',
-                         '111 fake street', '111-121-1313']])
+        self.assertEqual(obs, [(4, 'SomeDude', 'somedude@foo.bar',
+                         '111 fake street', '111-121-1313')])
 
     def test_create_studyperson_already_exists(self):
         obs = StudyPerson.create('LabDude', 'lab_dude@foo.bar')
@@ -174,7 +176,7 @@ class TestStudy(TestCase):
                'number_samples_collected': 25}
 
         obsins = self.conn_handler.execute_fetchall(
-            "SELECT * FROM qiita.study WHERE study_id = 2")
+            "SELECT * FROM qiita.study WHERE study_id = 2", row_type='dict')
         self.assertEqual(len(obsins), 1)
         obsins = dict(obsins[0])
         self.assertEqual(obsins, exp)
@@ -183,7 +185,7 @@ class TestStudy(TestCase):
         efo = self.conn_handler.execute_fetchall(
             "SELECT efo_id FROM qiita.study_experimental_factor "
             "WHERE study_id = 2")
-        self.assertEqual(efo, [[1]])
+        self.assertEqual(efo, [(1, )])
 
     def test_create_study_with_investigation(self):
         """Insert a study into the database with an investigation"""
@@ -193,7 +195,7 @@ class TestStudy(TestCase):
         # check the investigation was assigned
         obs = self.conn_handler.execute_fetchall(
             "SELECT * from qiita.investigation_study WHERE study_id = 2")
-        self.assertEqual(obs, [[1, 2]])
+        self.assertEqual(obs, [(1, 2)])
 
     def test_create_study_all_data(self):
         """Insert a study into the database with every info field"""
@@ -224,7 +226,7 @@ class TestStudy(TestCase):
                'study_title': 'Fried chicken microbiome',
                'number_samples_collected': 25}
         obsins = self.conn_handler.execute_fetchall(
-            "SELECT * FROM qiita.study WHERE study_id = 2")
+            "SELECT * FROM qiita.study WHERE study_id = 2", row_type='dict')
         self.assertEqual(len(obsins), 1)
         obsins = dict(obsins[0])
         self.assertEqual(obsins, exp)
@@ -233,7 +235,7 @@ class TestStudy(TestCase):
         obsefo = self.conn_handler.execute_fetchall(
             "SELECT efo_id FROM qiita.study_experimental_factor "
             "WHERE study_id = 2")
-        self.assertEqual(obsefo, [[1]])
+        self.assertEqual(obsefo, [(1, )])
 
     def test_create_missing_required(self):
         """ Insert a study that is missing a required info key"""
@@ -248,6 +250,13 @@ class TestStudy(TestCase):
             Study.create(User('test@foo.bar'), "Fried Chicken Microbiome",
                          [], self.info)
 
+    def test_create_rollback(self):
+        """A failure while creating a study does not leave partial rows"""
+        with self.assertRaises(QiitaDBExecutionError):
+            Study.create(User('test@foo.bar'), "Fried Chicken Microbiome",
+                         ['not_an_efo_id'], self.info)
+        self.assertTrue(check_count("qiita.study", 1))
+
     def test_create_study_with_not_allowed_key(self):
         """Insert a study with key from _non_info present"""
         self.info.update({"study_id": 1})
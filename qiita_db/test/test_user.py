@@ -53,7 +53,7 @@ class UserTest(TestCase):
         user = User.create('new@test.bar', 'password')
         self.assertEqual(user.id, 'new@test.bar')
         sql = "SELECT * from qiita.qiita_user WHERE email = 'new@test.bar'"
-        obs = self.conn_handler.execute_fetchall(sql)
+        obs = self.conn_handler.execute_fetchall(sql, row_type='dict')
         self.assertEqual(len(obs), 1)
         obs = dict(obs[0])
         exp = {
@@ -73,7 +73,7 @@ class UserTest(TestCase):
         user = User.create('new@test.bar', 'password', self.userinfo)
         self.assertEqual(user.id, 'new@test.bar')
         sql = "SELECT * from qiita.qiita_user WHERE email = 'new@test.bar'"
-        obs = self.conn_handler.execute_fetchall(sql)
+        obs = self.conn_handler.execute_fetchall(sql, row_type='dict')
         self.assertEqual(len(obs), 1)
         obs = dict(obs[0])
         exp = {
@@ -7,8 +7,10 @@
 # -----------------------------------------------------------------------------
 
 from unittest import TestCase, main
-from tempfile import mkstemp
-from os import close
+from tempfile import mkstemp, mkdtemp
+from os import close, remove, stat
+from os.path import join, exists
+from shutil import rmtree
 
 from qiita_core.util import qiita_test_checker
 from qiita_core.exceptions import IncompetentQiitaDeveloperError
@@ -17,7 +19,14 @@ from qiita_db.util import (exists_table, exists_dynamic_table, scrub_data,
                            compute_checksum, check_table_cols,
                            check_required_columns, convert_to_id,
                            get_table_cols, get_filetypes, get_filepath_types,
-                           get_count, check_count, get_processed_params_tables)
+                           get_count, check_count, get_processed_params_tables,
+                           invalidate_schema_cache, schema_cache_stats,
+                           compute_checksums, get_checksum_algorithm_id,
+                           place_filepaths, _copy_file, convert_from_id,
+                           get_vocabulary, invalidate_vocabulary_cache,
+                           vocabulary_cache_stats, get_settings,
+                           reload_settings, get_db_files_base_dir,
+                           get_work_base_dir)
 
 
 @qiita_test_checker()
@@ -72,6 +81,31 @@ class DBUtilTests(TestCase):
         self.assertFalse(exists_table("foo_table", self.conn_handler))
         self.assertFalse(exists_table("bar_table", self.conn_handler))
 
+    def test_schema_cache(self):
+        """The schema information is cached until invalidated"""
+        invalidate_schema_cache()
+        exp = get_table_cols("qiita_user", self.conn_handler)
+        obs = schema_cache_stats()
+        self.assertEqual(get_table_cols("qiita_user", self.conn_handler), exp)
+        self.assertTrue(exists_table("qiita_user", self.conn_handler))
+        new = schema_cache_stats()
+        self.assertEqual(new['hits'], obs['hits'] + 2)
+        self.assertEqual(new['misses'], obs['misses'])
+        self.assertEqual(new['tables'], 1)
+
+        self.conn_handler.execute(
+            "ALTER TABLE qiita.qiita_user ADD COLUMN foo varchar")
+        invalidate_schema_cache("qiita_user")
+        self.assertEqual(schema_cache_stats()['tables'], 0)
+        self.assertEqual(set(get_table_cols("qiita_user", self.conn_handler)),
+                         set(exp).union(['foo']))
+
+    def test_schema_cache_missing_table(self):
+        """Missing tables are not cached"""
+        self.assertFalse(exists_table("foo_table", self.conn_handler))
+        self.conn_handler.execute("CREATE TABLE qiita.foo_table (a integer)")
+        self.assertTrue(exists_table("foo_table", self.conn_handler))
+
     def test_exists_dynamic_table(self):
         """Correctly checks if a dynamic table exists"""
         # True cases
@@ -103,6 +137,73 @@ class DBUtilTests(TestCase):
         """Tests that ids are returned correctly"""
         self.assertEqual(convert_to_id("directory", "filepath_type"), 7)
 
+    def test_convert_from_id(self):
+        """Tests that the strings are returned correctly"""
+        self.assertEqual(convert_from_id(7, "filepath_type"), "directory")
+        self.assertEqual(convert_from_id(1, "job_status"), "queued")
+        with self.assertRaises(IncompetentQiitaDeveloperError):
+            convert_from_id(100, "filepath_type")
+
+    def test_get_vocabulary(self):
+        """Tests that the values of a lookup table are returned correctly"""
+        self.assertEqual(get_vocabulary("filetype"),
+                         {'FASTA': 1, 'FASTQ': 2, 'SPECTRA': 3})
+        self.assertEqual(get_vocabulary("emp_status"),
+                         {'EMP': 1, 'EMP_Processed': 2, 'NOT_EMP': 3})
+        with self.assertRaises(IncompetentQiitaDeveloperError):
+            get_vocabulary("study")
+
+    def test_vocabulary_cache(self):
+        """The lookup tables are read once, and again if a value is
+        missing"""
+        invalidate_vocabulary_cache()
+        convert_to_id("directory", "filepath_type")
+        obs = vocabulary_cache_stats()
+        self.assertEqual(convert_to_id("biom", "filepath_type"), 6)
+        self.assertEqual(convert_from_id(6, "filepath_type"), "biom")
+        new = vocabulary_cache_stats()
+        self.assertEqual(new['hits'], obs['hits'] + 2)
+        self.assertEqual(new['misses'], obs['misses'])
+        self.assertEqual(new['tables'], 1)
+
+        self.conn_handler.execute(
+            "INSERT INTO qiita.filepath_type (filepath_type) VALUES ('foo')")
+        self.assertEqual(convert_to_id("foo", "filepath_type"), 9)
+        self.conn_handler.execute(
+            "UPDATE qiita.filepath_type SET filepath_type = 'bar' WHERE "
+            "filepath_type = 'foo'")
+        self.assertEqual(convert_from_id(9, "filepath_type"), "foo")
+        invalidate_vocabulary_cache("filepath_type")
+        self.assertEqual(convert_from_id(9, "filepath_type"), "bar")
+
+    def test_get_settings(self):
+        """The settings are read once, until reloaded"""
+        obs = get_settings()
+        self.assertTrue(obs.test)
+        self.assertEqual(obs.base_data_dir, get_db_files_base_dir())
+        self.assertEqual(obs.base_work_dir, get_work_base_dir())
+
+        self.conn_handler.execute(
+            "UPDATE settings SET base_work_dir = '/tmp/qiita_work'")
+        try:
+            self.assertTrue(get_settings() is obs)
+            self.assertEqual(reload_settings().base_work_dir,
+                             '/tmp/qiita_work')
+            self.assertEqual(get_work_base_dir(), '/tmp/qiita_work')
+        finally:
+            self.conn_handler.execute(
+                "UPDATE settings SET base_work_dir = %s",
+                (obs.base_work_dir, ))
+            reload_settings()
+
+    def test_get_checksum_algorithm_id(self):
+        """Tests that the checksum algorithm ids are returned correctly"""
+        self.assertEqual(get_checksum_algorithm_id("crc32"), 1)
+        self.assertEqual(get_checksum_algorithm_id("sha256",
+                                                   self.conn_handler), 4)
+        with self.assertRaises(IncompetentQiitaDeveloperError):
+            get_checksum_algorithm_id("FAKE")
+
     def test_convert_to_id_bad_value(self):
         """Tests that ids are returned correctly"""
         with self.assertRaises(IncompetentQiitaDeveloperError):
@@ -163,6 +264,12 @@ class UtilTests(TestCase):
         close(fh)
         with open(self.filepath, "w") as f:
             f.write("Some text so we can actually compute a checksum")
+        self._clean_up_dirs = []
+
+    def tearDown(self):
+        remove(self.filepath)
+        for dirpath in self._clean_up_dirs:
+            rmtree(dirpath)
 
     def test_compute_checksum(self):
         """Correctly returns the file checksum"""
@@ -170,6 +277,80 @@ class UtilTests(TestCase):
         exp = 1719580229
         self.assertEqual(obs, exp)
 
+    def test_compute_checksum_algorithm(self):
+        """Correctly returns the file checksum with other algorithms"""
+        obs = compute_checksum(self.filepath, 'md5')
+        self.assertEqual(obs, 'd217f00299ab315615dec4b0476c8a72')
+
+    def test_compute_checksum_dir(self):
+        """Correctly returns the checksum of all the files in a directory"""
+        dirpath = mkdtemp()
+        self._clean_up_dirs.append(dirpath)
+        with open(join(dirpath, 'a.txt'), 'w') as f:
+            f.write("Some text so we can actually compute a checksum")
+        self.assertEqual(compute_checksum(dirpath), 1719580229)
+
+    def test_compute_checksums(self):
+        """Correctly returns the checksums of several files"""
+        obs, throughput = compute_checksums([self.filepath] * 3,
+                                            block_size=7)
+        self.assertEqual(obs, [1719580229] * 3)
+        self.assertTrue(throughput >= 0)
+        obs, _ = compute_checksums([self.filepath], 'md5', workers=1)
+        self.assertEqual(obs, ['d217f00299ab315615dec4b0476c8a72'])
+        self.assertEqual(compute_checksums([]), ([], 0.0))
+
+    def test_place_filepaths(self):
+        """Correctly places the files and returns their checksums"""
+        dirpath = mkdtemp()
+        self._clean_up_dirs.append(dirpath)
+        dst = join(dirpath, 'placed.txt')
+        obs = place_filepaths([(self.filepath, dst)])
+        self.assertEqual(obs, [1719580229])
+        self.assertEqual(compute_checksum(dst), 1719580229)
+        # The original file is not removed
+        self.assertTrue(exists(self.filepath))
+
+    def test_place_filepaths_error(self):
+        """Removes the placed files if any of them cannot be placed"""
+        dirpath = mkdtemp()
+        self._clean_up_dirs.append(dirpath)
+        dst = join(dirpath, 'placed.txt')
+        with self.assertRaises((IOError, OSError)):
+            place_filepaths([(self.filepath, dst),
+                             (join(dirpath, 'missing.txt'),
+                              join(dirpath, 'missing_dst.txt'))])
+        self.assertFalse(exists(dst))
+        self.assertTrue(exists(self.filepath))
+
+    def test_place_filepaths_error_keeps_existing(self):
+        """Does not overwrite nor remove the files already placed"""
+        dirpath = mkdtemp()
+        self._clean_up_dirs.append(dirpath)
+        existing = join(dirpath, 'existing.txt')
+        with open(existing, 'w') as f:
+            f.write("Already stored")
+        missing_dst = join(dirpath, 'missing_dst.txt')
+        with open(missing_dst, 'w') as f:
+            f.write("Already stored too")
+        with self.assertRaises(OSError):
+            place_filepaths([(self.filepath, existing),
+                             (join(dirpath, 'missing.txt'), missing_dst)])
+        with open(existing) as f:
+            self.assertEqual(f.read(), "Already stored")
+        with open(missing_dst) as f:
+            self.assertEqual(f.read(), "Already stored too")
+
+    def test_copy_file(self):
+        """Correctly copies a file computing its checksum"""
+        dirpath = mkdtemp()
+        self._clean_up_dirs.append(dirpath)
+        dst = join(dirpath, 'copied.txt')
+        obs = _copy_file(self.filepath, dst, 'md5', 7)
+        self.assertEqual(obs, 'd217f00299ab315615dec4b0476c8a72')
+        self.assertEqual(compute_checksum(dst, 'md5'), obs)
+        self.assertEqual(stat(dst).st_mode, stat(self.filepath).st_mode)
+
     def test_scrub_data_nothing(self):
         """Returns the same string without changes"""
         self.assertEqual(scrub_data("nothing_changes"), "nothing_changes")
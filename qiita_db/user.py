@@ -67,6 +67,11 @@ class User(QiitaObject):
     _non_info = {"email", "user_level_id", "password", "user_verify_code",
                  "pass_reset_code", "pass_reset_timestamp"}
 
+    @classmethod
+    def _row_id_column(cls):
+        r"""The name of the column holding the user ids on `_table`"""
+        return "email"
+
     def _check_id(self, id_, conn_handler=None):
         r"""Check that the provided ID actually exists in the database
 
@@ -264,10 +269,7 @@ class User(QiitaObject):
     @property
     def info(self):
         """Dict with any other information attached to the user"""
-        conn_handler = SQLConnectionHandler()
-        sql = "SELECT * from qiita.{0} WHERE email = %s".format(self._table)
-        # Need direct typecast from psycopg2 dict to standard dict
-        info = dict(conn_handler.execute_fetchone(sql, (self._id, )))
+        info = self._get_row()
         # Remove non-info columns
         for col in self._non_info:
             info.pop(col)
@@ -301,6 +303,7 @@ class User(QiitaObject):
         sql = ("UPDATE qiita.{0} SET {1} WHERE "
                "email = %s".format(self._table, ','.join(sql_insert)))
         conn_handler.execute(sql, data)
+        self._invalidate_row()
 
     @property
     def private_studies(self):
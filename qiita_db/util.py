@@ -6,6 +6,14 @@ Util functions (:mod: `qiita_db.util`)
 
 This module provides different util functions.
 
+Classes
+-------
+
+..autosummary::
+    :toctree: generated/
+
+    DBSettings
+
 Methods
 -------
 
@@ -16,12 +24,24 @@ Methods
     scrub_data
     exists_table
     exists_dynamic_table
+    invalidate_schema_cache
+    schema_cache_stats
+    get_vocabulary
+    invalidate_vocabulary_cache
+    vocabulary_cache_stats
+    get_settings
+    reload_settings
     get_db_files_base_dir
+    get_work_base_dir
     compute_checksum
+    compute_checksums
+    get_checksum_algorithm_id
+    place_filepaths
     insert_filepaths
     check_table_cols
     check_required_columns
     convert_to_id
+    convert_from_id
 """
 # -----------------------------------------------------------------------------
 # Copyright (c) 2014--, The Qiita Development Team.
@@ -34,13 +54,25 @@ Methods
 from __future__ import division
 from future.builtins import zip
 from random import choice
+from errno import EEXIST
 from string import ascii_letters, digits, punctuation
-from binascii import crc32
+from zlib import crc32
+from hashlib import new as new_hash
+from multiprocessing.pool import ThreadPool
+from time import time
 from bcrypt import hashpw, gensalt
 from functools import partial
-from os.path import join, basename, isdir
-from os import walk
-from shutil import move
+from collections import defaultdict, namedtuple
+from os.path import (join, basename, dirname, isdir, isfile, getsize, exists,
+                     lexists)
+from os import walk, link, rename, remove, getpid
+from shutil import copystat, copytree, rmtree
+from threading import Lock
+try:
+    from fcntl import ioctl
+except ImportError:
+    # Not available on Windows, files are never cloned there
+    ioctl = None
 
 from qiita_core.exceptions import IncompetentQiitaDeveloperError
 from .exceptions import QiitaDBColumnError
@@ -82,16 +114,11 @@ def get_filetypes(key='type'):
         If `key` is "type", dict is of the form {type: filetype_id}
         If `key` is "filetype_id", dict is of the form {filetype_id: type}
     """
-    con = SQLConnectionHandler()
-    if key == 'type':
-        cols = 'type, filetype_id'
-    elif key == 'filetype_id':
-        cols = 'filetype_id, type'
-    else:
+    if key not in ('type', 'filetype_id'):
         raise QiitaDBColumnError("Unknown key. Pass either 'type' or "
                                  "'filetype_id'.")
-    sql = 'select {} from qiita.filetype'.format(cols)
-    return dict(con.execute_fetchall(sql))
+    to_id, to_name = _vocabulary_cache.get('filetype')
+    return dict(to_id if key == 'type' else to_name)
 
 
 def get_filepath_types(key='filepath_type'):
@@ -111,16 +138,11 @@ def get_filepath_types(key='filepath_type'):
         - If `key` is "filepath_type_id", dict is of the form
           {filepath_type_id: filepath_type}
     """
-    con = SQLConnectionHandler()
-    if key == 'filepath_type':
-        cols = 'filepath_type, filepath_type_id'
-    elif key == 'filepath_type_id':
-        cols = 'filepath_type_id, filepath_type'
-    else:
+    if key not in ('filepath_type', 'filepath_type_id'):
         raise QiitaDBColumnError("Unknown key. Pass either 'filepath_type' or "
                                  "'filepath_type_id'.")
-    sql = 'select {} from qiita.filepath_type'.format(cols)
-    return dict(con.execute_fetchall(sql))
+    to_id, to_name = _vocabulary_cache.get('filepath_type')
+    return dict(to_id if key == 'filepath_type' else to_name)
 
 
 def create_rand_string(length, punct=True):
@@ -238,6 +260,228 @@ def check_table_cols(conn_handler, keys, table):
                                  set(keys).difference(cols))
 
 
+class _SchemaCache(object):
+    """Process-wide cache of the tables and columns present in the database
+
+    Only tables known to exist are cached, so a table created by another
+    process is picked up on the next lookup. Entries are dropped through
+    `invalidate` whenever the schema is modified.
+    """
+    def __init__(self):
+        self._lock = Lock()
+        self._columns = {}
+        self._tables = set()
+        self.hits = 0
+        self.misses = 0
+
+    def get_columns(self, table, conn_handler):
+        with self._lock:
+            if table in self._columns:
+                self.hits += 1
+                return list(self._columns[table])
+            self.misses += 1
+        headers = conn_handler.execute_fetchall(
+            "SELECT column_name FROM information_schema.columns WHERE "
+            "table_name=%s ORDER BY ordinal_position", (table, ))
+        cols = [h[0] for h in headers]
+        # Do not cache anything while inside a transaction, as the changes
+        # made to the schema in it may be rolled back
+        if cols and not conn_handler.in_transaction:
+            with self._lock:
+                self._columns[table] = cols
+                self._tables.add(table)
+        return list(cols)
+
+    def exists(self, table, conn_handler):
+        with self._lock:
+            if table in self._tables:
+                self.hits += 1
+                return True
+            self.misses += 1
+        exists = conn_handler.execute_fetchone(
+            "SELECT exists(SELECT * FROM information_schema.tables WHERE "
+            "table_name=%s)", (table,))[0]
+        if exists and not conn_handler.in_transaction:
+            with self._lock:
+                self._tables.add(table)
+        return exists
+
+    def invalidate(self, table=None):
+        with self._lock:
+            if table is None:
+                self._columns.clear()
+                self._tables.clear()
+            else:
+                self._columns.pop(table, None)
+                self._tables.discard(table)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'tables': len(self._tables)}
+
+
+_schema_cache = _SchemaCache()
+
+
+# The lookup tables that can be cached, and the column holding their names
+_VOCABULARY_COLUMNS = {'analysis_status': 'status',
+                       'checksum_algorithm': 'name',
+                       'command': 'name',
+                       'data_type': 'data_type',
+                       'emp_status': 'emp_status',
+                       'filepath_type': 'filepath_type',
+                       'filetype': 'type',
+                       'job_status': 'status',
+                       'portal_type': 'portal',
+                       'relationship_type': 'relationship_type',
+                       'required_sample_info_status': 'status',
+                       'severity': 'severity',
+                       'study_status': 'status',
+                       'timeseries_type': 'timeseries_type',
+                       'user_level': 'name'}
+
+
+class _VocabularyCache(object):
+    """Process-wide cache of the controlled vocabularies of the database
+
+    Each lookup table (e.g. filepath_type, job_status) is read whole on first
+    use and kept as a bidirectional name <-> id map. A table is read again
+    when it is older than `ttl` seconds, when a missing name or id is looked
+    up, so the values added by another process are picked up, or after
+    `invalidate`.
+
+    Parameters
+    ----------
+    ttl : float, optional
+        Seconds after which a table is read again. Default: the tables are
+        only read again on demand
+    """
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        self._lock = Lock()
+        self._tables = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _column(table):
+        try:
+            return _VOCABULARY_COLUMNS[table]
+        except KeyError:
+            raise IncompetentQiitaDeveloperError(
+                "%s is not a lookup table" % table)
+
+    def _load(self, table, conn_handler):
+        conn_handler = (conn_handler if conn_handler is not None
+                        else SQLConnectionHandler())
+        rows = conn_handler.execute_fetchall(
+            "SELECT {0}, {1}_id FROM qiita.{1}".format(self._column(table),
+                                                       table))
+        to_id = dict(rows)
+        vocabulary = (to_id, dict((v, k) for k, v in rows), time())
+        # Do not cache anything while inside a transaction, as the values
+        # added in it may be rolled back
+        if not conn_handler.in_transaction:
+            with self._lock:
+                self._tables[table] = vocabulary
+        return vocabulary
+
+    def get(self, table, conn_handler=None, reload=False):
+        """Returns the ({name: id}, {id: name}) maps of `table`"""
+        with self._lock:
+            vocabulary = self._tables.get(table)
+            fresh = (vocabulary is not None and not reload and
+                     (self.ttl is None or time() - vocabulary[2] < self.ttl))
+            if fresh:
+                self.hits += 1
+                return vocabulary[0], vocabulary[1]
+            self.misses += 1
+        vocabulary = self._load(table, conn_handler)
+        return vocabulary[0], vocabulary[1]
+
+    def lookup(self, value, table, by_id, conn_handler=None):
+        """Returns the id of the name `value`, or the name of the id `value`
+        if `by_id`, or None if `table` does not hold it"""
+        pos = 1 if by_id else 0
+        result = self.get(table, conn_handler)[pos].get(value)
+        if result is None:
+            # It may have been added since the table was read
+            result = self.get(table, conn_handler, reload=True)[pos].get(
+                value)
+        return result
+
+    def invalidate(self, table=None):
+        with self._lock:
+            if table is None:
+                self._tables.clear()
+            else:
+                self._tables.pop(table, None)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'tables': len(self._tables)}
+
+
+_vocabulary_cache = _VocabularyCache(ttl=3600)
+
+
+def get_vocabulary(table, conn_handler=None):
+    r"""Returns the values of a lookup table
+
+    Parameters
+    ----------
+    table : str
+        The lookup table, e.g. "filepath_type" or "job_status"
+    conn_handler : SQLConnectionHandler, optional
+        The connection handler object connected to the DB
+
+    Returns
+    -------
+    dict
+        The values of the table in the format {name: id}
+
+    Raises
+    ------
+    IncompetentQiitaDeveloperError
+        If `table` is not a lookup table
+
+    Notes
+    -----
+    The values are cached for the whole process, see
+    `invalidate_vocabulary_cache`
+    """
+    return dict(_vocabulary_cache.get(table, conn_handler)[0])
+
+
+def invalidate_vocabulary_cache(table=None):
+    r"""Drops the cached controlled vocabularies
+
+    Must be called after the values of a lookup table are modified or
+    removed. Added values are picked up without it.
+
+    Parameters
+    ----------
+    table : str, optional
+        The lookup table whose values are dropped. Default: drop the values
+        of all the tables
+    """
+    _vocabulary_cache.invalidate(table)
+
+
+def vocabulary_cache_stats():
+    r"""Returns the usage statistics of the vocabulary cache
+
+    Returns
+    -------
+    dict
+        The number of cache hits and misses, and the number of lookup tables
+        currently cached
+    """
+    return _vocabulary_cache.stats()
+
+
 def get_table_cols(table, conn_handler):
     """Returns the column headers of table
 
@@ -252,11 +496,13 @@ def get_table_cols(table, conn_handler):
     -------
     list of str
         The column headers of `table`
+
+    Notes
+    -----
+    The result is cached for the whole process, see
+    `invalidate_schema_cache`
     """
-    headers = conn_handler.execute_fetchall(
-        "SELECT column_name FROM information_schema.columns WHERE "
-        "table_name=%s", (table, ))
-    return [h[0] for h in headers]
+    return _schema_cache.get_columns(table, conn_handler)
 
 
 def exists_table(table, conn_handler):
@@ -269,10 +515,39 @@ def exists_table(table, conn_handler):
         The table name to check if exists
     conn_handler : SQLConnectionHandler
         The connection handler object connected to the DB
+
+    Notes
+    -----
+    Existing tables are cached for the whole process, see
+    `invalidate_schema_cache`
+    """
+    return _schema_cache.exists(table, conn_handler)
+
+
+def invalidate_schema_cache(table=None):
+    r"""Drops the cached schema information
+
+    Must be called after any DDL statement is executed on the database
+
+    Parameters
+    ----------
+    table : str, optional
+        The table whose cached information is dropped. Default: drop the
+        information of all the tables
     """
-    return conn_handler.execute_fetchone(
-        "SELECT exists(SELECT * FROM information_schema.tables WHERE "
-        "table_name=%s)", (table,))[0]
+    _schema_cache.invalidate(table)
+
+
+def schema_cache_stats():
+    r"""Returns the usage statistics of the schema cache
+
+    Returns
+    -------
+    dict
+        The number of cache hits and misses, and the number of tables
+        currently cached
+    """
+    return _schema_cache.stats()
 
 
 def exists_dynamic_table(table, prefix, suffix, conn_handler):
@@ -294,6 +569,71 @@ def exists_dynamic_table(table, prefix, suffix, conn_handler):
             exists_table(table, conn_handler))
 
 
+DBSettings = namedtuple('DBSettings', ['test', 'base_data_dir',
+                                       'base_work_dir'])
+DBSettings.__doc__ = r"""The values of the settings table of the database
+
+Attributes
+----------
+test : bool
+    Whether the database is a test environment
+base_data_dir : str
+    The path to the base directory of all db files
+base_work_dir : str
+    The path to the base directory of the working files
+"""
+
+_settings = None
+_settings_lock = Lock()
+
+
+def get_settings(conn_handler=None, reload=False):
+    r"""Returns the settings of the database
+
+    The settings table is read once per process
+
+    Parameters
+    ----------
+    conn_handler : SQLConnectionHandler, optional
+        The connection handler object connected to the DB
+    reload : bool, optional
+        Read the settings table again. Default: False
+
+    Returns
+    -------
+    DBSettings
+        The values of the settings table
+    """
+    global _settings
+    with _settings_lock:
+        if _settings is None or reload:
+            conn_handler = (conn_handler if conn_handler is not None
+                            else SQLConnectionHandler())
+            row = conn_handler.execute_fetchone(
+                "SELECT test, base_data_dir, base_work_dir FROM settings",
+                row_type='dict')
+            _settings = DBSettings(**dict(row))
+        return _settings
+
+
+def reload_settings(conn_handler=None):
+    r"""Reads the settings table again
+
+    Must be called after the settings table is modified
+
+    Parameters
+    ----------
+    conn_handler : SQLConnectionHandler, optional
+        The connection handler object connected to the DB
+
+    Returns
+    -------
+    DBSettings
+        The new values of the settings table
+    """
+    return get_settings(conn_handler, reload=True)
+
+
 def get_db_files_base_dir(conn_handler=None):
     r"""Returns the path to the base directory of all db files
 
@@ -301,64 +641,424 @@ def get_db_files_base_dir(conn_handler=None):
     -------
     str
         The path to the base directory of all db files
+
+    Notes
+    -----
+    The path is read once per process, see `get_settings`
     """
-    conn_handler = (conn_handler if conn_handler is not None
-                    else SQLConnectionHandler())
-    return conn_handler.execute_fetchone(
-        "SELECT base_data_dir FROM settings")[0]
+    return get_settings(conn_handler).base_data_dir
 
 
 def get_work_base_dir(conn_handler=None):
-    r"""Returns the path to the base directory of all db files
+    r"""Returns the path to the base directory of the working files
 
     Returns
     -------
     str
-        The path to the base directory of all db files
+        The path to the base directory of the working files
+
+    Notes
+    -----
+    The path is read once per process, see `get_settings`
+    """
+    return get_settings(conn_handler).base_work_dir
+
+
+# Size of the blocks in which the files are read to compute their checksums
+CHECKSUM_BLOCK_SIZE = 4 * 1024 * 1024
+
+
+class _Checksum(object):
+    r"""Incremental checksum of a stream of bytes
+
+    Parameters
+    ----------
+    algorithm : str
+        'crc32' or any algorithm supported by hashlib (e.g. 'md5', 'sha256')
     """
-    conn_handler = (conn_handler if conn_handler is not None
-                    else SQLConnectionHandler())
-    return conn_handler.execute_fetchone(
-        "SELECT base_work_dir FROM settings")[0]
+    def __init__(self, algorithm):
+        self._crc = 0
+        self._hash = None if algorithm == 'crc32' else new_hash(algorithm)
+
+    def update(self, data):
+        if self._hash is None:
+            self._crc = crc32(data, self._crc)
+        else:
+            self._hash.update(data)
+
+    def result(self):
+        r"""The checksum: an int for crc32, an hex digest string otherwise"""
+        if self._hash is None:
+            # We need the & 0xffffffff in order to get the same numeric value
+            # across all python versions and platforms
+            return self._crc & 0xffffffff
+        return self._hash.hexdigest()
+
+
+def _list_files(path):
+    r"""Returns `path` if it is a file, or all the files under it otherwise"""
+    if not isdir(path):
+        return [path]
+    filepaths = []
+    for name, dirs, files in walk(path):
+        join_f = partial(join, name)
+        filepaths.extend(list(map(join_f, files)))
+    return filepaths
+
 
+def _checksum_path(path, algorithm, block_size):
+    r"""Computes the checksum of `path`
 
-def compute_checksum(path):
+    Returns
+    -------
+    tuple of (checksum, int)
+        The checksum and the number of bytes read
+    """
+    checksum = _Checksum(algorithm)
+    # The blocks are read into a single reusable buffer, so no memory is
+    # allocated per block. zlib and hashlib release the GIL while they
+    # process it, which lets several files be checksummed in parallel
+    buf = bytearray(block_size)
+    view = memoryview(buf)
+    nbytes = 0
+    for fp in _list_files(path):
+        with open(fp, 'rb') as f:
+            while True:
+                read = f.readinto(buf)
+                if not read:
+                    break
+                checksum.update(view[:read])
+                nbytes += read
+    return checksum.result(), nbytes
+
+
+def compute_checksum(path, algorithm='crc32'):
     r"""Returns the checksum of the file pointed by path
 
     Parameters
     ----------
     path : str
-        The path to compute the checksum
+        The path to compute the checksum. If it is a directory, the checksum
+        is computed over all the files under it
+    algorithm : str, optional
+        The checksum algorithm: 'crc32' or any algorithm supported by
+        hashlib. Default: 'crc32'
 
     Returns
     -------
-    int
-        The file checksum
+    int or str
+        The file checksum. An int for crc32, an hex digest otherwise
     """
-    crc = 0
-    filepaths = []
-    if isdir(path):
-        for name, dirs, files in walk(path):
-            join_f = partial(join, name)
-            filepaths.extend(list(map(join_f, files)))
+    return _checksum_path(path, algorithm, CHECKSUM_BLOCK_SIZE)[0]
+
+
+def compute_checksums(paths, algorithm='crc32', workers=4,
+                      block_size=CHECKSUM_BLOCK_SIZE):
+    r"""Computes the checksums of several files in parallel
+
+    Parameters
+    ----------
+    paths : list of str
+        The paths to compute the checksums
+    algorithm : str, optional
+        The checksum algorithm: 'crc32' or any algorithm supported by
+        hashlib. Default: 'crc32'
+    workers : int, optional
+        The number of threads used. Default: 4
+    block_size : int, optional
+        The size in bytes of the blocks in which the files are read
+
+    Returns
+    -------
+    list of int or str
+        The checksum of each path, in the same order as `paths`
+    float
+        The throughput, in MB/s
+
+    See Also
+    --------
+    compute_checksum
+    """
+    paths = list(paths)
+    if not paths:
+        return [], 0.0
+    start = time()
+    if len(paths) == 1 or workers < 2:
+        results = [_checksum_path(p, algorithm, block_size) for p in paths]
     else:
-        filepaths.append(path)
-
-    for fp in filepaths:
-        with open(fp, "Ub") as f:
-            # Go line by line so we don't need to load the entire file
-            for line in f:
-                if crc is None:
-                    crc = crc32(line)
-                else:
-                    crc = crc32(line, crc)
-    # We need the & 0xffffffff in order to get the same numeric value across
-    # all python versions and platforms
-    return crc & 0xffffffff
+        pool = ThreadPool(min(workers, len(paths)))
+        try:
+            results = pool.map(
+                partial(_checksum_path, algorithm=algorithm,
+                        block_size=block_size), paths)
+        finally:
+            pool.close()
+            pool.join()
+    elapsed = time() - start
+    nbytes = sum(n for _, n in results)
+    throughput = nbytes / (1024 * 1024) / elapsed if elapsed > 0 else 0.0
+    return [c for c, _ in results], throughput
+
+
+def get_checksum_algorithm_id(algorithm, conn_handler=None):
+    r"""Returns the id of a checksum algorithm registered in the DB
+
+    Parameters
+    ----------
+    algorithm : str
+        The checksum algorithm name
+    conn_handler : SQLConnectionHandler, optional
+        The connection handler object connected to the DB
+
+    Returns
+    -------
+    int
+        The checksum algorithm id
+
+    Raises
+    ------
+    IncompetentQiitaDeveloperError
+        If the algorithm is not registered in the checksum_algorithm table
+    """
+    _id = _vocabulary_cache.lookup(algorithm, 'checksum_algorithm', False,
+                                   conn_handler)
+    if _id is None:
+        raise IncompetentQiitaDeveloperError(
+            "Checksum algorithm %s not registered in the database"
+            % algorithm)
+    return _id
+
+
+# ioctl request used to clone a file on copy-on-write filesystems (e.g. btrfs
+# or XFS) on Linux. It is only tried when the file cannot be hardlinked
+_FICLONE = 0x40049409
+
+
+def _remove_paths(paths):
+    r"""Removes the files or directories in `paths`, skipping missing ones"""
+    for path in paths:
+        if isdir(path):
+            rmtree(path, ignore_errors=True)
+        elif exists(path):
+            try:
+                remove(path)
+            except OSError:
+                pass
+
+
+def _reflink(src, dst):
+    r"""Clones `src` into `dst` sharing the data blocks
+
+    Returns
+    -------
+    bool
+        Whether the file was cloned. False if the platform or the
+        filesystem do not support it
+    """
+    if ioctl is None:
+        return False
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        try:
+            ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+        except (IOError, OSError):
+            return False
+    return True
+
+
+def _copy_file(src, dst, algorithm, block_size):
+    r"""Copies `src` to `dst` computing the checksum of the data on the way
+
+    Returns
+    -------
+    int or str
+        The checksum of the copied data
+    """
+    checksum = _Checksum(algorithm)
+    buf = bytearray(block_size)
+    view = memoryview(buf)
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        while True:
+            read = fsrc.readinto(buf)
+            if not read:
+                break
+            checksum.update(view[:read])
+            fdst.write(view[:read])
+    copystat(src, dst)
+    return checksum.result()
+
+
+def _place_path(paths, algorithm, block_size):
+    r"""Places a file or directory at its final location in the DB directory
+
+    The data is written under a temporary name in the destination directory
+    and renamed once complete, so `dst` either does not exist or holds the
+    full data. The original file is left untouched.
+
+    Parameters
+    ----------
+    paths : tuple of (str, str)
+        The original and the destination paths
+    algorithm : str
+        The checksum algorithm
+    block_size : int
+        The size in bytes of the blocks in which the data is copied
+
+    Returns
+    -------
+    int or str or None
+        The checksum of the data if it was computed while copying it, None
+        if it was linked or cloned and still needs to be checksummed
+    """
+    src, dst = paths
+    tmp = join(dirname(dst), ".%s.%d.part" % (basename(dst), getpid()))
+    checksum = None
+    try:
+        if isdir(src):
+            copytree(src, tmp)
+        else:
+            try:
+                # Same filesystem: no data is copied at all
+                link(src, tmp)
+            except OSError:
+                if not _reflink(src, tmp):
+                    checksum = _copy_file(src, tmp, algorithm, block_size)
+        rename(tmp, dst)
+    except Exception:
+        _remove_paths([tmp])
+        raise
+    return checksum
+
+
+def place_filepaths(paths, algorithm='crc32', workers=4,
+                    block_size=CHECKSUM_BLOCK_SIZE, checksums=None):
+    r"""Places several files in the DB directory and computes their checksums
+
+    Files on the same filesystem as their destination are hardlinked, and
+    cloned on copy-on-write filesystems otherwise. The rest are copied in
+    blocks, computing the checksum while copying. The files are placed in
+    parallel.
+
+    Parameters
+    ----------
+    paths : list of tuples (str, str)
+        The original and the destination path of each file
+    algorithm : str, optional
+        The checksum algorithm: 'crc32' or any algorithm supported by
+        hashlib. Default: 'crc32'
+    workers : int, optional
+        The number of threads used. Default: 4
+    block_size : int, optional
+        The size in bytes of the blocks in which the files are copied
+    checksums : list of int or str, optional
+        The checksums of the files, if already known. They are returned
+        without reading the placed files again
+
+    Returns
+    -------
+    list of int or str
+        The checksum of each destination file, in the same order as `paths`
+
+    Notes
+    -----
+    The original files are not removed. No file is placed if any of the
+    destinations already exists, so stored files are never overwritten. If
+    any of the files cannot be placed, the ones placed by this call are
+    removed before raising.
+
+    Raises
+    ------
+    OSError
+        If any of the destinations already exists
+    """
+    paths = list(paths)
+    for _, dst in paths:
+        if lexists(dst):
+            raise OSError(EEXIST, "The destination already exists", dst)
+    # The destinations created by this call, removed if it fails
+    created = []
+
+    def func(src_dst):
+        checksum = _place_path(src_dst, algorithm, block_size)
+        created.append(src_dst[1])
+        return checksum
+
+    try:
+        if len(paths) < 2 or workers < 2:
+            placed = [func(p) for p in paths]
+        else:
+            pool = ThreadPool(min(workers, len(paths)))
+            try:
+                placed = pool.map(func, paths)
+            finally:
+                pool.close()
+                pool.join()
+    except Exception:
+        _remove_paths(created)
+        raise
+
+    if checksums is not None:
+        return list(checksums)
+    # Linked and cloned files share the data with the originals, which have
+    # not been read yet
+    missing = [i for i, c in enumerate(placed) if c is None]
+    computed, _ = compute_checksums([paths[i][1] for i in missing],
+                                    algorithm, workers, block_size)
+    for i, checksum in zip(missing, computed):
+        placed[i] = checksum
+    return placed
+
+
+def _find_stored_files(paths, algorithm, algorithm_id, conn_handler):
+    r"""Looks up the files already stored in the DB with the same contents
+
+    Parameters
+    ----------
+    paths : list of str
+        The paths to the files
+    algorithm : str
+        The checksum algorithm used by the stored files
+    algorithm_id : int
+        The id of `algorithm`
+    conn_handler : SQLConnectionHandler
+        The connection handler object connected to the DB
+
+    Returns
+    -------
+    list of tuples (str, str) or None
+        For each path, a stored file with the same size and checksum and its
+        checksum, or None if there is none. Directories are never matched
+
+    Notes
+    -----
+    The stored files are first looked up by size, so only the files with the
+    same size as a stored file are read to compute their checksums.
+    """
+    sizes = [None if isdir(path) else getsize(path) for path in paths]
+    candidates = defaultdict(list)
+    known_sizes = set(size for size in sizes if size is not None)
+    if known_sizes:
+        sql = ("SELECT size, checksum, filepath FROM qiita.filepath WHERE "
+               "checksum_algorithm_id = %s AND size IN %s")
+        for size, checksum, filepath in conn_handler.execute_fetchall(
+                sql, (algorithm_id, tuple(known_sizes))):
+            candidates[size].append((checksum, filepath))
+
+    to_check = [i for i, size in enumerate(sizes) if candidates.get(size)]
+    checksums, _ = compute_checksums([paths[i] for i in to_check], algorithm)
+    stored = [None] * len(paths)
+    for i, checksum in zip(to_check, checksums):
+        for stored_checksum, filepath in candidates[sizes[i]]:
+            # The file may have been removed or changed on disk
+            if (stored_checksum == str(checksum) and isfile(filepath) and
+                    getsize(filepath) == sizes[i]):
+                stored[i] = (filepath, stored_checksum)
+                break
+    return stored
 
 
 def insert_filepaths(filepaths, obj_id, table, filepath_table, conn_handler,
-                     move_files=True):
+                     move_files=True, checksum_algorithm='crc32',
+                     deduplicate=True):
         r"""Inserts `filepaths` in the DB connected with `conn_handler`. Since
         the files live outside the database, the directory in which the files
         lives is controlled by the database, so it copies the filepaths from
@@ -377,44 +1077,106 @@ def insert_filepaths(filepaths, obj_id, table, filepath_table, conn_handler,
         conn_handler : SQLConnectionHandler
             The connection handler object connected to the DB
         move_files : bool, optional
-            Whether or not to copy from the given filepaths to the db filepaths
+            Whether or not to move the given filepaths to the db filepaths
             default: True
+        checksum_algorithm : str, optional
+            The algorithm used to compute the checksums of the files. It must
+            be registered in the checksum_algorithm table. Default: 'crc32'
+        deduplicate : bool, optional
+            Whether to reuse the files already stored in the DB with the same
+            contents. Only used if `move_files` is True. Default: True
 
         Returns
         -------
         list
             The filepath_id in the database for each added filepath
+
+        Notes
+        -----
+        The files are placed with `place_filepaths`, so they are hardlinked
+        when possible instead of copied. The move only completes when the
+        transaction commits: the original files are removed then, while the
+        placed files are removed if the transaction rolls back.
+
+        When deduplicating, the files whose size and checksum match a file
+        already stored are placed as a hardlink to the stored file instead,
+        so they share the data on disk and they are never copied. The stored
+        files are looked up by size first, so only the files with the same
+        size as a stored file are read before being placed. Each filepath
+        keeps its own link, so the filesystem link count acts as the
+        reference count of the data: removing one of the filepaths never
+        affects the others. Stored files must hence never be modified in
+        place. If any of the destinations already exists, the insertion fails
+        and the stored file is left untouched.
         """
-        new_filepaths = filepaths
-        if move_files:
-            # Get the base directory in which the type of data is stored
-            base_data_dir = join(get_db_files_base_dir(), table)
-            # Generate the new fileapths. Format: DataId_OriginalName
-            # Keeping the original name is useful for checking if the RawData
-            # alrady exists on the DB
-            db_path = partial(join, base_data_dir)
-            new_filepaths = [
-                (db_path("%s_%s" % (obj_id, basename(path))), id)
-                for path, id in filepaths]
-            # Move the original files to the controlled DB directory
-            for old_fp, new_fp in zip(filepaths, new_filepaths):
-                    move(old_fp[0], new_fp[0])
-
-        paths_w_checksum = [(path, id, compute_checksum(path))
-                            for path, id in new_filepaths]
-
-        # Create the list of SQL values to add
-        values = ["('%s', %s, '%s', %s)" % (scrub_data(path), id, checksum, 1)
-                  for path, id, checksum in paths_w_checksum]
-        # Insert all the filepaths at once and get the filepath_id back
-        ids = conn_handler.execute_fetchall(
-            "INSERT INTO qiita.{0} (filepath, filepath_type_id, checksum, "
-            "checksum_algorithm_id) VALUES {1} "
-            "RETURNING filepath_id".format(filepath_table,
-                                           ', '.join(values)))
-
-        # we will receive a list of lists with a single element on it (the id),
-        # transform it to a list of ids
+        filepaths = list(filepaths)
+        with conn_handler.transaction():
+            algorithm_id = get_checksum_algorithm_id(checksum_algorithm,
+                                                     conn_handler)
+            if not move_files:
+                new_filepaths = filepaths
+                # The files are checksummed in parallel
+                checksums, _ = compute_checksums(
+                    [path for path, _ in new_filepaths], checksum_algorithm)
+            else:
+                # Get the base directory in which the type of data is stored
+                base_data_dir = join(
+                    get_settings(conn_handler).base_data_dir, table)
+                # Generate the new fileapths. Format: DataId_OriginalName
+                # Keeping the original name is useful for checking if the
+                # RawData alrady exists on the DB
+                db_path = partial(join, base_data_dir)
+                new_filepaths = [
+                    (db_path("%s_%s" % (obj_id, basename(path))), id)
+                    for path, id in filepaths]
+                sources = [path for path, _ in filepaths]
+                destinations = [path for path, _ in new_filepaths]
+                if deduplicate:
+                    stored = _find_stored_files(sources, checksum_algorithm,
+                                                algorithm_id, conn_handler)
+                else:
+                    stored = [None] * len(sources)
+                # Place the files in the controlled DB directory. The files
+                # are kept in sync with the transaction: the new files are
+                # removed if it rolls back, and the originals once it commits.
+                # The files with the same contents as a stored file are
+                # linked from it, so they share its data on disk and their
+                # checksum is already known
+                matched = [i for i, st in enumerate(stored) if st is not None]
+                place_filepaths([(stored[i][0], destinations[i])
+                                 for i in matched], checksum_algorithm,
+                                checksums=[stored[i][1] for i in matched])
+                conn_handler.on_rollback(partial(
+                    _remove_paths, [destinations[i] for i in matched]))
+                unmatched = [i for i, st in enumerate(stored) if st is None]
+                placed = place_filepaths([(sources[i], destinations[i])
+                                          for i in unmatched],
+                                         checksum_algorithm)
+                conn_handler.on_rollback(partial(
+                    _remove_paths, [destinations[i] for i in unmatched]))
+                conn_handler.on_commit(partial(_remove_paths, sources))
+                checksums = [None if st is None else st[1] for st in stored]
+                for i, checksum in zip(unmatched, placed):
+                    checksums[i] = checksum
+            # The size of the directories is not stored, as they are never
+            # deduplicated
+            sizes = [None if isdir(path) else getsize(path)
+                     for path, _ in new_filepaths]
+            paths_w_checksum = [(path, id, checksum, size)
+                                for (path, id), checksum, size
+                                in zip(new_filepaths, checksums, sizes)]
+
+            # Insert the filepaths in bulk and get the filepath_ids back
+            ids = conn_handler.insert_many(
+                "qiita.{0}".format(filepath_table),
+                ['filepath', 'filepath_type_id', 'checksum',
+                 'checksum_algorithm_id', 'size'],
+                [(path, id, str(checksum), algorithm_id, size)
+                 for path, id, checksum, size in paths_w_checksum],
+                returning='filepath_id')
+
+        # we will receive a list of tuples with a single element on it (the
+        # id), transform it to a list of ids
         return [id[0] for id in ids]
 
 
@@ -439,15 +1201,51 @@ def convert_to_id(value, table, conn_handler=None):
         ------
         IncompetentQiitaDeveloperError
             The passed string has no associated id
+
+        Notes
+        -----
+        The values of `table` are cached for the whole process, see
+        `invalidate_vocabulary_cache`
         """
-        conn_handler = conn_handler if conn_handler else SQLConnectionHandler()
-        _id = conn_handler.execute_fetchone(
-            "SELECT {0}_id FROM qiita.{0} WHERE {0} = %s".format(table),
-            (value, ))
+        _id = _vocabulary_cache.lookup(value, table, False, conn_handler)
         if _id is None:
             raise IncompetentQiitaDeveloperError("%s not valid for table %s"
                                                  % (value, table))
-        return _id[0]
+        return _id
+
+
+def convert_from_id(value, table, conn_handler=None):
+        """Converts an id value to it's corresponding string value
+
+        Parameters
+        ----------
+        value : int
+            The id value to convert
+        table : str
+            The table that has the conversion
+        conn_handler : SQLConnectionHandler, optional
+            The sql connection object
+
+        Returns
+        -------
+        str
+            The string correspinding to the id
+
+        Raises
+        ------
+        IncompetentQiitaDeveloperError
+            The passed id has no associated string
+
+        Notes
+        -----
+        The values of `table` are cached for the whole process, see
+        `invalidate_vocabulary_cache`
+        """
+        name = _vocabulary_cache.lookup(value, table, True, conn_handler)
+        if name is None:
+            raise IncompetentQiitaDeveloperError("%s not valid for table %s"
+                                                 % (value, table))
+        return name
 
 
 def get_count(table):
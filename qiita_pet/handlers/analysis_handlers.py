@@ -23,12 +23,22 @@ from qiita_db.user import User
 from qiita_db.analysis import Analysis
 from qiita_db.study import Study
 from qiita_db.data import ProcessedData
-from qiita_db.metadata_template import SampleTemplate
 from qiita_db.job import Job
-from qiita_db.util import get_db_files_base_dir
+from qiita_db.base import hydration_cache
+from qiita_db.util import get_settings
 # login code modified from https://gist.github.com/guillaumevincent/4771570
 
 
+def _sample_template(study_id):
+    """Returns the sample template of the study
+
+    The metadata templates, and with them pandas, which is slow to import,
+    are only imported when a handler needs them
+    """
+    from qiita_db.metadata_template import SampleTemplate
+    return SampleTemplate(study_id)
+
+
 class CreateAnalysisHandler(BaseHandler):
     """Analysis creation"""
     @authenticated
@@ -49,11 +59,15 @@ class SelectStudiesHandler(BaseHandler):
         [study_ids.add(x) for x in userobj.private_studies]
         [study_ids.add(x) for x in userobj.shared_studies]
 
-        studies = [Study(i) for i in study_ids]
         analysis = Analysis.create(User(user), name, description)
 
-        self.render('select_studies.html', user=user, aid=analysis.id,
-                    studies=studies)
+        # Load the rows of all the studies at once, instead of querying each
+        # study property shown on the page
+        with hydration_cache():
+            Study.hydrate(study_ids)
+            studies = Study.from_ids(study_ids, trusted=True)
+            self.render('select_studies.html', user=user, aid=analysis.id,
+                        studies=studies)
 
 
 class SelectCommandsHandler(BaseHandler):
@@ -91,7 +105,7 @@ class SelectCommandsHandler(BaseHandler):
             processed_data = {ProcessedData(pid).data_type: pid for pid in
                               study.processed_data}
 
-            sample_ids = SampleTemplate(study.id).keys()
+            sample_ids = _sample_template(study.id).keys()
             for data_type in study_dts[study.id]:
                 samples = [(processed_data[data_type], sid) for sid in
                            sample_ids]
@@ -103,8 +117,7 @@ class AnalysisWaitHandler(BaseHandler):
     def get(self, analysis_id):
         analysis = Analysis(analysis_id)
         commands = []
-        for job in analysis.jobs:
-            jobject = Job(job)
+        for jobject in Job.from_ids(analysis.jobs or [], trusted=True):
             commands.append("%s:%s" % (jobject.datatype, jobject.command[0]))
 
         self.render("analysis_waiting.html", user=self.get_current_user(),
@@ -122,7 +135,8 @@ class AnalysisWaitHandler(BaseHandler):
         # HARD CODED HACKY THING FOR DEMO, FIX  Issue #164
         fp, mapping_file = mkstemp(suffix="_map_file.txt")
         close(fp)
-        SampleTemplate(1).to_file(mapping_file)
+        _sample_template(1).to_file(mapping_file)
+        base_data_dir = get_settings().base_data_dir
         study_fps = {}
         for pd in Study(1).processed_data:
             processed = ProcessedData(pd)
@@ -133,19 +147,19 @@ class AnalysisWaitHandler(BaseHandler):
                 "--mapping_fp": mapping_file
             }
             if command == "Beta Diversity" and data_type in {'16S', '18S'}:
-                opts["--tree_fp"] = join(get_db_files_base_dir(), "reference",
+                opts["--tree_fp"] = join(base_data_dir, "reference",
                                          "gg_97_otus_4feb2011.tre")
             elif command == "Beta Diversity":
-                opts["--parameter_fp"] = join(get_db_files_base_dir(),
-                                              "reference", "params_qiime.txt")
+                opts["--parameter_fp"] = join(base_data_dir, "reference",
+                                              "params_qiime.txt")
             Job.create(data_type, command, opts, analysis)
             commands.append("%s: %s" % (data_type, command))
         user = self.get_current_user()
         self.render("analysis_waiting.html", user=user,
                     aid=analysis_id, aname=analysis.name,
                     commands=commands)
-        # fire off analysis run here
-        # currently synch run so redirect done here. Will remove after demo
+        # fire off analysis run here. It returns right away, the jobs are
+        # followed from the IOLoop and their status sent through redis
         run_analysis(user, analysis)
 
 
@@ -154,14 +168,13 @@ class AnalysisResultsHandler(BaseHandler):
     def get(self, aid):
         analysis = Analysis(aid)
         jobres = defaultdict(list)
-        for job in analysis.jobs:
-            jobject = Job(job)
+        for jobject in Job.from_ids(analysis.jobs or [], trusted=True):
             jobres[jobject.datatype].append((jobject.command[0],
                                              jobject.results))
 
         self.render("analysis_results.html", user=self.get_current_user(),
                     jobres=jobres, aname=analysis.name,
-                    basefolder=get_db_files_base_dir())
+                    basefolder=get_settings().base_data_dir)
 
 
 class ShowAnalysesHandler(BaseHandler):
@@ -170,7 +183,10 @@ class ShowAnalysesHandler(BaseHandler):
         user_id = self.get_current_user()
         user = User(user_id)
 
-        analyses = [Analysis(a) for a in
-                    user.shared_analyses + user.private_analyses]
+        analysis_ids = user.shared_analyses + user.private_analyses
 
-        self.render("show_analyses.html", user=user_id, analyses=analyses)
+        with hydration_cache():
+            Analysis.hydrate(analysis_ids)
+            analyses = Analysis.from_ids(analysis_ids, trusted=True)
+            self.render("show_analyses.html", user=user_id,
+                        analyses=analyses)
@@ -6,7 +6,7 @@ from tornadoredis import Client
 from tornado.websocket import WebSocketHandler
 from tornado.gen import engine, Task
 
-from qiita_ware.run import r_server
+from qiita_ware.messaging import replay
 
 # all messages are in json format. They must have the following format:
 # 'analysis': analysis_id
@@ -48,10 +48,9 @@ class MessageHandler(WebSocketHandler):
         self.redis.listen(self.callback)
         # fight race condition by loading from redis after listen started
         # need to use std redis lib because tornadoredis is already subscribed
-        oldmessages = r_server.lrange(self.channel + ':messages', 0, -1)
-        if oldmessages is not None:
-            for message in oldmessages:
-                self.write_message(message)
+        # only the last status of each command is replayed
+        for message in replay(self.channel):
+            self.write_message(message)
 
     def callback(self, msg):
         if msg.kind == 'message':
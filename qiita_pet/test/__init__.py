@@ -0,0 +1,12 @@
+#!/usr/bin/env python
+from __future__ import division
+
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014--, The Qiita Development Team.
+#
+# Distributed under the terms of the BSD 3-clause License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# -----------------------------------------------------------------------------
+
+__version__ = "0.0.1-dev"
@@ -0,0 +1,34 @@
+from unittest import main
+
+from tornado.testing import AsyncHTTPTestCase
+
+from qiita_pet.webserver import _make_worker_app
+
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014--, The Qiita Development Team.
+#
+# Distributed under the terms of the BSD 3-clause License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# -----------------------------------------------------------------------------
+
+
+class WorkerAppTests(AsyncHTTPTestCase):
+    def get_app(self):
+        return _make_worker_app("worker secret")
+
+    def test_settings(self):
+        # The autoreload of the debug mode does not work with several
+        # processes
+        self.assertFalse(self._app.settings['debug'])
+        self.assertEqual(self._app.settings['cookie_secret'], "worker secret")
+
+    def test_in_flight(self):
+        self.assertEqual(self._app.in_flight, 0)
+        response = self.fetch('/static/css/style.css')
+        self.assertEqual(response.code, 200)
+        self.assertEqual(self._app.in_flight, 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,9 +7,20 @@ import tornado.ioloop
 import tornado.options
 import tornado.web
 import tornado.websocket
+from tornado.log import gen_log
+from tornado.netutil import bind_sockets
+from tornado.process import cpu_count
 from tornado.options import define, options
+from os import environ, fork, getpid, kill, wait, close, _exit
 from os.path import dirname, join
 from base64 import b64encode
+from errno import EINTR, ESRCH
+from fcntl import fcntl, F_GETFD, F_SETFD, FD_CLOEXEC
+from signal import signal, SIGTERM, SIGINT, SIGHUP, SIG_IGN
+from socket import fromfd, SOCK_STREAM
+from subprocess import Popen
+from sys import argv, executable
+from time import time, sleep
 from uuid import uuid4
 
 from qiita_pet.handlers.base_handlers import (MainHandler, MockupHandler,
@@ -20,27 +31,73 @@ from qiita_pet.handlers.analysis_handlers import (
     CreateAnalysisHandler, SelectStudiesHandler, SelectCommandsHandler,
     AnalysisWaitHandler, AnalysisResultsHandler, ShowAnalysesHandler)
 from qiita_pet.handlers.websocket_handlers import MessageHandler
-from qiita_db.util import get_db_files_base_dir
+from qiita_db.util import get_settings
+from qiita_db.sql_connection import close_connection_pool
+from qiita_ware.messaging import close_redis
+from qiita_ware.run import is_idle, abort_runs, share_cluster
+from qiita_core.qiita_settings import qiita_config
 
 define("port", default=8888, help="run on the given port", type=int)
+define("processes", default=1, type=int,
+       help="number of worker processes sharing the port, 0 for one per CPU")
+define("shutdown_timeout", default=10, type=int,
+       help="seconds a stopping worker waits for the in-flight requests "
+            "and analyses")
 
 DIRNAME = dirname(__file__)
 STATIC_PATH = join(DIRNAME, "static")
 TEMPLATE_PATH = join(DIRNAME, "templates")  # base folder for webpages
-RES_PATH = get_db_files_base_dir()
 COOKIE_SECRET = b64encode(uuid4().bytes + uuid4().bytes)
 DEBUG = True
 
+# Used to hand the listening sockets, the cookie secret and the pid of the
+# running master to the new master started on a graceful restart
+LISTEN_FDS_ENV = 'QIITA_LISTEN_FDS'
+COOKIE_SECRET_ENV = 'QIITA_COOKIE_SECRET'
+OLD_MASTER_ENV = 'QIITA_OLD_MASTER'
+
+
+class ResultsHandler(tornado.web.StaticFileHandler):
+    """Serves the result files stored under the base data directory
+
+    The directory is read from the database on the first request, not when
+    the application is built
+    """
+    def initialize(self, default_filename=None):
+        super(ResultsHandler, self).initialize(get_settings().base_data_dir,
+                                               default_filename)
+
 
 class Application(tornado.web.Application):
-    def __init__(self):
+    """The Qiita web application
+
+    Parameters
+    ----------
+    debug : bool, optional
+        Run the application in debug mode
+    cookie_secret : str, optional
+        The secret used to sign the cookies. Default: the COOKIE_SECRET of
+        the configuration file or, if not set, COOKIE_SECRET
+
+    Attributes
+    ----------
+    in_flight : int
+        The number of requests being served, not counting the open
+        websockets
+
+    Notes
+    -----
+    Building the application does not connect to the database, Redis or the
+    compute cluster, they are connected to on first use.
+    """
+    def __init__(self, debug=DEBUG, cookie_secret=None):
+        self.in_flight = 0
         handlers = [
             (r"/", MainHandler),
             (r"/auth/login/", AuthLoginHandler),
             (r"/auth/logout/", AuthLogoutHandler),
             (r"/auth/create/", AuthCreateHandler),
-            (r"/results/(.*)", tornado.web.StaticFileHandler,
-             {"path": RES_PATH}),
+            (r"/results/(.*)", ResultsHandler),
             (r"/static/(.*)", tornado.web.StaticFileHandler,
              {"path": STATIC_PATH}),
             (r"/analysis/1", CreateAnalysisHandler),
@@ -56,19 +113,251 @@ class Application(tornado.web.Application):
         ]
         settings = {
             "template_path": TEMPLATE_PATH,
-            "debug": DEBUG,
-            "cookie_secret": COOKIE_SECRET,
+            "debug": debug,
+            "cookie_secret": (cookie_secret or qiita_config.cookie_secret or
+                              COOKIE_SECRET),
             "login_url": "/auth/login/"
         }
         tornado.web.Application.__init__(self, handlers, **settings)
 
+    def __call__(self, request):
+        self.in_flight += 1
+        try:
+            handler = tornado.web.Application.__call__(self, request)
+        except Exception:
+            self.in_flight -= 1
+            raise
+        # The websockets never finish as a request, and are not waited for
+        if isinstance(handler, tornado.websocket.WebSocketHandler):
+            self.in_flight -= 1
+        return handler
+
+    def log_request(self, handler):
+        # Called once the request is finished
+        self.in_flight -= 1
+        tornado.web.Application.log_request(self, handler)
+
+
+def make_app(debug=DEBUG, cookie_secret=None):
+    """Builds the Qiita web application
+
+    Parameters
+    ----------
+    debug : bool, optional
+        Run the application in debug mode
+    cookie_secret : str, optional
+        The secret used to sign the cookies. Default: the COOKIE_SECRET of
+        the configuration file or, if not set, COOKIE_SECRET
+
+    Returns
+    -------
+    Application
+    """
+    return Application(debug=debug, cookie_secret=cookie_secret)
+
+
+def _make_worker_app(cookie_secret):
+    """Builds the application of a worker of the multi-process mode
+
+    The debug mode is always off, as its autoreload would make each worker
+    start a new server on the port of the master
+    """
+    return make_app(debug=False, cookie_secret=cookie_secret)
+
+
+def _serve(sockets, cookie_secret, processes):
+    """Runs a worker, serving the requests on `sockets` until SIGTERM
+
+    The worker runs its share of the analysis jobs on the cluster, so the
+    `processes` workers together stay within the configured limits.
+
+    On SIGTERM, the worker stops accepting connections, so the other workers
+    get them, and stops once its in-flight requests and its analyses are
+    finished, waiting for them at most `shutdown_timeout` seconds. The
+    analyses still unfinished then are marked as failed.
+    """
+    io_loop = tornado.ioloop.IOLoop.instance()
+    app = _make_worker_app(cookie_secret)
+    share_cluster(processes)
+    server = tornado.httpserver.HTTPServer(app)
+    server.add_sockets(sockets)
+
+    def stop():
+        server.stop()
+        deadline = time() + options.shutdown_timeout
+
+        def wait_in_flight():
+            if app.in_flight <= 0 and is_idle():
+                io_loop.stop()
+            elif time() >= deadline:
+                abort_runs()
+                io_loop.stop()
+            else:
+                io_loop.add_timeout(time() + 0.1, wait_in_flight)
+
+        wait_in_flight()
+
+    signal(SIGTERM,
+           lambda signum, frame: io_loop.add_callback_from_signal(stop))
+    # The master decides when the workers stop
+    signal(SIGINT, SIG_IGN)
+    signal(SIGHUP, SIG_IGN)
+    io_loop.start()
+
+
+def _set_inheritable(sock):
+    """Keeps `sock` open in the programs executed by the process"""
+    flags = fcntl(sock.fileno(), F_GETFD)
+    fcntl(sock.fileno(), F_SETFD, flags & ~FD_CLOEXEC)
+
+
+def _inherited_sockets():
+    """Returns the listening sockets handed by the previous master, if any"""
+    fds = environ.pop(LISTEN_FDS_ENV, None)
+    if not fds:
+        return None
+    sockets = []
+    for fd_family in fds.split(','):
+        fd, family = map(int, fd_family.split(':'))
+        sock = fromfd(fd, family, SOCK_STREAM)
+        close(fd)
+        sock.setblocking(0)
+        sockets.append(sock)
+    return sockets
+
+
+class Master(object):
+    """Pre-forks the worker processes serving the requests on the same
+    sockets and keeps them running
+
+    Parameters
+    ----------
+    sockets : list of socket.socket
+        The listening sockets shared by the workers
+    processes : int
+        The number of workers
+    cookie_secret : str
+        The secret used to sign the cookies, shared by the workers so any
+        of them can read the cookies set by the others
+
+    Notes
+    -----
+    The master does not connect to the database or Redis, so each worker
+    opens its own connections once forked. Each worker schedules the jobs of
+    the analyses it starts, so the cluster size and the maximum number of
+    jobs per user are split evenly between the workers.
+
+    On SIGTERM or SIGINT, the workers are stopped gracefully and the master
+    exits. On SIGHUP, the master restarts without downtime: it starts a new
+    master, with the current code and configuration, handing it the
+    listening sockets. The new master stops the old one once its workers
+    are serving, and the old workers finish their in-flight requests.
+    """
+    def __init__(self, sockets, processes, cookie_secret):
+        self.sockets = sockets
+        self.processes = processes
+        self.cookie_secret = cookie_secret
+        self.workers = {}
+        self.successor = None
+        self.stopping = False
+
+    def _spawn(self):
+        """Forks a new worker"""
+        # The children must not share the connections of the parent
+        close_connection_pool()
+        close_redis()
+        pid = fork()
+        if pid == 0:
+            status = 0
+            try:
+                _serve(self.sockets, self.cookie_secret, self.processes)
+            except Exception:
+                gen_log.exception("Worker %d failed", getpid())
+                status = 1
+            _exit(status)
+        self.workers[pid] = time()
+
+    def _signal_workers(self, signum):
+        for pid in self.workers:
+            try:
+                kill(pid, signum)
+            except OSError as e:
+                if e.errno != ESRCH:
+                    raise
+
+    def stop(self, signum=None, frame=None):
+        """Stops the workers gracefully"""
+        self.stopping = True
+        self._signal_workers(SIGTERM)
+
+    def restart(self, signum=None, frame=None):
+        """Starts a new master on the same sockets, which stops this one"""
+        if self.stopping or self.successor is not None:
+            return
+        env = dict(environ)
+        env[LISTEN_FDS_ENV] = ','.join('%d:%d' % (sock.fileno(), sock.family)
+                                       for sock in self.sockets)
+        env[COOKIE_SECRET_ENV] = self.cookie_secret
+        env[OLD_MASTER_ENV] = str(getpid())
+        for sock in self.sockets:
+            _set_inheritable(sock)
+        self.successor = Popen([executable] + argv, env=env,
+                               close_fds=False).pid
+        gen_log.info("Restarting, new master %d", self.successor)
+
+    def run(self):
+        """Runs the workers until the master is stopped"""
+        signal(SIGTERM, self.stop)
+        signal(SIGINT, self.stop)
+        signal(SIGHUP, self.restart)
+        for _ in range(self.processes):
+            self._spawn()
+        old_master = environ.pop(OLD_MASTER_ENV, None)
+        if old_master is not None:
+            # Our workers are serving, the previous ones can stop
+            kill(int(old_master), SIGTERM)
+
+        while self.workers:
+            try:
+                pid, status = wait()
+            except OSError as e:
+                if e.errno == EINTR:
+                    continue
+                raise
+            if pid == self.successor:
+                gen_log.error("The new master exited with status %d, the "
+                              "restart failed", status)
+                self.successor = None
+            elif pid in self.workers:
+                started = self.workers.pop(pid)
+                if not self.stopping:
+                    gen_log.warning("Worker %d exited with status %d, "
+                                    "restarting it", pid, status)
+                    # Do not spin if the workers fail right away
+                    if time() - started < 1:
+                        sleep(1)
+                    self._spawn()
+
 
 def main():
     tornado.options.parse_command_line()
-    http_server = tornado.httpserver.HTTPServer(Application())
-    http_server.listen(options.port)
-    print("Tornado started on port", options.port)
-    tornado.ioloop.IOLoop.instance().start()
+    if options.processes == 1 and LISTEN_FDS_ENV not in environ:
+        http_server = tornado.httpserver.HTTPServer(make_app())
+        http_server.listen(options.port)
+        print("Tornado started on port", options.port)
+        tornado.ioloop.IOLoop.instance().start()
+        return
+
+    sockets = _inherited_sockets() or bind_sockets(options.port)
+    # Keeps the sessions across graceful restarts, even without a configured
+    # secret
+    inherited_secret = environ.pop(COOKIE_SECRET_ENV, None)
+    cookie_secret = (qiita_config.cookie_secret or inherited_secret or
+                     COOKIE_SECRET)
+    processes = options.processes or cpu_count()
+    gen_log.info("Tornado started on port %d with %d processes",
+                 options.port, processes)
+    Master(sockets, processes, cookie_secret).run()
 
 if __name__ == "__main__":
     main()
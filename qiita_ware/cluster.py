@@ -1,49 +1,424 @@
+from __future__ import division
 from subprocess import Popen, PIPE
-
-from IPython.parallel import Client
+from threading import Lock, Thread, Timer, Event
+from collections import deque
+from functools import partial
+from json import dumps
+from time import time
+from os import (setsid, killpg, wait4, makedirs, WIFSIGNALED, WTERMSIG,
+                WEXITSTATUS)
+from os.path import dirname, exists
+from signal import SIGKILL
+from errno import EINTR
+from sys import platform
+from resource import setrlimit, RLIMIT_AS
+from logging import Formatter, makeLogRecord
+from logging.handlers import RotatingFileHandler
+from concurrent.futures import (ProcessPoolExecutor,
+                                TimeoutError as FuturesTimeoutError)
 
 from qiita_ware.exceptions import ComputeError
 
+# Size in bytes at which the job log files are rotated, and the number of
+# rotated files kept
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUPS = 5
+
+# Number of the last stderr lines of a job reported when it fails
+ERROR_TAIL_LINES = 20
+
+
+def _start_command(max_memory):
+    """Runs in the child before the command starts
+
+    The command gets its own process group, so it can be killed along with
+    the processes it spawns, and at most `max_memory` bytes of address space
+    """
+    setsid()
+    if max_memory:
+        setrlimit(RLIMIT_AS, (max_memory, max_memory))
+
+
+def _pump(stream, callback):
+    """Calls `callback` with each line read from `stream` until it closes"""
+    for line in iter(stream.readline, ''):
+        callback(line)
+    stream.close()
+
+
+def _kill(pid, killed):
+    """Kills the process group `pid` and flags it in the `killed` Event"""
+    killed.set()
+    try:
+        killpg(pid, SIGKILL)
+    except OSError:
+        # It finished in the meantime
+        pass
+
+
+def _run(cmd, on_stdout, on_stderr, timeout=None, max_memory=None):
+    """Runs `cmd` in a shell, streaming its output
+
+    Parameters
+    ----------
+    cmd : str
+        The command to run
+    on_stdout, on_stderr : callable
+        Called with each line the command writes to stdout or stderr, as soon
+        as it is written
+    timeout : float, optional
+        Seconds after which the command and its children are killed
+    max_memory : int, optional
+        Maximum address space of the command in bytes
+
+    Returns
+    -------
+    return_value : int
+        The return value of the command, minus the signal number if it was
+        killed by a signal
+    usage : dict
+        The resources used by the command and its children:
+        {'wall_time': seconds, 'user_time': seconds, 'system_time': seconds,
+        'max_rss': KB}
+    timed_out : bool
+        Whether the command was killed because it ran for longer than
+        `timeout`
+    """
+    start = time()
+    proc = Popen(cmd,
+                 universal_newlines=True,
+                 shell=True,
+                 stdout=PIPE,
+                 stderr=PIPE,
+                 close_fds=True,
+                 preexec_fn=partial(_start_command, max_memory))
+    # Reading both pipes as the output arrives keeps the command from
+    # blocking on a full pipe, without holding all of it in memory
+    readers = [Thread(target=_pump, args=(proc.stdout, on_stdout)),
+               Thread(target=_pump, args=(proc.stderr, on_stderr))]
+    for reader in readers:
+        reader.daemon = True
+        reader.start()
+
+    timed_out = Event()
+    timer = None
+    if timeout:
+        timer = Timer(timeout, _kill, (proc.pid, timed_out))
+        timer.daemon = True
+        timer.start()
+    try:
+        # Unlike Popen.wait, wait4 returns the resources used by the command
+        while True:
+            try:
+                _, status, rusage = wait4(proc.pid, 0)
+                break
+            except OSError as e:
+                if e.errno != EINTR:
+                    raise
+    finally:
+        if timer is not None:
+            timer.cancel()
+    for reader in readers:
+        reader.join()
+
+    # The process is already reaped, let Popen know how it ended
+    if WIFSIGNALED(status):
+        proc.returncode = -WTERMSIG(status)
+    else:
+        proc.returncode = WEXITSTATUS(status)
+    max_rss = rusage.ru_maxrss
+    if platform == 'darwin':
+        # Reported in bytes instead of KB
+        max_rss //= 1024
+    usage = {'wall_time': time() - start,
+             'user_time': rusage.ru_utime,
+             'system_time': rusage.ru_stime,
+             'max_rss': max_rss}
+    return proc.returncode, usage, timed_out.is_set()
+
+
+def _check_run(cmd, return_value, timed_out, timeout, max_memory, stdout,
+               stderr):
+    """Raises a ComputeError if the command timed out or failed"""
+    if timed_out:
+        raise ComputeError("Killed after running for %s seconds: %s\n"
+                           "stdout: %s\nstderr: %s"
+                           % (timeout, cmd, stdout, stderr))
+    if return_value != 0:
+        limit = ("\nmemory limit: %d bytes" % max_memory if max_memory
+                 else "")
+        raise ComputeError("Failed to execute: %s%s\nstdout: %s\nstderr: %s"
+                           % (cmd, limit, stdout, stderr))
+
 
-def system_call(cmd):
+def system_call(cmd, timeout=None, max_memory=None):
     """Call cmd and return (stdout, stderr, return_value).
 
     cmd: can be either a string containing the command to be run, or a
      sequence of strings that are the tokens of the command.
+    timeout: seconds after which the command is killed, if given.
+    max_memory: maximum address space of the command in bytes, if given.
 
     This function is ported from QIIME (http://www.qiime.org), previously
     named qiime_system_call. QIIME is a GPL project, but we obtained permission
     from the authors of this function to port it to pyqi (and keep it under
     pyqi's BSD license).
     """
-    proc = Popen(cmd,
-                 universal_newlines=True,
-                 shell=True,
-                 stdout=PIPE,
-                 stderr=PIPE)
-    # communicate pulls all stdout/stderr from the PIPEs to
-    # avoid blocking -- don't remove this line!
-    stdout, stderr = proc.communicate()
-    return_value = proc.returncode
-
-    if return_value != 0:
-        raise ComputeError("Failed to execute: %s\nstdout: %s\nstderr: %s" %
-                           (cmd, stdout, stderr))
+    stdout = []
+    stderr = []
+    return_value, _, timed_out = _run(cmd, stdout.append, stderr.append,
+                                      timeout, max_memory)
+    stdout = ''.join(stdout)
+    stderr = ''.join(stderr)
+    _check_run(cmd, return_value, timed_out, timeout, max_memory, stdout,
+               stderr)
 
     return stdout, stderr, return_value
 
 
+def _rotating_log(fp, max_bytes, backups):
+    """Returns a RotatingFileHandler writing the bare lines to `fp`"""
+    handler = RotatingFileHandler(fp, maxBytes=max_bytes,
+                                  backupCount=backups)
+    handler.setFormatter(Formatter('%(message)s'))
+    return handler
+
+
+class _Progress(object):
+    """Publishes the progress lines of a job to a Redis channel
+
+    Parameters
+    ----------
+    channel : str
+        The Redis channel, e.g. the user running the job
+    message : dict
+        The message the lines are sent in, as its 'msg'
+    interval : float
+        Minimum seconds between two published lines. The lines written in
+        between are not published
+    """
+    def __init__(self, channel, message, interval):
+        from redis import Redis
+
+        self.redis = Redis()
+        self.channel = channel
+        self.message = dict(message)
+        self.interval = interval
+        self._last = None
+
+    def __call__(self, line):
+        line = line.strip()
+        now = time()
+        if not line or (self._last is not None and
+                        now - self._last < self.interval):
+            return
+        self._last = now
+        self.message['msg'] = line
+        try:
+            self.redis.publish(self.channel, dumps(self.message))
+        except Exception:
+            # Progress is informative, it should never fail the job
+            pass
+
+
+def run_job(cmd, log_prefix, channel=None, message=None, timeout=None,
+            max_memory=None, log_max_bytes=LOG_MAX_BYTES,
+            log_backups=LOG_BACKUPS, progress_interval=1):
+    """Runs the command of a job, streaming its output to log files
+
+    Parameters
+    ----------
+    cmd : str
+        The command to run
+    log_prefix : str
+        The stdout and stderr of the command are written to
+        `log_prefix`.stdout.log and `log_prefix`.stderr.log. Each file is
+        rotated when it reaches `log_max_bytes`, keeping `log_backups`
+        rotated files
+    channel : str, optional
+        The Redis channel the stdout lines are published to as progress
+    message : dict, optional
+        The JSON message the progress lines are published in, as its 'msg'
+    timeout : float, optional
+        Seconds after which the command and its children are killed
+    max_memory : int, optional
+        Maximum address space of the command in bytes
+    log_max_bytes : int, optional
+    log_backups : int, optional
+    progress_interval : float, optional
+        Minimum seconds between two published progress lines
+
+    Returns
+    -------
+    dict
+        The resources used by the command and its children:
+        {'wall_time': seconds, 'user_time': seconds, 'system_time': seconds,
+        'max_rss': KB}
+
+    Raises
+    ------
+    ComputeError
+        If the command failed or timed out. The error holds the last lines
+        of its stderr
+    """
+    log_dir = dirname(log_prefix)
+    if log_dir and not exists(log_dir):
+        try:
+            makedirs(log_dir)
+        except OSError:
+            # Created by another job in the meantime
+            if not exists(log_dir):
+                raise
+    stdout_log = _rotating_log(log_prefix + '.stdout.log', log_max_bytes,
+                               log_backups)
+    stderr_log = _rotating_log(log_prefix + '.stderr.log', log_max_bytes,
+                               log_backups)
+    stderr_tail = deque(maxlen=ERROR_TAIL_LINES)
+    progress = (_Progress(channel, message or {}, progress_interval)
+                if channel is not None else None)
+
+    def on_stdout(line):
+        stdout_log.handle(makeLogRecord({'msg': line.rstrip('\n')}))
+        if progress is not None:
+            progress(line)
+
+    def on_stderr(line):
+        stderr_log.handle(makeLogRecord({'msg': line.rstrip('\n')}))
+        stderr_tail.append(line)
+
+    try:
+        return_value, usage, timed_out = _run(cmd, on_stdout, on_stderr,
+                                              timeout, max_memory)
+    finally:
+        stdout_log.close()
+        stderr_log.close()
+    _check_run(cmd, return_value, timed_out, timeout, max_memory,
+               "see %s.stdout.log" % log_prefix, ''.join(stderr_tail))
+
+    return usage
+
+
+def _run_synced(data, func, *args, **kwargs):
+    """Runs `func` in a worker process after syncing `data` to it
+
+    The data is added to the namespace of the worker's __main__ module,
+    which is where the IPython engines keep the synced data
+    """
+    import __main__
+    vars(__main__).update(data)
+    return func(*args, **kwargs)
+
+
+class _FutureResult(object):
+    """Wraps a concurrent.futures.Future with the AsyncResult interface
+
+    Parameters
+    ----------
+    future : concurrent.futures.Future
+        The future of the submitted task
+    """
+    def __init__(self, future):
+        self.future = future
+
+    def ready(self):
+        """Whether the task is done"""
+        return self.future.done()
+
+    def successful(self):
+        """Whether the task finished without raising. Only valid if ready"""
+        return self.future.exception() is None
+
+    def wait(self, timeout=None):
+        """Waits up to `timeout` seconds for the task to finish"""
+        try:
+            self.future.exception(timeout)
+        except FuturesTimeoutError:
+            pass
+
+    def get(self, timeout=None):
+        """Waits for the task and returns its result, raising its error"""
+        return self.future.result(timeout)
+
+
+class IPythonBackend(object):
+    """Runs the tasks on an IPython parallel cluster
+
+    Parameters
+    ----------
+    profile : str
+        The profile of the running IPython cluster
+    """
+    def __init__(self, profile):
+        from IPython.parallel import Client
+
+        self.client = Client(profile=profile)
+        self._stage_imports(self.client)
+        self.lview = self.client.load_balanced_view()
+
+    def _stage_imports(self, cluster):
+        with cluster[:].sync_imports(quiet=True):
+            from qiita_ware.cluster import system_call
+
+    def sync(self, data):
+        self.client[:].update(data)
+
+    def submit_async(self, cmd, *args, **kwargs):
+        return self.lview.apply_async(cmd, *args, **kwargs)
+
+    def submit_sync(self, cmd, *args, **kwargs):
+        return self.lview.apply_sync(cmd, *args, **kwargs)
+
+
+class ProcessPoolBackend(object):
+    """Runs the tasks on a pool of local processes
+
+    Parameters
+    ----------
+    workers : int
+        The number of worker processes
+
+    Notes
+    -----
+    The synced data is sent along with every task submitted afterwards.
+    """
+    def __init__(self, workers):
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        self._data = {}
+
+    def sync(self, data):
+        self._data.update(data)
+
+    def submit_async(self, cmd, *args, **kwargs):
+        if self._data:
+            args = (dict(self._data), cmd) + args
+            cmd = _run_synced
+        return _FutureResult(self.executor.submit(cmd, *args, **kwargs))
+
+    def submit_sync(self, cmd, *args, **kwargs):
+        return self.submit_async(cmd, *args, **kwargs).get()
+
+    def shutdown(self):
+        """Stops the worker processes once their tasks are done"""
+        self.executor.shutdown()
+
+
+# The backends that can be set in the BACKEND option of the [ipython] section
+_BACKENDS = {'ipython': lambda config: IPythonBackend(config.ipyc_demo),
+             'local': lambda config: ProcessPoolBackend(config.ipyc_demo_n)}
+
+
 class Dispatch(object):
     """Dispatch compute
 
+    Parameters
+    ----------
+    backend : IPythonBackend or ProcessPoolBackend, optional
+        Where the tasks run. Default: the backend set in the [ipython]
+        section of the configuration file
+
     Attributes
     ----------
-    reserved
-    reserved_lview
-    general
-    general_lview
-    demo
-    demo_lview
+    backend
 
     Methods
     -------
@@ -51,23 +426,31 @@ class Dispatch(object):
     submit_sync
     sync
 
+    Notes
+    -----
+    The default backend is only created when it is first used, so creating a
+    Dispatch does not connect to the cluster.
     """
-    def __init__(self):
-        # self.reserved = Client(profile='qiita_reserved')
-        # self.general = Client(profile='qiita_general')
-        self.demo = Client(profile='qiita_demo')
-
-        # self._stage_imports(self.reserved)
-        # self._stage_imports(self.general)
-        self._stage_imports(self.demo)
+    def __init__(self, backend=None):
+        self._backend = backend
+        self._lock = Lock()
 
-        # self.reserved_lview = self.reserved.load_balanced_view()
-        # self.general_lview = self.general.load_balanced_view()
-        self.demo_lview = self.demo.load_balanced_view()
-
-    def _stage_imports(self, cluster):
-        with cluster[:].sync_imports(quiet=True):
-            from qiita_ware.cluster import system_call
+    @property
+    def backend(self):
+        """The backend running the tasks, created on first use"""
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    from qiita_core.qiita_settings import qiita_config
+                    try:
+                        factory = _BACKENDS[qiita_config.ipyc_backend]
+                    except KeyError:
+                        raise ValueError(
+                            "Unknown backend %s. Should be one of %s"
+                            % (qiita_config.ipyc_backend,
+                               ', '.join(sorted(_BACKENDS))))
+                    self._backend = factory(qiita_config)
+        return self._backend
 
     def sync(self, data):
         """Sync data to engines
@@ -78,9 +461,7 @@ class Dispatch(object):
             dict of objects and to sync
 
         """
-        # self.reserved[:].update(data)
-        # self.general[:].update(data)
-        self.demo[:].update(data)
+        self.backend.sync(data)
 
     def submit_async(self, cmd, *args, **kwargs):
         """Submit an async command to execute
@@ -96,15 +477,14 @@ class Dispatch(object):
 
         Returns
         -------
-        IPython.parallel.client.asyncresult.AsyncResult
+        IPython.parallel.client.asyncresult.AsyncResult or _FutureResult
+            An object with the `ready`, `successful`, `wait` and `get`
+            methods of the IPython AsyncResult
 
         """
         if isinstance(cmd, str):
-            task = self.demo_lview.apply_async(system_call, cmd)
-        else:
-            task = self.demo_lview.apply_async(cmd, *args, **kwargs)
-
-        return task
+            return self.backend.submit_async(system_call, cmd)
+        return self.backend.submit_async(cmd, *args, **kwargs)
 
     def submit_sync(self, cmd, *args, **kwargs):
         """Submit an sync command to execute
@@ -124,11 +504,8 @@ class Dispatch(object):
 
         """
         if isinstance(cmd, str):
-            result = self.demo_lview.apply_sync(system_call, cmd)
-        else:
-            result = self.demo_lview.apply_sync(cmd, *args, **kwargs)
-
-        return result
+            return self.backend.submit_sync(system_call, cmd)
+        return self.backend.submit_sync(cmd, *args, **kwargs)
 
 # likely want this in qiita_ware.__init__
 qiita_compute = Dispatch()
@@ -0,0 +1,123 @@
+r"""
+User messages (:mod: `qiita_ware.messaging`)
+============================================
+
+..currentmodule:: qiita_ware.messaging
+
+This module sends the status messages of the analyses to the users through
+Redis. Each message is published on the user's channel, so the open
+websockets get it right away, and stored in the user's message history, so a
+websocket connecting later can replay it.
+
+The history of each user is capped to its last `HISTORY_SIZE` messages and
+expires `HISTORY_TTL` seconds after the last message sent to the user.
+
+Functions
+---------
+
+..autosummary::
+    :toctree: generated/
+
+    send_message
+    replay
+    get_redis
+    close_redis
+"""
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014--, The Qiita Development Team.
+#
+# Distributed under the terms of the BSD 3-clause License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# -----------------------------------------------------------------------------
+from json import dumps, loads
+
+from redis import Redis
+
+# Number of messages kept in the history of each user
+HISTORY_SIZE = 500
+# Seconds the history of a user is kept after the last message sent to it
+HISTORY_TTL = 7 * 24 * 60 * 60
+
+_r_server = None
+
+
+def get_redis():
+    """Returns the Redis client of the process, created on first use
+
+    Returns
+    -------
+    redis.Redis
+    """
+    global _r_server
+    if _r_server is None:
+        _r_server = Redis()
+    return _r_server
+
+
+def close_redis():
+    """Disconnects the Redis client of the process
+
+    A process that forks must close it first, so the children do not share
+    its connections. The next call to `get_redis` creates a new client.
+    """
+    global _r_server
+    if _r_server is not None:
+        _r_server.connection_pool.disconnect()
+        _r_server = None
+
+
+def _history_key(user):
+    return user + ":messages"
+
+
+def send_message(user, msg):
+    """Publishes `msg` to the user and stores it in the user's history
+
+    The message is stored, the history trimmed and the message published in
+    a single round-trip to Redis.
+
+    Parameters
+    ----------
+    user : str
+        The user the message is sent to
+    msg : dict
+        The message. It is sent as JSON
+    """
+    msg = dumps(msg)
+    key = _history_key(user)
+    pipe = get_redis().pipeline()
+    pipe.rpush(key, msg)
+    pipe.ltrim(key, -HISTORY_SIZE, -1)
+    pipe.expire(key, HISTORY_TTL)
+    pipe.publish(user, msg)
+    pipe.execute()
+
+
+def replay(user):
+    """Returns the messages to replay to a websocket of the user
+
+    Only the last message of each command of each analysis is returned, as
+    the previous ones are stale.
+
+    Parameters
+    ----------
+    user : str
+        The user whose messages are replayed
+
+    Returns
+    -------
+    list of str
+        The JSON messages, in the order they were sent
+    """
+    messages = get_redis().lrange(_history_key(user), 0, -1) or []
+    latest = {}
+    for pos, msg in enumerate(messages):
+        try:
+            info = loads(msg)
+            key = (info['analysis'], info['command'])
+        except (ValueError, TypeError, KeyError):
+            # Not a status message, it is always replayed
+            key = pos
+        latest[key] = pos
+    return [messages[pos] for pos in sorted(latest.values())]
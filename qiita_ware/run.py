@@ -1,13 +1,19 @@
 #!/usr/bin/env python
 from __future__ import division
-from json import dumps
+from datetime import timedelta
+from functools import partial
+from os.path import join
 
-from redis import Redis
+from concurrent.futures import ThreadPoolExecutor
+from tornado.ioloop import IOLoop
 
-from qiita_db.job import Job
+from qiita_core.qiita_settings import qiita_config
+from qiita_db.job import Job, evict_cached_results
+from qiita_db.util import get_work_base_dir
 
-from qiita_ware.cluster import qiita_compute
-from qiita_ware.exceptions import ComputeError
+from qiita_ware.cluster import qiita_compute, run_job
+from qiita_ware.messaging import send_message
+from qiita_ware.scheduler import Scheduler, Task
 
 
 # -----------------------------------------------------------------------------
@@ -18,64 +24,325 @@ from qiita_ware.exceptions import ComputeError
 # The full license is in the file LICENSE, distributed with this software.
 # -----------------------------------------------------------------------------
 
-r_server = Redis()
+# Seconds between two checks of the jobs running on the cluster
+POLL_INTERVAL = 0.5
 
+# The jobs of all the analyses run by this process share the cluster
+scheduler = Scheduler(qiita_compute, qiita_config.ipyc_demo_n,
+                      qiita_config.max_jobs_per_user)
+_polling = False
+# The analyses run by this process that are not finished yet
+_runs = set()
+# Computes the result keys of the jobs, which reads all their input files,
+# out of the IOLoop
+_key_executor = ThreadPoolExecutor(max_workers=1)
+# Adds and caches the results of the finished jobs, which reads all their
+# result files, out of the IOLoop
+_results_executor = ThreadPoolExecutor(max_workers=1)
 
-def run_analysis(user, analysis):
-    """Run the commands within an Analysis object and sends user messages"""
-    analysis.status = "running"
-    all_good = True
-    pubsub = r_server.pubsub()
-    pubsub.subscribe(user)
-    for job_id in analysis.jobs:
-        job = Job(job_id)
-        if job.status == 'queued':
+
+class AnalysisRun(object):
+    """Tracks the jobs of an analysis run on the cluster
+
+    Parameters
+    ----------
+    user : str
+        The user running the analysis. Its status messages are sent to it
+    analysis : Analysis
+        The analysis to run
+    callback : callable, optional
+        Called with the AnalysisRun once all the jobs are done
+    io_loop : tornado.ioloop.IOLoop, optional
+        The IOLoop the jobs are finished from. Default: the global IOLoop
+        instance
+    """
+    def __init__(self, user, analysis, callback=None, io_loop=None):
+        self.user = user
+        self.analysis = analysis
+        self.callback = callback
+        self.io_loop = io_loop if io_loop is not None else IOLoop.instance()
+        self.all_good = True
+        self.pending = set()
+
+    def _queued_jobs(self):
+        return [job for job in Job.from_ids(self.analysis.jobs or [],
+                                            trusted=True)
+                if job.status == 'queued']
+
+    def result_keys(self):
+        """Computes the result keys of the queued jobs of the analysis
+
+        It reads all the input files of the jobs, so it should not run in
+        the IOLoop
+
+        Returns
+        -------
+        dict of {int: str}
+            The result key of each queued job, by job id
+        """
+        return dict((job.id, job.result_key()) for job in self._queued_jobs())
+
+    def tasks(self, scheduled=(), keys=None):
+        """Builds the scheduler tasks of the queued jobs of the analysis
+
+        A job runs after the jobs producing its inputs and after the
+        scheduled jobs of the analyses this one was forked from. The jobs
+        whose results are cached reuse them and are not run.
+
+        Parameters
+        ----------
+        scheduled : iterable of Task, optional
+            The tasks already in the scheduler
+        keys : dict of {int: str}, optional
+            The result keys of the jobs, see `result_keys`. Computed if not
+            given
+
+        Returns
+        -------
+        list of Task
+        """
+        if keys is None:
+            keys = self.result_keys()
+        parents = set(self.analysis.parents)
+        parent_keys = [t.key for t in scheduled if t.group in parents]
+        log_dir = join(get_work_base_dir(), 'job_logs')
+        max_memory = qiita_config.job_max_memory * 1024 * 1024
+        tasks = []
+        for job in self._queued_jobs():
+            if job.id not in keys:
+                # Queued after the keys were computed, it runs with the next
+                # analysis run
+                continue
             name, command = job.command
             options = job.options
+            outputs = job.outputs
             # create json base for websocket messages
             msg = {
-                "analysis": analysis.id,
+                "analysis": self.analysis.id,
                 "msg": None,
                 "command": "%s: %s" % (job.datatype, name)
             }
 
+            key = keys[job.id]
+            cached = Job.get_cached(key)
+            if cached is not None:
+                job.link_results(cached)
+                job.status = 'completed'
+                msg["msg"] = "Completed"
+                send_message(self.user, msg)
+                continue
+
             o_fmt = ' '.join(['%s %s' % (k, v) for k, v in options.items()])
             c_fmt = str("%s %s" % (command, o_fmt))
 
-            # send running message to user wait page
-            job.status = 'running'
-            msg["msg"] = "Running"
-            r_server.rpush(user + ":messages", dumps(msg))
-            r_server.publish(user, dumps(msg))
-
-            # run the command
-            try:
-                qiita_compute.submit_sync(c_fmt)
-            except Exception as e:
-                all_good = False
-                job.status = 'error'
-                msg["msg"] = "ERROR"
-                r_server.rpush(user + ":messages", dumps(msg))
-                r_server.publish(user, dumps(msg))
-                print("Failed compute on job id %d: %s\n%s" %
-                      (job_id, e, c_fmt))
-                continue
+            tasks.append(Task(
+                job.id, c_fmt, self.user,
+                inputs=[v for k, v in options.items() if k not in outputs],
+                outputs=outputs.values(), depends_on=parent_keys,
+                group=self.analysis.id,
+                on_start=partial(self._job_started, job, msg),
+                on_done=partial(self._job_done, job, options, msg, key),
+                func=run_job, kwargs={
+                    'log_prefix': join(log_dir, str(job.id)),
+                    'channel': self.user,
+                    'message': dict(msg, msg="Running"),
+                    'timeout': qiita_config.job_timeout or None,
+                    'max_memory': max_memory or None}))
+        self.pending = set(t.key for t in tasks)
+        return tasks
+
+    def _job_started(self, job, msg, task):
+        # send running message to user wait page
+        job.status = 'running'
+        msg["msg"] = "Running"
+        send_message(self.user, msg)
+
+    def _job_done(self, job, options, msg, key, task):
+        if task.error is not None:
+            self._job_finished(job, msg, task, task.error)
+            return
+        # Adding the results checksums them, so it runs out of the IOLoop
+        self.io_loop.add_future(
+            _results_executor.submit(self._store_results, job, options, key),
+            partial(self._results_stored, job, msg, task))
 
+    def _store_results(self, job, options, key):
+        """Adds the results of `job` and caches them under `key`
+
+        It reads all the result files, so it should not run in the IOLoop
+        """
+        # FIX THIS Should not be hard coded
+        job.add_results([(options["--output_dir"], "directory")])
+        try:
+            job.cache_results(key)
+            _evict_cached_results()
+        except Exception as e:
+            # The job is fine, its results just won't be reused
+            print("Failed caching the results of job id %d: %s" %
+                  (job.id, e))
+
+    def _results_stored(self, job, msg, task, future):
+        self._job_finished(job, msg, task, future.exception())
+
+    def _job_finished(self, job, msg, task, error):
+        if error is None:
             msg["msg"] = "Completed"
-            r_server.rpush(user + ":messages", dumps(msg))
-            r_server.publish(user, dumps(msg))
-            # FIX THIS Should not be hard coded
-            job.add_results([(options["--output_dir"], "directory")])
+            send_message(self.user, msg)
             job.status = 'completed'
+        else:
+            self.all_good = False
+            job.status = 'error'
+            msg["msg"] = "ERROR"
+            send_message(self.user, msg)
+            print("Failed compute on job id %d: %s\n%s" %
+                  (job.id, error, task.cmd))
+        # Jobs failed because of a dependency never started
+        if task.started is not None:
+            job.set_timing(task.queued, task.started, task.finished)
+        if isinstance(task.output, dict):
+            job.set_resource_usage(**task.output)
+
+        self.pending.discard(task.key)
+        if not self.pending:
+            self.finish()
+
+    def abort(self):
+        """Marks the unfinished jobs of the analysis and the analysis as
+        failed"""
+        for job in Job.from_ids(self.analysis.jobs or [], trusted=True):
+            if job.status in ('queued', 'running'):
+                job.status = 'error'
+        self.all_good = False
+        self.pending.clear()
+        self.finish()
+
+    def finish(self):
+        """Sets the final analysis status and notifies the user"""
+        _runs.discard(self)
+        # send websockets message that we are done
+        send_message(self.user, {"analysis": self.analysis.id,
+                                 "msg": "allcomplete", "command": ""})
+        # set final analysis status
+        self.analysis.status = "completed" if self.all_good else "error"
+        if self.callback is not None:
+            self.callback(self)
+
+
+def is_idle():
+    """Whether all the analyses run by this process are finished"""
+    return not _runs and scheduler.idle
+
+
+def abort_runs():
+    """Marks the analyses run by this process that are not finished, and
+    their unfinished jobs, as failed
+
+    Used when the process stops before they finish, as nothing would update
+    them afterwards. The jobs already running on the cluster are not
+    stopped, but their results are discarded.
+    """
+    for run in list(_runs):
+        run.abort()
+
+
+def share_cluster(processes):
+    """Splits the limits of the scheduler between `processes` processes
+
+    Each process running analyses has its own scheduler, so the cluster size
+    and the maximum number of jobs per user are divided between them. Each
+    process still runs at least one job at a time, so with more processes
+    than the cluster size the cluster is oversubscribed.
+
+    Parameters
+    ----------
+    processes : int
+        The number of processes running analyses on the cluster
+    """
+    scheduler.width = max(1, qiita_config.ipyc_demo_n // processes)
+    if qiita_config.max_jobs_per_user:
+        scheduler.max_per_user = max(
+            1, qiita_config.max_jobs_per_user // processes)
+
+
+def _evict_cached_results():
+    """Evicts the cached job results following the configuration"""
+    if qiita_config.job_cache_max_age:
+        evict_cached_results(
+            timedelta(days=qiita_config.job_cache_max_age))
+
+
+def _poll_scheduler(io_loop, poll_interval):
+    """Polls the scheduler from the IOLoop until it is idle"""
+    global _polling
+    try:
+        scheduler.poll()
+    finally:
+        if scheduler.idle:
+            _polling = False
+        else:
+            io_loop.add_timeout(timedelta(seconds=poll_interval),
+                                partial(_poll_scheduler, io_loop,
+                                        poll_interval))
+
+
+def run_analysis(user, analysis, callback=None, io_loop=None,
+                 poll_interval=POLL_INTERVAL):
+    """Runs the commands within an Analysis object and sends user messages
+
+    This function returns right away. The result keys of the jobs, which
+    read all their input files, are computed in a background thread, and
+    the jobs are then added to the scheduler from the IOLoop. The scheduler
+    is polled from the IOLoop, so the webserver keeps serving requests while
+    the jobs run, in parallel when they do not depend on each other. The
+    results of the finished jobs are also stored in a background thread.
+
+    Parameters
+    ----------
+    user : str
+        The user running the analysis
+    analysis : Analysis
+        The analysis to run
+    callback : callable, optional
+        Called with the AnalysisRun once all the jobs are done
+    io_loop : tornado.ioloop.IOLoop, optional
+        The IOLoop that polls and finishes the jobs. Default: the global
+        IOLoop instance
+    poll_interval : float, optional
+        Seconds between two checks of the running jobs
+
+    Returns
+    -------
+    AnalysisRun
+        The object tracking the jobs of the analysis
+    """
+    analysis.status = "running"
+    io_loop = io_loop if io_loop is not None else IOLoop.instance()
+    run = AnalysisRun(user, analysis, callback, io_loop)
+    _runs.add(run)
+    io_loop.add_future(_key_executor.submit(run.result_keys),
+                       partial(_schedule, run, io_loop, poll_interval))
+    return run
+
+
+def _schedule(run, io_loop, poll_interval, future):
+    """Adds the jobs of `run` to the scheduler once their result keys are
+    computed"""
+    global _polling
+    try:
+        keys = future.result()
+    except Exception as e:
+        print("Failed computing the result keys of analysis id %d: %s" %
+              (run.analysis.id, e))
+        run.all_good = False
+        run.finish()
+        return
+
+    tasks = run.tasks(scheduler.tasks(), keys)
+    if not tasks:
+        run.finish()
+        return
 
-    # send websockets message that we are done
-    msg["msg"] = "allcomplete"
-    msg["command"] = ""
-    r_server.rpush(user + ":messages", dumps(msg))
-    r_server.publish(user, dumps(msg))
-    pubsub.unsubscribe()
-    # set final analysis status
-    if all_good:
-        analysis.status = "completed"
-    else:
-        analysis.status = "error"
+    scheduler.add(tasks)
+    if not _polling:
+        _polling = True
+        io_loop.add_callback(partial(_poll_scheduler, io_loop, poll_interval))
@@ -0,0 +1,351 @@
+r"""
+Job scheduler (:mod: `qiita_ware.scheduler`)
+============================================
+
+..currentmodule:: qiita_ware.scheduler
+
+This module runs commands on a cluster following the dependencies between
+them. Commands that do not depend on each other run in parallel, up to the
+width of the cluster, and the number of commands of a single user running at
+the same time can be capped.
+
+Classes
+-------
+
+..autosummary::
+    :toctree: generated/
+
+    Task
+    Scheduler
+"""
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014--, The Qiita Development Team.
+#
+# Distributed under the terms of the BSD 3-clause License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# -----------------------------------------------------------------------------
+from __future__ import division
+from collections import Counter
+from datetime import datetime
+from os.path import normpath, sep
+
+from qiita_ware.exceptions import ComputeError
+
+
+def _is_within(path, directory):
+    """Whether `path` is `directory` or lives under it"""
+    path = normpath(path)
+    directory = normpath(directory)
+    return path == directory or path.startswith(directory + sep)
+
+
+class Task(object):
+    """A command to run on the cluster
+
+    Parameters
+    ----------
+    key : hashable
+        Identifies the task in the scheduler, e.g. the job id
+    cmd : str
+        The command to run
+    user : str
+        The user the command runs for
+    inputs : iterable of str, optional
+        The paths the command reads
+    outputs : iterable of str, optional
+        The paths the command writes. Any task reading one of them, or a path
+        under them, runs after this one
+    depends_on : iterable of hashable, optional
+        The keys of other tasks that must finish before this one starts
+    group : hashable, optional
+        The group the task belongs to, e.g. the analysis id
+    on_start : callable, optional
+        Called with the task when it is submitted to the cluster
+    on_done : callable, optional
+        Called with the task once it is done, successfully or not
+    func : callable, optional
+        Runs the command on the cluster, called as ``func(cmd, **kwargs)``.
+        Default: the Dispatch runs it with ``system_call``
+    kwargs : dict, optional
+        The keyword arguments of `func`
+
+    Attributes
+    ----------
+    result : AsyncResult or None
+        The result of the submitted command
+    output : object
+        What running the command returned, None until it succeeds
+    error : Exception or None
+        Why the task failed, None if it succeeded or is not done
+    queued : datetime
+        When the task was added to the scheduler
+    started : datetime
+        When the command started running
+    finished : datetime
+        When the command finished running
+    """
+    def __init__(self, key, cmd, user, inputs=(), outputs=(), depends_on=(),
+                 group=None, on_start=None, on_done=None, func=None,
+                 kwargs=None):
+        self.key = key
+        self.cmd = cmd
+        self.user = user
+        self.inputs = [str(i) for i in inputs]
+        self.outputs = [str(o) for o in outputs]
+        self.depends_on = set(depends_on)
+        self.group = group
+        self.on_start = on_start
+        self.on_done = on_done
+        self.func = func
+        self.kwargs = kwargs if kwargs is not None else {}
+        self.result = None
+        self.output = None
+        self.error = None
+        self.queued = None
+        self.started = None
+        self.finished = None
+
+    def needs(self, other):
+        """Whether this task reads any of the outputs of `other`"""
+        return any(_is_within(i, o) for i in self.inputs
+                   for o in other.outputs)
+
+
+class Scheduler(object):
+    """Runs tasks on a cluster following their dependencies
+
+    Parameters
+    ----------
+    dispatch : Dispatch
+        The cluster to run the tasks on. Its `submit_async` method must
+        return an object with `ready` and `get` methods, like the IPython
+        AsyncResult
+    width : int
+        The maximum number of tasks running at the same time
+    max_per_user : int, optional
+        The maximum number of tasks of a single user running at the same
+        time. Default: 0, no limit besides `width`
+
+    Notes
+    -----
+    The scheduler never blocks: `poll` checks which tasks finished and
+    submits the ones that can start, and it must be called periodically
+    (e.g. from the IOLoop) while the scheduler is not idle. The tasks that
+    can start are submitted in the order they were added.
+    """
+    def __init__(self, dispatch, width, max_per_user=0):
+        if width < 1:
+            raise ValueError("The width of the scheduler should be at least "
+                             "1. Found %d" % width)
+        self._dispatch = dispatch
+        self.width = width
+        self.max_per_user = max_per_user
+        # All the tasks waiting or running, by key
+        self._tasks = {}
+        # The keys of the unfinished tasks each task depends on
+        self._deps = {}
+        self._waiting = []
+        self._running = []
+
+    @property
+    def idle(self):
+        """Whether there are no tasks waiting or running"""
+        return not self._tasks
+
+    def stats(self):
+        """Returns the number of tasks waiting and running
+
+        Returns
+        -------
+        dict
+            {'waiting': int, 'running': int}
+        """
+        return {'waiting': len(self._waiting), 'running': len(self._running)}
+
+    def tasks(self, group=None):
+        """Returns the tasks waiting or running
+
+        Parameters
+        ----------
+        group : hashable, optional
+            Only return the tasks of this group
+
+        Returns
+        -------
+        list of Task
+        """
+        return [t for t in self._waiting + self._running
+                if group is None or t.group == group]
+
+    def add(self, tasks):
+        """Adds tasks to the scheduler
+
+        A task depends on the tasks in `depends_on` and on the tasks whose
+        outputs it reads, either added in the same call or already in the
+        scheduler. Finished tasks are not tracked, so depending on them does
+        not delay the task.
+
+        Parameters
+        ----------
+        tasks : iterable of Task
+            The tasks to add. They start running on the next `poll`
+
+        Raises
+        ------
+        ValueError
+            If a task key is already in the scheduler, or if the tasks
+            depend on each other in a cycle. No task is added then
+        """
+        tasks = list(tasks)
+        keys = set(t.key for t in tasks)
+        if len(keys) != len(tasks) or keys & set(self._tasks):
+            raise ValueError("The task keys must be unique")
+
+        candidates = list(self._tasks.values()) + tasks
+        deps = {}
+        for task in tasks:
+            deps[task.key] = set(
+                k for k in task.depends_on
+                if k in self._tasks or k in keys) | set(
+                other.key for other in candidates
+                if other is not task and task.needs(other))
+        self._check_cycles(deps)
+
+        now = datetime.now()
+        for task in tasks:
+            task.queued = now
+            self._tasks[task.key] = task
+            self._deps[task.key] = deps[task.key]
+            self._waiting.append(task)
+
+    def _check_cycles(self, deps):
+        """Raises a ValueError if the new tasks depend on each other in a
+        cycle
+
+        The tasks already in the scheduler cannot be part of a cycle, as they
+        never depend on the new ones
+        """
+        visiting = set()
+        done = set()
+
+        def visit(key):
+            if key in done or key not in deps:
+                return
+            if key in visiting:
+                raise ValueError("Cyclic dependency on task %s" % key)
+            visiting.add(key)
+            for dep in deps[key]:
+                visit(dep)
+            visiting.remove(key)
+            done.add(key)
+
+        for key in deps:
+            visit(key)
+
+    def _remove(self, task):
+        del self._tasks[task.key]
+        del self._deps[task.key]
+
+    def _fail_dependents(self, key, failed):
+        """Fails the waiting tasks that depend on the task `key`"""
+        for task in [t for t in self._waiting if key in self._deps[t.key]]:
+            self._waiting.remove(task)
+            self._remove(task)
+            task.error = ComputeError("Dependency %s failed" % key)
+            task.finished = datetime.now()
+            failed.append(task)
+            self._fail_dependents(task.key, failed)
+
+    def _collect(self):
+        """Collects the running tasks that finished"""
+        done = []
+        running = []
+        for task in self._running:
+            if not task.result.ready():
+                running.append(task)
+                continue
+            task.finished = datetime.now()
+            try:
+                task.output = task.result.get()
+            except Exception as e:
+                task.error = e
+            # The cluster knows better when the command started and finished
+            metadata = getattr(task.result, 'metadata', None)
+            if isinstance(metadata, dict):
+                task.started = metadata.get('started') or task.started
+                task.finished = metadata.get('completed') or task.finished
+            done.append(task)
+        self._running = running
+        return done
+
+    def _submit_ready(self):
+        """Submits the waiting tasks that can start, in the order they were
+        added
+
+        Returns
+        -------
+        list of Task
+            The tasks that failed to be submitted
+        """
+        failed = []
+        per_user = Counter(t.user for t in self._running)
+        waiting = []
+        for task in self._waiting:
+            ready = (len(self._running) < self.width and
+                     not self._deps[task.key] and
+                     (not self.max_per_user or
+                      per_user[task.user] < self.max_per_user))
+            if not ready:
+                waiting.append(task)
+                continue
+            task.started = datetime.now()
+            try:
+                if task.func is None:
+                    task.result = self._dispatch.submit_async(task.cmd)
+                else:
+                    task.result = self._dispatch.submit_async(
+                        task.func, task.cmd, **task.kwargs)
+            except Exception as e:
+                task.error = e
+                task.finished = datetime.now()
+                failed.append(task)
+                continue
+            per_user[task.user] += 1
+            self._running.append(task)
+            if task.on_start is not None:
+                task.on_start(task)
+        self._waiting = waiting
+        return failed
+
+    def poll(self):
+        """Collects the tasks that finished and submits the ones that can
+        start
+
+        Returns
+        -------
+        list of Task
+            The tasks done since the last call. The `on_done` callback of
+            each of them has already been called
+        """
+        done = []
+        finished = self._collect()
+        while True:
+            for task in finished:
+                self._remove(task)
+                if task.error is not None:
+                    self._fail_dependents(task.key, done)
+                # A finished task no longer holds back its dependents
+                for deps in self._deps.values():
+                    deps.discard(task.key)
+            done.extend(finished)
+            # Submitting a task may fail right away, which fails its
+            # dependents and may let other tasks start
+            finished = self._submit_ready()
+            if not finished:
+                break
+
+        for task in done:
+            if task.on_done is not None:
+                task.on_done(task)
+        return done
@@ -0,0 +1,118 @@
+from unittest import TestCase, main
+from os import listdir
+from os.path import join
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from qiita_ware.cluster import (Dispatch, ProcessPoolBackend, system_call,
+                                run_job)
+from qiita_ware.exceptions import ComputeError
+
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014--, The Qiita Development Team.
+#
+# Distributed under the terms of the BSD 3-clause License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# -----------------------------------------------------------------------------
+
+
+def _add(a, b=0):
+    return a + b
+
+
+def _synced(name):
+    import __main__
+    return getattr(__main__, name)
+
+
+class ProcessPoolBackendTests(TestCase):
+    def setUp(self):
+        self.backend = ProcessPoolBackend(2)
+        self.dispatch = Dispatch(self.backend)
+
+    def tearDown(self):
+        self.backend.shutdown()
+
+    def test_submit_sync(self):
+        self.assertEqual(self.dispatch.submit_sync(_add, 1, b=2), 3)
+        obs = self.dispatch.submit_sync("echo qiita")
+        self.assertEqual(obs, ("qiita\n", "", 0))
+
+    def test_submit_async(self):
+        result = self.dispatch.submit_async(_add, 1, 2)
+        result.wait()
+        self.assertTrue(result.ready())
+        self.assertTrue(result.successful())
+        self.assertEqual(result.get(), 3)
+
+    def test_submit_error(self):
+        result = self.dispatch.submit_async("exit 1")
+        with self.assertRaises(ComputeError):
+            result.get()
+        self.assertFalse(result.successful())
+        with self.assertRaises(ComputeError):
+            self.dispatch.submit_sync("exit 1")
+
+    def test_sync(self):
+        self.dispatch.sync({'qiita_synced': 42})
+        self.assertEqual(self.dispatch.submit_sync(_synced, 'qiita_synced'),
+                         42)
+
+
+class SystemCallTests(TestCase):
+    def setUp(self):
+        self.log_dir = mkdtemp()
+
+    def tearDown(self):
+        rmtree(self.log_dir)
+
+    def test_system_call(self):
+        obs = system_call("echo out; echo err >&2")
+        self.assertEqual(obs, ("out\n", "err\n", 0))
+
+    def test_system_call_error(self):
+        with self.assertRaises(ComputeError):
+            system_call("exit 2")
+        with self.assertRaises(ComputeError):
+            system_call("sleep 5", timeout=0.1)
+
+    def test_run_job(self):
+        log_prefix = join(self.log_dir, 'logs', '1')
+        obs = run_job("echo out; echo err >&2", log_prefix)
+        self.assertEqual(sorted(obs),
+                         ['max_rss', 'system_time', 'user_time', 'wall_time'])
+        self.assertTrue(obs['wall_time'] > 0)
+        with open(log_prefix + '.stdout.log') as f:
+            self.assertEqual(f.read(), "out\n")
+        with open(log_prefix + '.stderr.log') as f:
+            self.assertEqual(f.read(), "err\n")
+
+    def test_run_job_rotates_logs(self):
+        log_prefix = join(self.log_dir, '1')
+        run_job("for i in $(seq 100); do echo line $i; done", log_prefix,
+                log_max_bytes=100, log_backups=2)
+        self.assertEqual(sorted(listdir(self.log_dir)),
+                         ['1.stderr.log', '1.stdout.log', '1.stdout.log.1',
+                          '1.stdout.log.2'])
+        with open(log_prefix + '.stdout.log') as f:
+            self.assertTrue(f.read().endswith("line 100\n"))
+
+    def test_run_job_error(self):
+        log_prefix = join(self.log_dir, '1')
+        with self.assertRaises(ComputeError) as e:
+            run_job("echo failed >&2; exit 1", log_prefix)
+        self.assertIn("failed", str(e.exception))
+        with self.assertRaises(ComputeError) as e:
+            run_job("sleep 5", log_prefix, timeout=0.1)
+        self.assertIn("Killed after", str(e.exception))
+
+
+class DispatchTests(TestCase):
+    def test_lazy_backend(self):
+        dispatch = Dispatch()
+        self.assertEqual(dispatch._backend, None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+from unittest import TestCase, main
+from json import loads
+
+from qiita_ware import messaging
+from qiita_ware.messaging import send_message, replay, get_redis, close_redis
+
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014--, The Qiita Development Team.
+#
+# Distributed under the terms of the BSD 3-clause License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# -----------------------------------------------------------------------------
+
+
+class MessagingTests(TestCase):
+    def setUp(self):
+        self.user = "messaging_test@foo.bar"
+        self.history_size = messaging.HISTORY_SIZE
+        self.redis = get_redis()
+
+    def tearDown(self):
+        messaging.HISTORY_SIZE = self.history_size
+        self.redis.delete(self.user + ":messages")
+
+    def test_close_redis(self):
+        close_redis()
+        new = get_redis()
+        self.assertFalse(new is self.redis)
+        self.assertTrue(new.ping())
+
+    def _msg(self, analysis, command, msg):
+        return {"analysis": analysis, "command": command, "msg": msg}
+
+    def test_send_message(self):
+        pubsub = self.redis.pubsub()
+        pubsub.subscribe(self.user)
+        send_message(self.user, self._msg(1, "16S: Summarize", "Running"))
+        obs = [m for m in pubsub.listen() if m['type'] == 'message'][0]
+        self.assertEqual(loads(obs['data']),
+                         self._msg(1, "16S: Summarize", "Running"))
+        pubsub.unsubscribe(self.user)
+        self.assertEqual(self.redis.llen(self.user + ":messages"), 1)
+        self.assertTrue(self.redis.ttl(self.user + ":messages") > 0)
+
+    def test_send_message_caps_history(self):
+        messaging.HISTORY_SIZE = 3
+        for i in range(5):
+            send_message(self.user, self._msg(i, "16S: Summarize", "Queued"))
+        obs = [loads(m)['analysis']
+               for m in self.redis.lrange(self.user + ":messages", 0, -1)]
+        self.assertEqual(obs, [2, 3, 4])
+
+    def test_replay(self):
+        self.assertEqual(replay(self.user), [])
+        for msg in [self._msg(1, "16S: Summarize", "Running"),
+                    self._msg(1, "16S: Beta", "Running"),
+                    self._msg(1, "16S: Summarize", "Completed"),
+                    self._msg(2, "16S: Summarize", "Running"),
+                    self._msg(1, "16S: Beta", "ERROR"),
+                    self._msg(1, "", "allcomplete")]:
+            send_message(self.user, msg)
+        obs = [loads(m) for m in replay(self.user)]
+        self.assertEqual(obs, [self._msg(1, "16S: Summarize", "Completed"),
+                               self._msg(2, "16S: Summarize", "Running"),
+                               self._msg(1, "16S: Beta", "ERROR"),
+                               self._msg(1, "", "allcomplete")])
+
+
+if __name__ == "__main__":
+    main()
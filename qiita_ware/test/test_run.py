@@ -1,6 +1,20 @@
 from unittest import TestCase, main
+from os import makedirs
+from os.path import exists, join
+from shutil import rmtree
+from time import time
+
+from tornado.ioloop import IOLoop
 
 from qiita_core.util import qiita_test_checker
+from qiita_core.qiita_settings import qiita_config
+from qiita_db.analysis import Analysis
+from qiita_db.job import Job
+from qiita_db.util import get_work_base_dir
+from qiita_ware.cluster import run_job
+from qiita_ware.run import AnalysisRun, scheduler, share_cluster
+from qiita_ware.scheduler import Scheduler
+from qiita_ware.test.test_scheduler import _FakeDispatch
 
 
 # -----------------------------------------------------------------------------
@@ -15,13 +29,117 @@ from qiita_core.util import qiita_test_checker
 @qiita_test_checker()
 class TestAnalysis(TestCase):
     def setUp(self):
-        pass
+        self.analysis = Analysis(1)
+        self.finished = []
+        self.io_loop = IOLoop()
+        self.run = AnalysisRun("test@foo.bar", self.analysis, self._finish,
+                               self.io_loop)
+        self.dispatch = _FakeDispatch()
+        self.scheduler = Scheduler(self.dispatch, 2)
+        self.job = Job(1)
+        self.output_dir = self.job.options["--output_dir"]
+        self._clean_up_dirs = []
+
+    def tearDown(self):
+        self.io_loop.close()
+        for dirpath in self._clean_up_dirs:
+            rmtree(dirpath)
+
+    def _finish(self, run):
+        self.finished.append(run)
+        self.io_loop.stop()
 
     def test_run_analysis(self):
         "testing the run analysis function"
         # unsure what to test here at this time
         pass
 
+    def test_tasks(self):
+        """Only the queued jobs of the analysis are run"""
+        obs = self.run.tasks()
+        self.assertEqual([t.key for t in obs], [1])
+        self.assertEqual(obs[0].inputs, ['1'])
+        self.assertEqual(obs[0].outputs, [self.output_dir])
+        self.assertEqual(obs[0].group, 1)
+        self.assertEqual(self.run.pending, set([1]))
+        self.assertEqual(obs[0].func, run_job)
+        self.assertEqual(obs[0].kwargs['log_prefix'],
+                         join(get_work_base_dir(), 'job_logs', '1'))
+        self.assertEqual(obs[0].kwargs['channel'], "test@foo.bar")
+        self.assertEqual(obs[0].kwargs['timeout'], None)
+
+    def test_result_keys(self):
+        self.assertEqual(self.run.result_keys(), {1: self.job.result_key()})
+
+    def test_tasks_keys(self):
+        """Only the jobs with a computed result key are run"""
+        self.assertEqual(self.run.tasks(keys={}), [])
+        obs = self.run.tasks(keys=self.run.result_keys())
+        self.assertEqual([t.key for t in obs], [1])
+
+    def test_run(self):
+        """The jobs are run through the scheduler"""
+        if not exists(self.output_dir):
+            makedirs(self.output_dir)
+            self._clean_up_dirs.append(self.output_dir)
+        self.scheduler.add(self.run.tasks())
+        self.scheduler.poll()
+        self.assertEqual(self.job.status, "running")
+        cmd = list(self.dispatch.results)[0]
+        self.assertTrue(cmd.startswith("summarize_taxa_through_plots.py"))
+
+        usage = {'wall_time': 2.5, 'user_time': 2.0, 'system_time': 0.25,
+                 'max_rss': 1024}
+        self.dispatch.finish(cmd, output=usage)
+        self.scheduler.poll()
+        self.assertTrue(self.scheduler.idle)
+        # The results are stored out of the IOLoop, which then finishes the
+        # job
+        self.assertEqual(self.job.status, "running")
+        self.io_loop.add_timeout(time() + 10, self.io_loop.stop)
+        self.io_loop.start()
+        self.assertEqual(self.job.status, "completed")
+        self.assertEqual(self.analysis.status, "completed")
+        self.assertEqual(self.finished, [self.run])
+        queued, started, finished = self.job.timing
+        self.assertTrue(queued <= started <= finished)
+        self.assertEqual(self.job.resource_usage, usage)
+
+    def test_run_error(self):
+        """A failed job sets the job and the analysis as errored"""
+        self.scheduler.add(self.run.tasks())
+        self.scheduler.poll()
+        self.dispatch.finish(list(self.dispatch.results)[0],
+                             ValueError("failed"))
+        self.scheduler.poll()
+        self.assertFalse(self.run.all_good)
+        self.assertEqual(self.job.status, "error")
+        self.assertEqual(self.analysis.status, "error")
+        self.assertEqual(self.finished, [self.run])
+
+    def test_abort(self):
+        """Aborting fails the unfinished jobs and the analysis"""
+        self.run.abort()
+        self.assertFalse(self.run.all_good)
+        self.assertEqual(self.job.status, "error")
+        self.assertEqual(self.analysis.status, "error")
+        self.assertEqual(self.finished, [self.run])
+
+
+class TestShareCluster(TestCase):
+    def tearDown(self):
+        share_cluster(1)
+
+    def test_share_cluster(self):
+        """The scheduler of each process gets its share of the cluster"""
+        share_cluster(1)
+        self.assertEqual(scheduler.width, qiita_config.ipyc_demo_n)
+        self.assertEqual(scheduler.max_per_user,
+                         qiita_config.max_jobs_per_user)
+        # Each process runs at least one job
+        share_cluster(qiita_config.ipyc_demo_n + 1)
+        self.assertEqual(scheduler.width, 1)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,173 @@
+from unittest import TestCase, main
+
+from qiita_ware.scheduler import Scheduler, Task
+from qiita_ware.exceptions import ComputeError
+
+# -----------------------------------------------------------------------------
+# Copyright (c) 2014--, The Qiita Development Team.
+#
+# Distributed under the terms of the BSD 3-clause License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# -----------------------------------------------------------------------------
+
+
+class _FakeResult(object):
+    """Mimics the AsyncResult of a command submitted to the cluster"""
+    def __init__(self):
+        self.done = False
+        self.error = None
+        self.output = None
+
+    def ready(self):
+        return self.done
+
+    def get(self):
+        if self.error is not None:
+            raise self.error
+        return self.output
+
+
+class _FakeDispatch(object):
+    """Mimics the Dispatch, keeping the result and the function running
+    each command"""
+    def __init__(self):
+        self.results = {}
+        self.calls = {}
+
+    def submit_async(self, cmd, *args, **kwargs):
+        func = None
+        if callable(cmd):
+            func = cmd
+            cmd = args[0]
+        if cmd == 'unsubmittable':
+            raise ComputeError("Can't submit")
+        self.results[cmd] = _FakeResult()
+        self.calls[cmd] = (func, kwargs)
+        return self.results[cmd]
+
+    def finish(self, cmd, error=None, output=None):
+        self.results[cmd].done = True
+        self.results[cmd].error = error
+        self.results[cmd].output = output
+
+
+class SchedulerTests(TestCase):
+    def setUp(self):
+        self.dispatch = _FakeDispatch()
+        self.done = []
+
+    def _task(self, key, user='user', **kwargs):
+        return Task(key, key, user, on_done=self.done.append, **kwargs)
+
+    def test_init_error(self):
+        with self.assertRaises(ValueError):
+            Scheduler(self.dispatch, 0)
+
+    def test_independent_tasks_run_in_parallel(self):
+        scheduler = Scheduler(self.dispatch, 2)
+        scheduler.add([self._task('a'), self._task('b'), self._task('c')])
+        self.assertEqual(scheduler.poll(), [])
+        self.assertEqual(sorted(self.dispatch.results), ['a', 'b'])
+        self.assertEqual(scheduler.stats(), {'waiting': 1, 'running': 2})
+
+        self.dispatch.finish('b')
+        obs = scheduler.poll()
+        self.assertEqual([t.key for t in obs], ['b'])
+        self.assertEqual(self.done, obs)
+        self.assertTrue(obs[0].queued <= obs[0].started <= obs[0].finished)
+        self.assertEqual(sorted(self.dispatch.results), ['a', 'b', 'c'])
+
+        self.dispatch.finish('a')
+        self.dispatch.finish('c')
+        scheduler.poll()
+        self.assertTrue(scheduler.idle)
+        self.assertEqual([t.error for t in self.done], [None] * 3)
+
+    def test_dependencies_from_outputs(self):
+        scheduler = Scheduler(self.dispatch, 4)
+        scheduler.add([
+            self._task('producer', outputs=['/data/out']),
+            self._task('consumer', inputs=['/data/out/table.biom']),
+            self._task('unrelated', inputs=['/data/out_other'])])
+        scheduler.poll()
+        self.assertEqual(sorted(self.dispatch.results),
+                         ['producer', 'unrelated'])
+        self.dispatch.finish('producer')
+        scheduler.poll()
+        self.assertIn('consumer', self.dispatch.results)
+
+    def test_depends_on(self):
+        scheduler = Scheduler(self.dispatch, 4)
+        scheduler.add([self._task('parent', group=1)])
+        scheduler.add([self._task('child', depends_on=['parent', 'gone'],
+                                  group=2)])
+        self.assertEqual([t.key for t in scheduler.tasks(group=2)],
+                         ['child'])
+        scheduler.poll()
+        self.assertEqual(list(self.dispatch.results), ['parent'])
+        self.dispatch.finish('parent')
+        scheduler.poll()
+        self.assertIn('child', self.dispatch.results)
+
+    def test_failure_fails_dependents(self):
+        scheduler = Scheduler(self.dispatch, 4)
+        scheduler.add([
+            self._task('a', outputs=['/out/a']),
+            self._task('b', inputs=['/out/a'], outputs=['/out/b']),
+            self._task('c', inputs=['/out/b']),
+            self._task('d')])
+        scheduler.poll()
+        self.dispatch.finish('a', ValueError('failed'))
+        obs = scheduler.poll()
+        self.assertEqual(sorted(t.key for t in obs), ['a', 'b', 'c'])
+        errors = dict((t.key, t.error) for t in obs)
+        self.assertTrue(isinstance(errors['a'], ValueError))
+        self.assertTrue(isinstance(errors['c'], ComputeError))
+        self.assertEqual([t.key for t in scheduler.tasks()], ['d'])
+        self.assertEqual(sorted(self.dispatch.results), ['a', 'd'])
+
+    def test_submit_failure(self):
+        scheduler = Scheduler(self.dispatch, 1)
+        scheduler.add([self._task('unsubmittable', outputs=['/out']),
+                       self._task('dependent', inputs=['/out']),
+                       self._task('other')])
+        obs = scheduler.poll()
+        self.assertEqual(sorted(t.key for t in obs),
+                         ['dependent', 'unsubmittable'])
+        self.assertEqual(list(self.dispatch.results), ['other'])
+
+    def test_func(self):
+        scheduler = Scheduler(self.dispatch, 1)
+        scheduler.add([self._task('a', func=len, kwargs={'opt': 1}),
+                       self._task('b')])
+        scheduler.poll()
+        self.assertEqual(self.dispatch.calls['a'], (len, {'opt': 1}))
+        self.dispatch.finish('a', output={'wall_time': 1})
+        scheduler.poll()
+        self.assertEqual(self.done[0].output, {'wall_time': 1})
+        self.assertEqual(self.dispatch.calls['b'], (None, {}))
+
+    def test_max_per_user(self):
+        scheduler = Scheduler(self.dispatch, 4, max_per_user=1)
+        scheduler.add([self._task('a1', 'a'), self._task('a2', 'a'),
+                       self._task('b1', 'b')])
+        scheduler.poll()
+        self.assertEqual(sorted(self.dispatch.results), ['a1', 'b1'])
+        self.dispatch.finish('a1')
+        scheduler.poll()
+        self.assertIn('a2', self.dispatch.results)
+
+    def test_add_errors(self):
+        scheduler = Scheduler(self.dispatch, 4)
+        scheduler.add([self._task('a')])
+        with self.assertRaises(ValueError):
+            scheduler.add([self._task('a')])
+        with self.assertRaises(ValueError):
+            scheduler.add([self._task('x', inputs=['/y'], outputs=['/x']),
+                           self._task('y', inputs=['/x'], outputs=['/y'])])
+        self.assertEqual([t.key for t in scheduler.tasks()], ['a'])
+
+
+if __name__ == "__main__":
+    main()